@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""beast_capture_server.py: Local stand-in for the Beast binary interface of dump1090 (port 30005) that serves a
+recorded Beast capture (e.g., recorded with 'nc <host> 30005 > capture.bin') to connecting clients, paced by the
+timestamps of the frames. Alternatively, the capture is decoded offline to check decoding results and throughput."""
+
+import argparse
+import socket
+import time
+
+from utils.mode_s import BeastFramer, ModeSDecoder, BEAST_ESCAPE, BEAST_MODE_S_LONG, BEAST_MODE_S_SHORT, BEAST_TIMESTAMP_FREQUENCY
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+def read_capture(path):
+    """
+    :return: List of (frame type, timestamp, signal level, message) tuples of capture
+    """
+
+    with open(path, 'rb') as capture_file:
+        return BeastFramer().feed(capture_file.read())
+
+
+def encode_frame(frame_type, timestamp, signal_level, message):
+    content = timestamp.to_bytes(6, 'big') + bytes((signal_level,)) + message
+    return bytes((BEAST_ESCAPE, frame_type)) + content.replace(bytes((BEAST_ESCAPE,)), bytes((BEAST_ESCAPE, BEAST_ESCAPE)))
+
+
+def serve_capture(frames, port, speed, repeat):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind(('127.0.0.1', port))
+    server_socket.listen(1)
+
+    print('Serving {:d} frames on port {:d}'.format(len(frames), port))
+
+    while True:
+        client_socket, _ = server_socket.accept()
+        print('Client connected')
+
+        try:
+            while True:
+                start_time = time.time()
+                first_timestamp = frames[0][1] if frames else 0
+
+                for frame in frames:
+                    # wait until frame is due (timestamps are counters of receiver)
+                    if speed > 0:
+                        delay = (frame[1] - first_timestamp) / BEAST_TIMESTAMP_FREQUENCY / speed - (time.time() - start_time)
+                        if delay > 0.001:
+                            time.sleep(delay)
+
+                    client_socket.sendall(encode_frame(*frame))
+
+                if not repeat:
+                    break
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+
+        print('Client disconnected')
+
+
+def decode_capture(frames, reference_position):
+    decoder = ModeSDecoder(reference_position=reference_position)
+
+    message_count = 0
+    record_counts = {}
+    positions = {}
+
+    start_time = time.time()
+
+    for frame_type, timestamp, signal_level, message in frames:
+        if frame_type != BEAST_MODE_S_LONG and frame_type != BEAST_MODE_S_SHORT:
+            continue
+
+        message_count += 1
+
+        sbs1_record = decoder.decode(message, timestamp / BEAST_TIMESTAMP_FREQUENCY)
+        if sbs1_record is not None:
+            record_counts[sbs1_record.msg_type] = record_counts.get(sbs1_record.msg_type, 0) + 1
+
+            if sbs1_record.latitude is not None:
+                positions[sbs1_record.icao_id] = (sbs1_record.latitude, sbs1_record.longitude)
+
+    duration = time.time() - start_time
+
+    print('{:d} Mode-S messages decoded in {:.3f} s ({:.0f} messages/s)'.format(message_count, duration, message_count / duration if duration > 0 else 0.0))
+    print('CRC errors: {:d}, unsupported messages: {:d}'.format(decoder.crc_error_count, decoder.unsupported_count))
+    print('Records per SBS1 message type: {}'.format(sorted(record_counts.items())))
+
+    for icao_id, (latitude, longitude) in sorted(positions.items()):
+        print('{:06X}: {:.5f} {:.5f}'.format(icao_id, latitude, longitude))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Stand-in Beast server for recorded captures.')
+    arg_parser.add_argument('capture', help='path to Beast capture')
+    arg_parser.add_argument('--port', dest='port', type=int, default=30005, help='TCP port of Beast server')
+    arg_parser.add_argument('--speed', dest='speed', type=float, default=1.0, help='replay speed factor (0 for as fast as possible)')
+    arg_parser.add_argument('--repeat', dest='repeat', action='store_true', help='repeat capture until client disconnects')
+    arg_parser.add_argument('--decode', dest='decode', action='store_true', help='decode capture offline instead of serving it')
+    arg_parser.add_argument('--receiver-position', dest='receiver_position', metavar='LAT,LON', help='position of receiver (for surface positions)')
+    args = arg_parser.parse_args()
+
+    frames = read_capture(args.capture)
+
+    if args.decode:
+        reference_position = tuple(float(value) for value in args.receiver_position.split(',')) if args.receiver_position else None
+        decode_capture(frames, reference_position)
+    else:
+        try:
+            serve_capture(frames, args.port, args.speed, args.repeat)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+"""benchmark_aircraft_table.py: Simulates busy airspace (aircraft appear, are received several times per second, and
+disappear) and compares the aircraft table with the previous dictionary of aircraft (sorted and scanned for stale
+aircraft every second). Checks that both track the same aircraft without size limit, that the table never exceeds its
+size limit and evicts the least recently seen aircraft, and reports time per second of traffic (reception of messages
+and one tick of the data processor) and memory usage."""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from utils.aircraft_table import AircraftInfo, AircraftTable
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+MAX_AGE = 30.0
+
+
+class DictAircraftInfo(object):
+    # previous record without __slots__
+    def __init__(self):
+        self.identifier = None
+        self.callsign = None
+        self.latitude = None
+        self.longitude = None
+        self.altitude = None
+        self.h_speed = None
+        self.v_speed = None
+        self.course = None
+        self.last_seen = None
+        self.position_time = None
+        self.trace_timestamp = None
+        self.trace_source_type = None
+
+
+def generate_receptions(aircraft_count, duration, message_rate, random_generator):
+    """
+    :param aircraft_count: Number of aircraft in airspace at the same time
+    :param message_rate: Messages per second and aircraft
+    :return: List of lists of identifiers received in every second (aircraft leave the airspace after 60 to 600
+             seconds and are replaced by new ones)
+    """
+
+    next_identifier = 0
+    departures = {}
+
+    for _ in range(aircraft_count):
+        departures['{:06X}'.format(next_identifier)] = random_generator.uniform(0.0, 600.0)
+        next_identifier += 1
+
+    receptions = []
+
+    for second in range(int(duration)):
+        for identifier in [identifier for identifier, departure in departures.items() if departure <= second]:
+            del departures[identifier]
+            departures['{:06X}'.format(next_identifier)] = second + random_generator.uniform(60.0, 600.0)
+            next_identifier += 1
+
+        identifiers = [identifier for identifier in departures for _ in range(message_rate)]
+        random_generator.shuffle(identifiers)
+        receptions.append(identifiers)
+
+    return receptions
+
+
+def run_dict(receptions):
+    """
+    :return: (list of sets of tracked identifiers after every second, time of receptions, time of ticks) tuple
+    """
+
+    aircraft = {}
+    tracked = []
+    reception_time = 0.0
+    tick_time = 0.0
+
+    for second, identifiers in enumerate(receptions):
+        start_time = time.perf_counter()
+        for index, identifier in enumerate(identifiers):
+            if identifier not in aircraft.keys():
+                aircraft[identifier] = DictAircraftInfo()
+                aircraft[identifier].identifier = identifier
+            aircraft[identifier].last_seen = second + index / len(identifiers)
+        reception_time += time.perf_counter() - start_time
+
+        # data processor
+        start_time = time.perf_counter()
+        current_time = second + 1.0
+        for identifier in sorted(aircraft.keys()):
+            current_aircraft = aircraft[identifier]
+            if current_time - current_aircraft.last_seen > MAX_AGE:
+                del aircraft[identifier]
+        tick_time += time.perf_counter() - start_time
+
+        tracked.append(set(aircraft.keys()))
+
+    return tracked, reception_time, tick_time
+
+
+def run_table(receptions, max_size):
+    """
+    :return: (list of sets of tracked identifiers after every second, time of receptions, time of ticks, table) tuple
+    """
+
+    aircraft = AircraftTable(max_age=MAX_AGE, max_size=max_size)
+    tracked = []
+    reception_time = 0.0
+    tick_time = 0.0
+
+    for second, identifiers in enumerate(receptions):
+        start_time = time.perf_counter()
+        for index, identifier in enumerate(identifiers):
+            aircraft.touch(identifier, second + index / len(identifiers))
+        reception_time += time.perf_counter() - start_time
+
+        # data processor
+        start_time = time.perf_counter()
+        aircraft.remove_stale(second + 1.0)
+        for current_aircraft in list(aircraft):
+            pass
+        tick_time += time.perf_counter() - start_time
+
+        tracked.append(set(current_aircraft.identifier for current_aircraft in aircraft))
+
+    return tracked, reception_time, tick_time, aircraft
+
+
+def measure_memory(record_class, count):
+    """
+    :return: Memory in bytes per record
+    """
+
+    tracemalloc.start()
+    records = [record_class() for _ in range(count)]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return memory / len(records)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for aircraft table of FLARM transformation.')
+    arg_parser.add_argument('--aircraft-counts', dest='aircraft_counts', default='100,1000,5000', help='comma-separated numbers of aircraft in airspace at the same time')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=120.0, help='simulated time in seconds')
+    arg_parser.add_argument('--message-rate', dest='message_rate', type=int, default=2, help='messages per second and aircraft')
+    arg_parser.add_argument('--max-aircraft', dest='max_aircraft', type=int, default=1000, help='size limit of table')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=1, help='seed of simulated traffic')
+    args = arg_parser.parse_args()
+
+    print('memory per record: {:.0f} bytes (dictionary), {:.0f} bytes (__slots__)'.format(measure_memory(DictAircraftInfo, 10000), measure_memory(AircraftInfo, 10000)))
+    print('{:>8} {:>23} {:>23} {:>12} {:>10}'.format('aircraft', 'dict rx/tick [ms/s]', 'table rx/tick [ms/s]', 'max tracked', 'evicted'))
+
+    is_ok = True
+
+    for aircraft_count in [int(aircraft_count) for aircraft_count in args.aircraft_counts.split(',')]:
+        receptions = generate_receptions(aircraft_count, args.duration, args.message_rate, random.Random(args.seed))
+
+        dict_tracked, dict_reception_time, dict_tick_time = run_dict(receptions)
+        table_tracked, table_reception_time, table_tick_time, _ = run_table(receptions, 0)
+
+        # without size limit, expiry must track the same aircraft
+        if table_tracked != dict_tracked:
+            print('tracked aircraft of table differ from dictionary ({:d} aircraft)'.format(aircraft_count))
+            is_ok = False
+
+        # with size limit, only most recently seen aircraft are kept
+        limited_tracked, _, _, limited_table = run_table(receptions, args.max_aircraft)
+        max_tracked = max(len(tracked) for tracked in limited_tracked)
+        if max_tracked > args.max_aircraft:
+            print('table exceeds size limit ({:d} > {:d})'.format(max_tracked, args.max_aircraft))
+            is_ok = False
+
+        last_seen = {}
+        for second, identifiers in enumerate(receptions):
+            for index, identifier in enumerate(identifiers):
+                last_seen[identifier] = second + index / len(identifiers)
+        current_identifiers = [identifier for identifier in last_seen if len(receptions) - last_seen[identifier] <= MAX_AGE]
+        expected = set(sorted(current_identifiers, key=last_seen.get)[-args.max_aircraft:])
+        if limited_tracked[-1] != expected:
+            print('table did not evict least recently seen aircraft ({:d} aircraft)'.format(aircraft_count))
+            is_ok = False
+
+        print('{:>8d} {:>23} {:>23} {:>12d} {:>10d}'.format(aircraft_count, '{:.3f} / {:.3f}'.format(dict_reception_time * 1000.0 / args.duration, dict_tick_time * 1000.0 / args.duration), '{:.3f} / {:.3f}'.format(table_reception_time * 1000.0 / args.duration, table_tick_time * 1000.0 / args.duration), max_tracked, limited_table.eviction_count))
+
+    sys.exit(0 if is_ok else 1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""benchmark_data_hub_batching.py: Measures data hub throughput (items/s) with per-item and batched transport for the
+selected data hub backend."""
+
+import argparse
+from multiprocessing import Process, Queue
+from threading import Thread
+import time
+
+from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_worker import DataHubWorker
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+SBS1_MESSAGE = 'MSG,3,111,11111,3C49CC,111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,37000,,,51.22734,6.80611,,,0,0,0,0'
+
+
+class BenchmarkSink(object):
+    """
+    Minimal output module stand-in that only provides the interface required by DataHubWorker.
+    """
+
+    def __init__(self, name, content_types):
+        self.name = name
+        self._content_types = content_types
+        self.data_input_queue = None
+        self.received_count = 0
+
+    def set_data_input_queue(self, data_input_queue):
+        self.data_input_queue = data_input_queue
+
+    def get_desired_content_types(self):
+        return self._content_types
+
+    def drain(self):
+        while True:
+            data_hub_items = self.data_input_queue.get()
+            if data_hub_items is None:
+                break
+
+            self.received_count += len(data_hub_items)
+
+
+def produce(data_hub, item_count, chunk_size):
+    if chunk_size <= 1:
+        for i in range(item_count):
+            data_hub.put(DataHubItem('sbs1', SBS1_MESSAGE))
+    else:
+        for i in range(0, item_count, chunk_size):
+            data_hub.put([DataHubItem('sbs1', SBS1_MESSAGE) for j in range(min(chunk_size, item_count - i))])
+
+
+def run_benchmark(item_count, chunk_size, batch_size, flush_interval, subscriber_count, backend='queue'):
+    data_hub = Queue()
+
+    data_hub_worker = DataHubWorker(data_hub, batch_size=batch_size, flush_interval=flush_interval, backend=backend)
+    sinks = [BenchmarkSink('BenchmarkSink-{:d}'.format(i), ['sbs1']) for i in range(subscriber_count)]
+    for sink in sinks:
+        data_hub_worker.add_output_module(sink)
+
+    data_hub_worker.start()
+
+    producer = Process(target=produce, args=(data_hub, item_count, chunk_size))
+    drain_threads = [Thread(target=sink.drain) for sink in sinks]
+
+    start_time = time.time()
+    producer.start()
+    for drain_thread in drain_threads:
+        drain_thread.start()
+
+    # stop data hub worker after all items have been sent
+    producer.join()
+    data_hub.put(None)
+
+    # wait until all subscribers have received poison pill
+    for drain_thread in drain_threads:
+        drain_thread.join()
+
+    duration = time.time() - start_time
+
+    data_hub_worker.join()
+
+    return sum(sink.received_count for sink in sinks) / len(sinks) / duration
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for batched data hub transport.')
+    arg_parser.add_argument('--items', dest='items', type=int, default=50000, help='number of items to send')
+    arg_parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=32, help='number of items per input chunk')
+    arg_parser.add_argument('--batch-size', dest='batch_size', type=int, default=64, help='data hub batch size')
+    arg_parser.add_argument('--flush-interval', dest='flush_interval', type=float, default=0.02, help='data hub flush interval')
+    arg_parser.add_argument('--subscribers', dest='subscribers', type=int, default=2, help='number of subscribers')
+    arg_parser.add_argument('--backend', dest='backend', choices=['queue', 'shared_memory'], default='queue', help='data hub backend')
+    args = arg_parser.parse_args()
+
+    # per-item transport (equivalent to previous behavior)
+    items_per_second = run_benchmark(args.items, 1, 1, 0.0, args.subscribers, args.backend)
+    print('per-item: {:.0f} items/s'.format(items_per_second))
+
+    # batched transport
+    items_per_second = run_benchmark(args.items, args.chunk_size, args.batch_size, args.flush_interval, args.subscribers, args.backend)
+    print('batched (chunk={:d}, batch={:d}, flush={:.3f} s): {:.0f} items/s'.format(args.chunk_size, args.batch_size, args.flush_interval, items_per_second))
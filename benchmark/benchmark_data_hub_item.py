@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""benchmark_data_hub_item.py: Compares pickled size and pickle/unpickle throughput of the compact DataHubItem with the
+previous plain object implementation."""
+
+import argparse
+import pickle
+import time
+import timeit
+
+from data_hub.data_hub_item import DataHubItem
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+SBS1_MESSAGE = 'MSG,3,111,11111,{:06X},111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,37000,,,51.22734,6.80611,,,0,0,0,0'
+
+
+class LegacyDataHubItem(object):
+    """
+    Previous DataHubItem implementation (plain object with name-mangled attributes).
+    """
+
+    def __init__(self, content_type, content_data):
+        self.__content_type = content_type
+        self.__content_data = content_data
+
+    def get_content_type(self):
+        return self.__content_type
+
+    def get_content_data(self):
+        return self.__content_data
+
+
+def measure(name, items, repeat):
+    pickled_item = pickle.dumps(items[0], pickle.HIGHEST_PROTOCOL)
+    pickled_batch = pickle.dumps(items, pickle.HIGHEST_PROTOCOL)
+
+    duration = min(timeit.repeat(lambda: pickle.loads(pickle.dumps(items, pickle.HIGHEST_PROTOCOL)), number=1, repeat=repeat))
+
+    print('{:8s}: single item {:4d} bytes, batch of {:d} items {:6d} bytes ({:.1f} bytes/item), {:.0f} items/s (pickle + unpickle)'.format(name, len(pickled_item), len(items), len(pickled_batch), len(pickled_batch) / len(items), len(items) / duration))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for DataHubItem representation.')
+    arg_parser.add_argument('--batch-size', dest='batch_size', type=int, default=64, help='number of items per batch')
+    arg_parser.add_argument('--repeat', dest='repeat', type=int, default=200, help='number of repetitions')
+    args = arg_parser.parse_args()
+
+    measure('legacy', [LegacyDataHubItem('sbs1', SBS1_MESSAGE.format(i)) for i in range(args.batch_size)], args.repeat)
+    measure('compact', [DataHubItem('sbs1', SBS1_MESSAGE.format(i)) for i in range(args.batch_size)], args.repeat)
+    measure('stamped', [DataHubItem('sbs1', SBS1_MESSAGE.format(i), time.time()) for i in range(args.batch_size)], args.repeat)
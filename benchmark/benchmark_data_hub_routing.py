@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""benchmark_data_hub_routing.py: Compares per-item routing cost of a linear scan over all subscribers with the
+content type index of DataHubRoutingTable."""
+
+import argparse
+import random
+import timeit
+
+from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_routing_table import DataHubRoutingTable
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+CONTENT_TYPES = ['nmea', 'sbs1', 'ogn', 'flarm', 'test']
+
+
+def generate_subscriptions(subscriber_count):
+    # every subscriber requests one or two content types, every tenth subscriber requests all content types
+    random.seed(subscriber_count)
+
+    subscriptions = []
+    for i in range(subscriber_count):
+        if i % 10 == 0:
+            subscriptions.append(['ANY'])
+        else:
+            subscriptions.append(random.sample(CONTENT_TYPES, random.randint(1, 2)))
+
+    return subscriptions
+
+
+def route_linear_scan(data_hub_items, subscriptions):
+    output_batches = [[] for content_types in subscriptions]
+    for data_hub_item in data_hub_items:
+        for index, content_types in enumerate(subscriptions):
+            if data_hub_item.get_content_type() in content_types or 'ANY' in content_types:
+                output_batches[index].append(data_hub_item)
+
+    return output_batches
+
+
+def route_routing_table(data_hub_items, routing_table, subscriber_count):
+    output_batches = [[] for index in range(subscriber_count)]
+    for data_hub_item in data_hub_items:
+        for index in routing_table.get_subscribers(data_hub_item.get_content_type()):
+            output_batches[index].append(data_hub_item)
+
+    return output_batches
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Microbenchmark for data hub routing.')
+    arg_parser.add_argument('--items', dest='items', type=int, default=1000, help='number of items per batch')
+    arg_parser.add_argument('--repeat', dest='repeat', type=int, default=20, help='number of repetitions')
+    args = arg_parser.parse_args()
+
+    data_hub_items = [DataHubItem(CONTENT_TYPES[i % len(CONTENT_TYPES)], 'data') for i in range(args.items)]
+
+    for subscriber_count in [10, 50, 100]:
+        subscriptions = generate_subscriptions(subscriber_count)
+
+        routing_table = DataHubRoutingTable()
+        for index, content_types in enumerate(subscriptions):
+            routing_table.add_subscriber(index, content_types)
+
+        # make sure both implementations route identically
+        assert route_linear_scan(data_hub_items, subscriptions) == route_routing_table(data_hub_items, routing_table, subscriber_count)
+
+        linear_scan_duration = min(timeit.repeat(lambda: route_linear_scan(data_hub_items, subscriptions), number=1, repeat=args.repeat))
+        routing_table_duration = min(timeit.repeat(lambda: route_routing_table(data_hub_items, routing_table, subscriber_count), number=1, repeat=args.repeat))
+
+        print('{:3d} subscribers: linear scan {:.2f} us/item, routing table {:.2f} us/item'.format(subscriber_count, linear_scan_duration / args.items * 1e6, routing_table_duration / args.items * 1e6))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""benchmark_extrapolation.py: Measures the error of relative target positions in generated PFLAA messages with and
+without dead reckoning to emission time. Tracks of own aircraft and targets (straight, turning, and climbing in
+circles) are sampled like they are received (SBS1 twice per second, OGN beacons with a delay of several seconds, GNSS
+once per second), and relative positions of messages emitted once per second are compared with the true relative
+positions at emission time. A recorded target track can be given as CSV file (time in seconds, latitude, longitude,
+altitude in feet, track in degrees, ground speed in knots, vertical speed in feet per minute)."""
+
+import argparse
+import csv
+import math
+import random
+import sys
+
+import utils.calculation
+import utils.conversion
+from transformation.transformation_sbs1ognnmea_flarm import GnssStatus, generate_flarm_messages
+from utils.aircraft_table import AircraftInfo
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+OWN_LATITUDE = 51.2
+OWN_LONGITUDE = 6.8
+OWN_ALTITUDE_FT = 2500.0
+
+
+class SimulatedTrack(object):
+    """
+    Track with constant ground speed, turn rate, and vertical speed.
+    """
+
+    def __init__(self, latitude, longitude, altitude, course, h_speed, turn_rate=0.0, v_speed=0.0):
+        """
+        :param altitude: Altitude in feet at time 0
+        :param course: Track in degrees at time 0
+        :param h_speed: Ground speed in knots
+        :param turn_rate: Turn rate in degrees per second
+        :param v_speed: Vertical speed in feet per minute
+        """
+
+        self._latitude = latitude
+        self._longitude = longitude
+        self._altitude = altitude
+        self._course = course
+        self._h_speed = h_speed
+        self._turn_rate = turn_rate
+        self._v_speed = v_speed
+
+    def get_state(self, t):
+        """
+        :return: (latitude, longitude, altitude, course, ground speed, vertical speed) tuple at time t
+        """
+
+        speed_mps = utils.conversion.knots_to_mps(self._h_speed)
+        course = self._course + self._turn_rate * t
+
+        if self._turn_rate == 0.0:
+            north_m = speed_mps * t * math.cos(math.radians(self._course))
+            east_m = speed_mps * t * math.sin(math.radians(self._course))
+        else:
+            # circle with radius v / omega
+            radius_m = speed_mps / math.radians(abs(self._turn_rate))
+            sign = 1.0 if self._turn_rate > 0.0 else -1.0
+            north_m = sign * radius_m * (math.sin(math.radians(course)) - math.sin(math.radians(self._course)))
+            east_m = -sign * radius_m * (math.cos(math.radians(course)) - math.cos(math.radians(self._course)))
+
+        latitude, longitude = offset_position(self._latitude, self._longitude, north_m, east_m)
+
+        return latitude, longitude, self._altitude + self._v_speed * t / 60.0, course % 360.0, self._h_speed, self._v_speed
+
+
+class RecordedTrack(object):
+    """
+    Track from CSV file, linearly interpolated between records.
+    """
+
+    def __init__(self, path):
+        with open(path) as csv_file:
+            self._records = [[float(value) for value in row[:7]] for row in csv.reader(csv_file) if row and not row[0].startswith('#')]
+
+        start_time = self._records[0][0]
+        for record in self._records:
+            record[0] -= start_time
+
+        self.duration = self._records[-1][0]
+
+    def get_state(self, t):
+        for index in range(1, len(self._records)):
+            if self._records[index][0] >= t:
+                break
+
+        t0, *state0 = self._records[index - 1]
+        t1, *state1 = self._records[index]
+        ratio = min(max((t - t0) / (t1 - t0), 0.0), 1.0) if t1 > t0 else 0.0
+
+        state = [value0 + (value1 - value0) * ratio for value0, value1 in zip(state0, state1)]
+
+        # interpolate track on shortest way
+        state[3] = (state0[3] + ((state1[3] - state0[3] + 180.0) % 360.0 - 180.0) * ratio) % 360.0
+
+        return tuple(state)
+
+
+def offset_position(latitude, longitude, north_m, east_m):
+    return (latitude + math.degrees(north_m / utils.calculation.EARTH_RADIUS_M),
+            longitude + math.degrees(east_m / (utils.calculation.EARTH_RADIUS_M * math.cos(math.radians(latitude)))))
+
+
+def relative_position(own_state, target_state):
+    """
+    :return: (north, east) tuple in meters of target relative to own aircraft
+    """
+
+    north_m = math.radians(target_state[0] - own_state[0]) * utils.calculation.EARTH_RADIUS_M
+    east_m = math.radians(target_state[1] - own_state[1]) * utils.calculation.EARTH_RADIUS_M * math.cos(math.radians(own_state[0]))
+
+    return north_m, east_m
+
+
+def measure_errors(own_track, target_track, duration, report_interval, report_delay, max_extrapolation_time, random_generator):
+    """
+    :param report_interval: Interval in seconds of target position reports
+    :param report_delay: Maximum delay in seconds between time of position and reception (uniformly distributed)
+    :return: List of horizontal errors in meters of relative positions in emitted PFLAA messages
+    """
+
+    gnss_status = GnssStatus()
+    aircraft = AircraftInfo()
+    aircraft.identifier = 'DDA5BA'
+
+    errors = []
+
+    # events: (time, type)
+    events = [(t * 1.0 + 0.5, 'gnss') for t in range(int(duration))]
+    events += [(t * 1.0 + 0.999, 'emission') for t in range(int(duration))]
+
+    report_count = int(duration / report_interval)
+    for report in range(report_count):
+        position_time = report * report_interval
+        events.append((position_time + random_generator.uniform(0.0, report_delay), 'target', position_time))
+
+    for event in sorted(events):
+        event_time = event[0]
+
+        if event[1] == 'gnss':
+            # GNSS fix of own aircraft (NMEA sentences arrive shortly after time of fix)
+            latitude, longitude, altitude, course, h_speed, _ = own_track.get_state(event_time - 0.1)
+            gnss_status.latitude, gnss_status.longitude, gnss_status.altitude = latitude, longitude, altitude
+            gnss_status.course, gnss_status.h_speed = course, h_speed
+            gnss_status.position_time = event_time
+
+        elif event[1] == 'target':
+            latitude, longitude, altitude, course, h_speed, v_speed = target_track.get_state(event[2])
+
+            # reports may be received out of order, only newer positions are used
+            if aircraft.position_time is not None and aircraft.position_time >= event[2]:
+                continue
+
+            aircraft.latitude, aircraft.longitude, aircraft.altitude = latitude, longitude, altitude
+            aircraft.course, aircraft.h_speed, aircraft.v_speed = course, h_speed, v_speed
+            aircraft.position_time = event[2]
+
+        elif gnss_status.latitude is not None and aircraft.latitude is not None:
+            flarm_messages = generate_flarm_messages(gnss_status, aircraft, emission_time=event_time, max_extrapolation_time=max_extrapolation_time)
+            if not flarm_messages:
+                continue
+
+            # $PFLAA,<AlarmLevel>,<RelativeNorth>,<RelativeEast>,...
+            fields = flarm_messages[0].split(',')
+            true_north_m, true_east_m = relative_position(own_track.get_state(event_time), target_track.get_state(event_time))
+
+            errors.append(math.hypot(float(fields[2]) - true_north_m, float(fields[3]) - true_east_m))
+
+    return errors
+
+
+def percentile(sorted_values, percent):
+    return sorted_values[min(int(len(sorted_values) * percent / 100.0), len(sorted_values) - 1)]
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for latency compensation of FLARM traffic positions.')
+    arg_parser.add_argument('--track', dest='track', help='CSV file of recorded target track')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=300.0, help='duration in seconds of simulated tracks')
+    arg_parser.add_argument('--max-extrapolation-time', dest='max_extrapolation_time', type=float, default=5.0, help='maximum time in seconds positions are dead-reckoned')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=1, help='seed of random delays')
+    args = arg_parser.parse_args()
+
+    # own aircraft flies straight at 100 kt
+    own_track = SimulatedTrack(OWN_LATITUDE, OWN_LONGITUDE, OWN_ALTITUDE_FT, 45.0, 100.0)
+    start_latitude, start_longitude = offset_position(OWN_LATITUDE, OWN_LONGITUDE, 3000.0, -2000.0)
+
+    scenarios = [
+        # name, target track, report interval, maximum report delay
+        ('SBS1 straight 120 kt', SimulatedTrack(start_latitude, start_longitude, 3500.0, 135.0, 120.0), 0.5, 0.2),
+        ('SBS1 standard rate turn', SimulatedTrack(start_latitude, start_longitude, 3500.0, 135.0, 120.0, turn_rate=3.0, v_speed=-500.0), 0.5, 0.2),
+        ('OGN straight 120 kt', SimulatedTrack(start_latitude, start_longitude, 3500.0, 135.0, 120.0), 1.0, 4.0),
+        ('OGN glider circling', SimulatedTrack(start_latitude, start_longitude, 3500.0, 0.0, 50.0, turn_rate=-18.0, v_speed=300.0), 1.0, 4.0),
+    ]
+
+    duration = args.duration
+    if args.track:
+        recorded_track = RecordedTrack(args.track)
+        duration = recorded_track.duration
+        scenarios = [('recorded track (SBS1)', recorded_track, 0.5, 0.2), ('recorded track (OGN)', recorded_track, 1.0, 4.0)]
+
+    print('{:<26} {:>24} {:>24}'.format('horizontal error [m]', 'without (mean/p95/max)', 'with (mean/p95/max)'))
+
+    is_improved = True
+
+    for name, target_track, report_interval, report_delay in scenarios:
+        results = []
+
+        for max_extrapolation_time in (0.0, args.max_extrapolation_time):
+            errors = sorted(measure_errors(own_track, target_track, duration, report_interval, report_delay, max_extrapolation_time, random.Random(args.seed)))
+            results.append((sum(errors) / len(errors), percentile(errors, 95.0), errors[-1]))
+
+        print('{:<26} {:>24} {:>24}'.format(name, *['{:.0f} / {:.0f} / {:.0f}'.format(*result) for result in results]))
+
+        # compensation must not increase mean error
+        if results[1][0] > results[0][0]:
+            is_improved = False
+
+    sys.exit(0 if is_improved else 1)
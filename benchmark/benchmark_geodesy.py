@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""benchmark_geodesy.py: Checks all geodesy backends (utils.geodesy, and vectorized versions in
+utils.calculation_numpy if NumPy is available) against golden vectors of the inverse geodesic problem on the WGS-84
+ellipsoid, reports the worst errors of distance, bearings, and relative FLARM position (north, east) per backend, and
+measures the time per calculation. Fails if a backend exceeds its error bound within FLARM range (+/- 32 km)."""
+
+import argparse
+import math
+import random
+import sys
+import time
+
+from utils.geodesy import GEODESY_BACKENDS, GEOGRAPHICLIB_AVAILABLE
+import utils.calculation
+
+try:
+    import numpy
+    import utils.calculation_numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# golden vectors: lat1, lon1, lat2, lon2 (degrees), distance (meters), initial bearing, final bearing (degrees)
+# (calculated with geographiclib, accurate to nanometers; includes Vincenty's test line Flinders Peak - Buninyong)
+GOLDEN_VECTORS = [
+    (51.2, 6.8, 51.200089886, 6.8, 10.0000, 0.0000000, 0.0000000),
+    (51.2, 6.8, 51.206355455, 6.810118027, 1000.0000, 45.0000011, 45.0078868),
+    (51.2, 6.8, 51.168209511, 6.85054839, 5000.0000, 134.9999993, 135.0393848),
+    (51.2, 6.8, 51.104562632, 6.648563142, 15000.0000, 224.9999998, 224.8820583),
+    (51.2, 6.8, 51.343141495, 6.402275185, 32000.0000, 300.0000000, 299.6897261),
+    (0.0, -78.5, 0.0, -78.320336943, 20000.0000, 90.0000000, 90.0000000),
+    (0.05, 30.0, -0.221310832, 30.0, 30000.0000, 180.0000000, 180.0000000),
+    (-33.9, 151.2, -33.678024739, 151.246814467, 25000.0000, 10.0000001, 9.9739648),
+    (-37.95103342, 144.42486789, -37.65282114, 143.92649554, 54972.2705, 306.8681600, 307.1736314),
+    (47.5, -122.3, 47.4992135, -122.724716834, 32000.0000, 270.0000001, 269.6868673),
+    (64.1, -21.9, 64.242408154, -21.328681773, 32000.0000, 60.0000001, 60.5142448),
+    (78.2, 15.6, 78.431934169, 14.930200019, 30000.0000, 330.0000000, 329.3440771),
+    (69.7, 179.95, 69.699242389, -179.533682273, 20000.0000, 89.9999999, 90.4842477),
+    (-0.01, -179.99, -0.214634947, 179.806733467, 32000.0000, 225.0000001, 225.0003985),
+    (51.2, 6.8, 51.191254868, 8.230527578, 100000.0000, 90.0000000, 91.1148189),
+    (51.2, 6.8, 60.181870967, 6.8, 1000000.0000, 0.0000000, 0.0000000),
+]
+
+# maximum distance in meters of FLARM range (relative positions are limited to +/- 32767 m)
+FLARM_RANGE_M = 32768.0
+
+# error bounds in meters of relative positions within FLARM range
+ERROR_BOUNDS_M = {
+    'vincenty': 0.001,
+    'karney': 0.001,
+    'spherical': 200.0,
+    'flat': 5.0,
+}
+
+
+def bearing_difference(bearing1, bearing2):
+    return abs((bearing1 - bearing2 + 180.0) % 360.0 - 180.0)
+
+
+def calculate_errors(results):
+    """
+    :param results: List of (distance, initial bearing, final bearing) tuples in order of golden vectors
+    :return: Dictionary with worst errors within and beyond FLARM range (distance in meters, bearings in degrees,
+             position as offset of relative north/east position in meters)
+    """
+
+    errors = {'distance': 0.0, 'initial_bearing': 0.0, 'final_bearing': 0.0, 'position': 0.0, 'position_beyond_range': 0.0}
+
+    for golden_vector, result in zip(GOLDEN_VECTORS, results):
+        distance_m, initial_bearing, final_bearing = golden_vector[4:]
+
+        north_m = utils.calculation.distance_north(initial_bearing, distance_m)
+        east_m = utils.calculation.distance_east(initial_bearing, distance_m)
+        position_error = math.hypot(utils.calculation.distance_north(result[1], result[0]) - north_m, utils.calculation.distance_east(result[1], result[0]) - east_m)
+
+        if distance_m > FLARM_RANGE_M:
+            errors['position_beyond_range'] = max(errors['position_beyond_range'], position_error)
+            continue
+
+        errors['distance'] = max(errors['distance'], abs(result[0] - distance_m))
+        errors['initial_bearing'] = max(errors['initial_bearing'], bearing_difference(result[1], initial_bearing))
+        errors['final_bearing'] = max(errors['final_bearing'], bearing_difference(result[2], final_bearing))
+        errors['position'] = max(errors['position'], position_error)
+
+    return errors
+
+
+def measure_time(inverse_function, pairs, duration):
+    """
+    :return: Mean time in seconds per calculation
+    """
+
+    calculation_count = 0
+    start_time = time.perf_counter()
+
+    while time.perf_counter() - start_time < duration:
+        for lat1, lon1, lat2, lon2 in pairs:
+            inverse_function(lat1, lon1, lat2, lon2)
+        calculation_count += len(pairs)
+
+    return (time.perf_counter() - start_time) / calculation_count
+
+
+def measure_vectorized_time(inverse_function, pairs, duration):
+    """
+    :return: Mean time in seconds per location of one vectorized calculation of all pairs (same first location)
+    """
+
+    latitudes = numpy.array([pair[2] for pair in pairs])
+    longitudes = numpy.array([pair[3] for pair in pairs])
+
+    calculation_count = 0
+    start_time = time.perf_counter()
+
+    while time.perf_counter() - start_time < duration:
+        inverse_function(pairs[0][0], pairs[0][1], latitudes, longitudes)
+        calculation_count += len(pairs)
+
+    return (time.perf_counter() - start_time) / calculation_count
+
+
+def generate_pairs(count, random_generator):
+    """
+    :return: List of (lat1, lon1, lat2, lon2) tuples of traffic within FLARM range around one own position
+    """
+
+    pairs = []
+
+    for _ in range(count):
+        distance_m = FLARM_RANGE_M * math.sqrt(random_generator.random())
+        bearing_rad = random_generator.uniform(0.0, 2.0 * math.pi)
+        pairs.append((51.2, 6.8, 51.2 + math.degrees(distance_m * math.cos(bearing_rad) / 6371000.0), 6.8 + math.degrees(distance_m * math.sin(bearing_rad) / 6371000.0 / math.cos(math.radians(51.2)))))
+
+    return pairs
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Accuracy and speed of geodesy backends.')
+    arg_parser.add_argument('--aircraft-count', dest='aircraft_count', type=int, default=1000, help='number of locations of speed measurement')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=1.0, help='measurement time in seconds per backend')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=1, help='seed of random locations')
+    args = arg_parser.parse_args()
+
+    # backends (name, inverse function, is vectorized)
+    backends = [(name, GEODESY_BACKENDS[name], False) for name in sorted(GEODESY_BACKENDS) if name != 'karney' or GEOGRAPHICLIB_AVAILABLE]
+    if NUMPY_AVAILABLE:
+        backends += [(name, utils.calculation_numpy.GEODESY_BACKENDS[name], True) for name in sorted(utils.calculation_numpy.GEODESY_BACKENDS)]
+
+    pairs = generate_pairs(args.aircraft_count, random.Random(args.seed))
+
+    print('{:<20} {:>14} {:>16} {:>14} {:>15} {:>19} {:>10}'.format('backend', 'distance [m]', 'init. bear. [deg]', 'fin. bear. [deg]', 'position [m]', 'beyond range [m]', 'time [us]'))
+
+    is_accurate = True
+
+    for name, inverse_function, is_vectorized in backends:
+        if is_vectorized:
+            results = list(zip(*[array.tolist() for array in inverse_function(numpy.array([vector[0] for vector in GOLDEN_VECTORS]), numpy.array([vector[1] for vector in GOLDEN_VECTORS]), numpy.array([vector[2] for vector in GOLDEN_VECTORS]), numpy.array([vector[3] for vector in GOLDEN_VECTORS]))]))
+            calculation_time = measure_vectorized_time(inverse_function, pairs, args.duration)
+        else:
+            results = [inverse_function(*vector[:4]) for vector in GOLDEN_VECTORS]
+            calculation_time = measure_time(inverse_function, pairs, args.duration)
+
+        errors = calculate_errors(results)
+
+        print('{:<20} {:>14.6f} {:>16.7f} {:>14.7f} {:>15.6f} {:>19.3f} {:>10.2f}'.format(name + (' (numpy)' if is_vectorized else ''), errors['distance'], errors['initial_bearing'], errors['final_bearing'], errors['position'], errors['position_beyond_range'], calculation_time * 1e6))
+
+        if errors['position'] > ERROR_BOUNDS_M[name]:
+            print('{} exceeds error bound of {} m within FLARM range'.format(name, ERROR_BOUNDS_M[name]))
+            is_accurate = False
+
+    sys.exit(0 if is_accurate else 1)
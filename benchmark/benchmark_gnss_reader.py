@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+"""benchmark_gnss_reader.py: Checks the serial GNSS input module with a simulated receiver on a pseudo terminal. The
+receiver sends valid, filtered, corrupted, and split sentences, is unplugged (pseudo terminal is closed), and plugged in
+again (new pseudo terminal behind the same device path). Exits with 1 if sentences are lost or forwarded wrongly, or if
+re-attaching takes too long."""
+
+import argparse
+import asyncio
+import functools
+import operator
+import os
+import pty
+import sys
+import tempfile
+import time
+
+from input.input_serial_gnss import InputSerialGnss
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+def nmea_sentence(body, checksum_offset=0):
+    checksum = functools.reduce(operator.xor, body.encode(), 0) ^ checksum_offset
+    return '${}*{:02X}\r\n'.format(body, checksum).encode()
+
+
+class CollectingDataHub(object):
+    """
+    Stand-in for data hub that stores all items together with the time they were handed over.
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def put(self, data_hub_items):
+        receive_time = time.time()
+        for data_hub_item in data_hub_items:
+            self.items.append((receive_time, data_hub_item.get_content_data()))
+
+    def close(self):
+        pass
+
+
+class SimulatedReceiver(object):
+    """
+    Pseudo terminal whose slave is reachable via a stable path (like /dev/serial/by-id/...), so that plugging the
+    receiver in again makes a new pseudo terminal available under the same path.
+    """
+
+    def __init__(self, device_path):
+        self._device_path = device_path
+        self._master = None
+
+    def plug_in(self):
+        self._master, slave = pty.openpty()
+        slave_name = os.ttyname(slave)
+        os.close(slave)
+
+        if os.path.lexists(self._device_path):
+            os.remove(self._device_path)
+        os.symlink(slave_name, self._device_path)
+
+    def unplug(self):
+        os.remove(self._device_path)
+        os.close(self._master)
+        self._master = None
+
+    def send(self, data):
+        os.write(self._master, data)
+
+
+@asyncio.coroutine
+def run_check(loop, receiver, data_hub, burst_count, unplug_duration):
+    gga = nmea_sentence('GPGGA,120000.00,5112.000,N,00648.000,E,1,08,1.0,100.0,M,47.0,M,,')
+    gngga = nmea_sentence('GNGGA,120000.00,5112.000,N,00648.000,E,1,08,1.0,100.0,M,47.0,M,,')
+    rmc = nmea_sentence('GPRMC,120000.00,A,5112.000,N,00648.000,E,0.0,0.0,010115,,,A')
+    gsv = nmea_sentence('GPGSV,3,1,12,01,40,083,46,02,17,308,41,12,07,344,39,14,22,228,45')
+    corrupted = nmea_sentence('GPVTG,0.0,T,,M,0.0,N,0.0,K,A', checksum_offset=1)
+
+    # wait until module is attached (partial data of first read would otherwise be mixed with pseudo terminal setup)
+    yield from asyncio.sleep(1.0)
+
+    # every burst contains sentences to be forwarded, filtered, and dropped, and one sentence split across two writes
+    for i in range(burst_count):
+        receiver.send(gga + gsv + corrupted + rmc[:20])
+        yield from asyncio.sleep(0.01)
+        receiver.send(rmc[20:] + gngga)
+        yield from asyncio.sleep(0.04)
+
+    yield from asyncio.sleep(0.5)
+    sentences_before_unplug = len(data_hub.items)
+
+    receiver.unplug()
+    yield from asyncio.sleep(unplug_duration)
+
+    receiver.plug_in()
+    replug_time = time.time()
+
+    # send fixes (like a receiver does once per second) until first one is forwarded
+    while len(data_hub.items) == sentences_before_unplug and time.time() - replug_time < 10.0:
+        receiver.send(gga)
+        yield from asyncio.sleep(0.05)
+
+    reattach_duration = data_hub.items[-1][0] - replug_time if len(data_hub.items) > sentences_before_unplug else None
+
+    # sentences that are expected to be forwarded in every burst (in this order)
+    expected_contents = [sentence.decode().strip() for sentence in (gga, rmc, gngga)] * burst_count
+
+    return sentences_before_unplug, reattach_duration, expected_contents
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Check of serial GNSS input with simulated receiver.')
+    arg_parser.add_argument('--bursts', dest='bursts', type=int, default=20, help='number of sentence bursts before unplugging')
+    arg_parser.add_argument('--unplug-duration', dest='unplug_duration', type=float, default=2.0, help='time in seconds receiver is unplugged')
+    arg_parser.add_argument('--max-reattach-duration', dest='max_reattach_duration', type=float, default=1.5, help='maximum accepted time in seconds until first sentence after re-plugging')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        device_path = os.path.join(temp_directory, 'gnss')
+
+        receiver = SimulatedReceiver(device_path)
+        receiver.plug_in()
+
+        data_hub = CollectingDataHub()
+        input_serial_gnss = InputSerialGnss(data_hub, device_path, 9600)
+
+        loop = asyncio.get_event_loop()
+        module_task = loop.create_task(input_serial_gnss.run_async(loop))
+
+        sentences_before_unplug, reattach_duration, expected_contents = loop.run_until_complete(run_check(loop, receiver, data_hub, args.bursts, args.unplug_duration))
+
+        module_task.cancel()
+        try:
+            loop.run_until_complete(module_task)
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    counters = input_serial_gnss._statistics.get_snapshot()['counters'].get('nmea', {})
+    contents = [content for _, content in data_hub.items[:sentences_before_unplug]]
+
+    print('forwarded before unplugging: {:d} sentences ({:d} expected)'.format(sentences_before_unplug, len(expected_contents)))
+    print('dropped: {:d} checksum errors, {:d} filtered'.format(counters.get('checksum_errors', 0), counters.get('filtered', 0)))
+    print('re-attached after: {}'.format('{:.3f} s'.format(reattach_duration) if reattach_duration is not None else 'never'))
+
+    is_ok = (contents == expected_contents
+             and counters.get('checksum_errors', 0) == args.bursts
+             and counters.get('filtered', 0) == args.bursts
+             and reattach_duration is not None and reattach_duration <= args.max_reattach_duration)
+
+    sys.exit(0 if is_ok else 1)
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+
+"""benchmark_load.py: End-to-end load benchmark of FlightBox with local stand-ins for all external devices (dump1090
+SBS1 server, ogn-decode APRS client, GNSS serial device, and AirConnect clients). Results are written as JSON."""
+
+import argparse
+import datetime
+import functools
+import json
+import math
+import operator
+import os
+import pty
+import signal
+import socket
+import subprocess
+import sys
+from threading import Event, Lock, Thread
+import time
+import tty
+import urllib.request
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# own position of simulated GNSS receiver
+OWN_LATITUDE = 51.2
+OWN_LONGITUDE = 6.8
+
+# ports used by FlightBox modules
+SBS1_PORT = 30003
+OGN_PORT = 14580
+AIRCONNECT_PORT = 2000
+
+# clock ticks per second of /proc/<pid>/stat values
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def nmea_sentence(body):
+    return '${}*{:02X}\r\n'.format(body, functools.reduce(operator.xor, body.encode(), 0))
+
+
+def nmea_coordinate(degrees, digits):
+    minutes = (abs(degrees) - int(abs(degrees))) * 60.0
+    return '{:0{}d}{:07.4f}'.format(int(abs(degrees)), digits, minutes)
+
+
+def flarm_relative_coordinate(degrees, data_bit_width):
+    # position as reported by ogn-decode with receiver location 0 (only lower bits of FLARM position are transmitted)
+    period = 2 ** data_bit_width * 2 ** 7 / 1e7
+    return (degrees + period / 2.0) % period - period / 2.0
+
+
+def aprs_coordinate(degrees, digits):
+    minutes = (abs(degrees) - int(abs(degrees))) * 60.0
+    return '{:0{}d}{:05.2f}'.format(int(abs(degrees)), digits, minutes)
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+
+    return sorted_values[min(int(len(sorted_values) * percent / 100.0), len(sorted_values) - 1)]
+
+
+class RateSender(Thread):
+    """
+    Base class of all stand-ins that send messages at a configured rate (messages per second). Messages are generated
+    in small chunks every tick, like bursts of a real receiver.
+    """
+
+    def __init__(self, name, rate, tick=0.01):
+        super().__init__(name=name, daemon=True)
+
+        self.rate = rate
+        self.tick = tick
+        self.sent_count = 0
+        self.stop_event = Event()
+
+    def send(self, data):
+        raise NotImplementedError
+
+    def generate_messages(self, count):
+        raise NotImplementedError
+
+    def connect(self):
+        """
+        :return: True if sending can start, False if sender has been stopped before
+        """
+        return True
+
+    def run(self):
+        if not self.connect():
+            return
+
+        start_time = time.time()
+
+        while not self.stop_event.is_set():
+            # send all messages that are due until now
+            due_count = int((time.time() - start_time) * self.rate) - self.sent_count
+            if due_count > 0:
+                try:
+                    self.send(''.join(self.generate_messages(due_count)).encode())
+                except OSError:
+                    break
+
+                self.sent_count += due_count
+
+            time.sleep(self.tick)
+
+
+class Sbs1Server(RateSender):
+    """
+    Stand-in for dump1090: serves SBS1 position (MSG,3) and velocity (MSG,4) messages of simulated aircraft.
+    """
+
+    def __init__(self, rate, aircraft_count):
+        super().__init__('Sbs1Server', rate)
+
+        self._aircraft_count = aircraft_count
+        self._connection = None
+
+        self._server_socket = socket.socket()
+        self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server_socket.bind(('127.0.0.1', SBS1_PORT))
+        self._server_socket.listen(1)
+        self._server_socket.settimeout(1.0)
+
+    def connect(self):
+        while not self.stop_event.is_set():
+            try:
+                self._connection, address = self._server_socket.accept()
+                return True
+            except socket.timeout:
+                pass
+
+        return False
+
+    def send(self, data):
+        self._connection.sendall(data)
+
+    def generate_messages(self, count):
+        messages = []
+        now = datetime.datetime.utcnow()
+        date = now.strftime('%Y/%m/%d')
+        time_of_day = now.strftime('%H:%M:%S.%f')[:-3]
+
+        for i in range(self.sent_count, self.sent_count + count):
+            aircraft_index = (i // 2) % self._aircraft_count
+            icao_id = '{:06X}'.format(0x3C0000 + aircraft_index)
+
+            if i % 2 == 0:
+                # aircraft are distributed on circles around own position
+                angle = 2.0 * math.pi * aircraft_index / self._aircraft_count + time.time() / 600.0
+                distance = 0.02 + 0.1 * (aircraft_index % 10) / 10.0
+                latitude = OWN_LATITUDE + distance * math.cos(angle)
+                longitude = OWN_LONGITUDE + distance * math.sin(angle)
+                altitude = 1000 + 100 * (aircraft_index % 50)
+
+                messages.append('MSG,3,1,1,{},1,{},{},{},{},,{:d},,,{:.5f},{:.5f},,,0,0,0,0\r\n'.format(icao_id, date, time_of_day, date, time_of_day, altitude, latitude, longitude))
+            else:
+                messages.append('MSG,4,1,1,{},1,{},{},{},{},,,{:d},{:d},,,{:d},,0,0,0,0\r\n'.format(icao_id, date, time_of_day, date, time_of_day, 100 + aircraft_index % 100, (aircraft_index * 7) % 360, 0))
+
+        return messages
+
+    def close(self):
+        self.stop_event.set()
+
+        if self._connection:
+            self._connection.close()
+        self._server_socket.close()
+
+
+class OgnClient(RateSender):
+    """
+    Stand-in for ogn-decode: logs in to the APRS server of FlightBox and sends beacons of simulated FLARM devices.
+    """
+
+    def __init__(self, rate, aircraft_count):
+        super().__init__('OgnClient', rate)
+
+        self._aircraft_count = aircraft_count
+        self._socket = None
+
+    def connect(self):
+        while not self.stop_event.is_set():
+            try:
+                self._socket = socket.create_connection(('127.0.0.1', OGN_PORT))
+                self._socket.sendall(b'user BENCHMARK pass 12345 vers ogn-decode 0.2.2\r\n')
+                return True
+            except OSError:
+                time.sleep(0.5)
+
+        return False
+
+    def send(self, data):
+        self._socket.sendall(data)
+
+    def generate_messages(self, count):
+        messages = []
+        time_of_day = datetime.datetime.utcnow().strftime('%H%M%S')
+
+        for i in range(self.sent_count, self.sent_count + count):
+            aircraft_index = i % self._aircraft_count
+            flarm_id = '{:06X}'.format(0xDD0000 + aircraft_index)
+
+            # aircraft are distributed around own position, positions are relative FLARM coordinates (see
+            # handle_ogn_data)
+            latitude = flarm_relative_coordinate(OWN_LATITUDE + 0.01 * (aircraft_index % 10 - 5), 19)
+            longitude = flarm_relative_coordinate(OWN_LONGITUDE + 0.01 * (aircraft_index % 30 // 10 - 1), 20)
+
+            messages.append('FLR{}>APRS,qAR:/{}h{}{}/{}{}\'{:03d}/{:03d}/A={:06d} !W57! id06{} -039fpm +0.1rot 8.2dB 1e +4.8kHz gps3x3\r\n'.format(flarm_id, time_of_day, aprs_coordinate(latitude, 2), 'N' if latitude >= 0 else 'S', aprs_coordinate(longitude, 3), 'E' if longitude >= 0 else 'W', (aircraft_index * 11) % 360, 60 + aircraft_index % 40, 1000 + 50 * (aircraft_index % 40), flarm_id))
+
+        return messages
+
+    def close(self):
+        self.stop_event.set()
+
+        if self._socket:
+            self._socket.close()
+
+
+class GnssDevice(RateSender):
+    """
+    Stand-in for GNSS receiver: pseudo terminal that delivers GPGGA and GPVTG sentences. The time field of GPGGA
+    contains the time of sending, which allows AirConnect clients to measure the latency of NMEA data.
+    """
+
+    def __init__(self, rate):
+        super().__init__('GnssDevice', rate)
+
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+
+        self.port = os.ttyname(self._slave)
+
+    def send(self, data):
+        os.write(self._master, data)
+
+    def generate_messages(self, count):
+        messages = []
+
+        for i in range(count):
+            time_of_day = datetime.datetime.utcnow().strftime('%H%M%S.%f')[:-4]
+
+            messages.append(nmea_sentence('GPGGA,{},{},N,{},E,1,08,1.0,100.0,M,47.0,M,,'.format(time_of_day, nmea_coordinate(OWN_LATITUDE, 2), nmea_coordinate(OWN_LONGITUDE, 3))))
+            messages.append(nmea_sentence('GPVTG,90.0,T,,M,100.0,N,185.2,K,A'))
+
+        return messages
+
+    def close(self):
+        self.stop_event.set()
+
+        os.close(self._master)
+        os.close(self._slave)
+
+
+class AirConnectClient(Thread):
+    """
+    Stand-in for navigation software: counts received sentences by type and measures the latency of GPGGA sentences.
+    """
+
+    def __init__(self, index):
+        super().__init__(name='AirConnectClient-{:d}'.format(index), daemon=True)
+
+        self.line_counts = {}
+        self.nmea_latencies = []
+        self.stop_event = Event()
+        self.connected_event = Event()
+
+        self._lock = Lock()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                connection = socket.create_connection(('127.0.0.1', AIRCONNECT_PORT))
+                break
+            except OSError:
+                time.sleep(0.5)
+        else:
+            return
+
+        connection.settimeout(0.5)
+        self.connected_event.set()
+
+        buffer = b''
+        while not self.stop_event.is_set():
+            try:
+                data = connection.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            if not data:
+                break
+
+            receive_time = datetime.datetime.utcnow()
+
+            lines = (buffer + data).split(b'\r\n')
+            buffer = lines.pop()
+
+            with self._lock:
+                for line in lines:
+                    sentence_type = line[:6].decode(errors='replace')
+                    self.line_counts[sentence_type] = self.line_counts.get(sentence_type, 0) + 1
+
+                    if sentence_type == '$GPGGA':
+                        self.nmea_latencies.append(self._get_latency(line, receive_time))
+
+        connection.close()
+
+    @staticmethod
+    def _get_latency(line, receive_time):
+        time_of_day = line.split(b',')[1].decode()
+        send_seconds = int(time_of_day[0:2]) * 3600 + int(time_of_day[2:4]) * 60 + float(time_of_day[4:])
+        receive_seconds = receive_time.hour * 3600 + receive_time.minute * 60 + receive_time.second + receive_time.microsecond / 1e6
+
+        # handle midnight
+        return (receive_seconds - send_seconds) % 86400.0
+
+    def reset(self):
+        with self._lock:
+            self.line_counts = {}
+            self.nmea_latencies = []
+
+
+class ProcessMonitor(Thread):
+    """
+    Samples CPU time and resident memory of FlightBox and all its child processes via /proc (Linux only).
+    """
+
+    def __init__(self, pid, interval=1.0):
+        super().__init__(name='ProcessMonitor', daemon=True)
+
+        self._pid = pid
+        self._interval = interval
+        self.stop_event = Event()
+
+        # process name -> dict with CPU times and RSS samples
+        self.processes = {}
+
+    def _get_process_ids(self):
+        process_ids = [self._pid]
+
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open('/proc/{}/stat'.format(entry)) as stat_file:
+                        stat_fields = stat_file.read().rsplit(')', 1)[1].split()
+                    if int(stat_fields[1]) == self._pid:
+                        process_ids.append(int(entry))
+                except (OSError, IndexError):
+                    pass
+
+        return process_ids
+
+    @staticmethod
+    def _sample(process_id):
+        with open('/proc/{}/cmdline'.format(process_id), 'rb') as cmdline_file:
+            name = cmdline_file.read().split(b'\0')[0].decode(errors='replace').strip() or str(process_id)
+
+        with open('/proc/{}/stat'.format(process_id)) as stat_file:
+            stat_fields = stat_file.read().rsplit(')', 1)[1].split()
+
+        # utime and stime (fields 14 and 15 of stat), RSS in pages (field 24)
+        cpu_seconds = (int(stat_fields[11]) + int(stat_fields[12])) / CLOCK_TICKS
+        rss_bytes = int(stat_fields[21]) * os.sysconf('SC_PAGE_SIZE')
+
+        return '{} ({:d})'.format(name, process_id), cpu_seconds, rss_bytes
+
+    def run(self):
+        while not self.stop_event.wait(self._interval):
+            sample_time = time.time()
+
+            for process_id in self._get_process_ids():
+                try:
+                    name, cpu_seconds, rss_bytes = self._sample(process_id)
+                except (OSError, IndexError, ValueError):
+                    continue
+
+                process = self.processes.get(name)
+                if process is None:
+                    process = self.processes[name] = {'first_time': sample_time, 'first_cpu_seconds': cpu_seconds, 'rss_bytes': []}
+
+                process['last_time'] = sample_time
+                process['last_cpu_seconds'] = cpu_seconds
+                process['rss_bytes'].append(rss_bytes)
+
+    def reset(self):
+        self.processes = {}
+
+    def get_results(self):
+        results = {}
+
+        for name, process in self.processes.items():
+            duration = process['last_time'] - process['first_time']
+
+            results[name] = {
+                'cpu_percent': 100.0 * (process['last_cpu_seconds'] - process['first_cpu_seconds']) / duration if duration > 0 else None,
+                'rss_bytes_mean': sum(process['rss_bytes']) / len(process['rss_bytes']),
+                'rss_bytes_max': max(process['rss_bytes']),
+            }
+
+        return results
+
+
+def run_benchmark(args):
+    # start stand-ins of devices that FlightBox connects to
+    gnss_device = GnssDevice(args.gnss_rate)
+    sbs1_server = Sbs1Server(args.sbs1_rate, args.aircraft)
+    ogn_client = OgnClient(args.ogn_rate, args.aircraft)
+
+    # start FlightBox in separate process group (allows to terminate all module processes at once)
+    command = [args.python, 'flightbox.py', '--gnss-port', gnss_device.port, '--stats-port', str(args.stats_port), '--trace-sample-interval', str(args.trace_sample_interval)] + args.flightbox_args
+    flightbox = subprocess.Popen(command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), stdout=subprocess.DEVNULL if not args.verbose else None, stderr=subprocess.STDOUT if not args.verbose else None, start_new_session=True)
+
+    process_monitor = ProcessMonitor(flightbox.pid)
+    air_connect_clients = [AirConnectClient(i) for i in range(args.clients)]
+
+    try:
+        for thread in [gnss_device, sbs1_server, ogn_client, process_monitor] + air_connect_clients:
+            thread.start()
+
+        # wait until FlightBox is up and running (GNSS module attaches to serial port after 5 seconds)
+        for air_connect_client in air_connect_clients:
+            air_connect_client.connected_event.wait(30.0)
+        time.sleep(args.warmup)
+
+        # start measurement
+        for air_connect_client in air_connect_clients:
+            air_connect_client.reset()
+        process_monitor.reset()
+        sent_counts = {'sbs1': sbs1_server.sent_count, 'ogn': ogn_client.sent_count, 'nmea': gnss_device.sent_count * 2}
+
+        start_time = time.time()
+        time.sleep(args.duration)
+        duration = time.time() - start_time
+
+        # collect results
+        sent_counts = {'sbs1': sbs1_server.sent_count - sent_counts['sbs1'], 'ogn': ogn_client.sent_count - sent_counts['ogn'], 'nmea': gnss_device.sent_count * 2 - sent_counts['nmea']}
+
+        nmea_latencies = sorted(latency for air_connect_client in air_connect_clients for latency in air_connect_client.nmea_latencies)
+
+        line_counts = {}
+        for air_connect_client in air_connect_clients:
+            for sentence_type, count in air_connect_client.line_counts.items():
+                line_counts[sentence_type] = line_counts.get(sentence_type, 0) + count
+
+        try:
+            statistics = json.loads(urllib.request.urlopen('http://127.0.0.1:{:d}/'.format(args.stats_port), timeout=5).read().decode())
+        except (OSError, ValueError):
+            statistics = None
+
+        return {
+            'timestamp': time.time(),
+            'configuration': {
+                'aircraft': args.aircraft,
+                'sbs1_rate': args.sbs1_rate,
+                'ogn_rate': args.ogn_rate,
+                'gnss_rate': args.gnss_rate,
+                'clients': args.clients,
+                'duration': duration,
+                'flightbox_args': args.flightbox_args,
+            },
+            'input_messages_per_second': {content_type: count / duration for content_type, count in sent_counts.items()},
+            'output_lines_per_second_per_client': {sentence_type: count / duration / len(air_connect_clients) for sentence_type, count in line_counts.items()},
+            'nmea_latency_seconds': {
+                'count': len(nmea_latencies),
+                'mean': sum(nmea_latencies) / len(nmea_latencies) if nmea_latencies else None,
+                'p50': percentile(nmea_latencies, 50),
+                'p90': percentile(nmea_latencies, 90),
+                'p99': percentile(nmea_latencies, 99),
+                'max': nmea_latencies[-1] if nmea_latencies else None,
+            },
+            'processes': process_monitor.get_results(),
+            'statistics': statistics,
+        }
+
+    finally:
+        # terminate FlightBox and all stand-ins
+        try:
+            os.killpg(flightbox.pid, signal.SIGINT)
+            flightbox.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(flightbox.pid, signal.SIGKILL)
+            flightbox.wait()
+
+        for air_connect_client in air_connect_clients:
+            air_connect_client.stop_event.set()
+        process_monitor.stop_event.set()
+
+        sbs1_server.close()
+        ogn_client.close()
+        gnss_device.close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='End-to-end load benchmark of FlightBox with simulated devices.')
+    arg_parser.add_argument('--aircraft', dest='aircraft', type=int, default=50, help='number of simulated aircraft')
+    arg_parser.add_argument('--sbs1-rate', dest='sbs1_rate', type=float, default=500.0, help='SBS1 messages per second')
+    arg_parser.add_argument('--ogn-rate', dest='ogn_rate', type=float, default=20.0, help='OGN beacons per second')
+    arg_parser.add_argument('--gnss-rate', dest='gnss_rate', type=float, default=1.0, help='GNSS fixes per second')
+    arg_parser.add_argument('--clients', dest='clients', type=int, default=2, help='number of AirConnect clients')
+    arg_parser.add_argument('--warmup', dest='warmup', type=float, default=10.0, help='seconds between start of all clients and start of measurement')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=30.0, help='duration of measurement in seconds')
+    arg_parser.add_argument('--stats-port', dest='stats_port', type=int, default=8088, help='statistics port of FlightBox')
+    arg_parser.add_argument('--trace-sample-interval', dest='trace_sample_interval', type=int, default=10, help='trace latency of every n-th input item')
+    arg_parser.add_argument('--python', dest='python', default=sys.executable, help='Python interpreter used for running FlightBox')
+    arg_parser.add_argument('--output', dest='output', help='path of JSON result file (default: stdout)')
+    arg_parser.add_argument('--verbose', dest='verbose', action='store_true', help='show FlightBox log output')
+    arg_parser.add_argument('flightbox_args', nargs=argparse.REMAINDER, help='additional FlightBox arguments (after --)')
+    args = arg_parser.parse_args()
+
+    if args.flightbox_args and args.flightbox_args[0] == '--':
+        args.flightbox_args = args.flightbox_args[1:]
+
+    results = run_benchmark(args)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""benchmark_nmea_parser.py: Compares the results of the NMEA position sentence parser with pynmea2 for a corpus of
+real sentences (different receivers and talkers, with and without fix), and compares the throughput of both."""
+
+import argparse
+import sys
+import time
+
+import pynmea2
+
+from utils.nmea import parse_nmea_sentence
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# sentences of GNSS receivers (and examples of NMEA 0183 descriptions)
+CORPUS = [
+    '$GPGGA,184353.07,1929.045,S,02410.506,E,1,04,2.6,100.00,M,-33.9,M,,0000*6D',
+    '$GNGGA,092725.00,4717.11399,N,00833.91590,E,1,08,1.01,499.6,M,48.0,M,,*45',
+    '$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47',
+    '$GPGGA,002153.000,3342.6618,N,11751.3858,W,1,10,1.2,27.0,M,-34.2,M,,0000*5E',
+    '$GPGGA,,,,,,0,00,99.99,,,,,,*48',
+    '$GPGLL,4916.45,N,12311.12,W,225444,A*31',
+    '$GNGLL,4717.11364,N,00833.91565,E,092321.00,A,A*7E',
+    '$GPGLL,3751.65,S,14507.36,E*77',
+    '$GPRMC,123519,A,4807.038,N,01131.000,E,022.4,084.4,230394,003.1,W*6A',
+    '$GNRMC,083559.00,A,4717.11437,N,00833.91522,E,0.004,77.52,091202,,,A*49',
+    '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E*68',
+    '$GPRMC,,V,,,,,,,,,,N*53',
+    '$GPVTG,054.7,T,034.4,M,005.5,N,010.2,K*48',
+    '$GNVTG,77.52,T,,M,0.004,N,0.008,K,A*18',
+    '$GPVTG,,T,,M,0.000,N,0.000,K,N*2C',
+    '$GLGSV,3,1,10,65,57,336,30,66,58,125,29,72,11,327,,74,18,030,25*6F',
+    '$GPGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1*39',
+]
+
+
+def _optional(value, conversion=float):
+    return conversion(value) if value not in (None, '') else None
+
+
+def get_reference_fields(message):
+    """
+    :param message: Sentence parsed by pynmea2
+    :return: Dictionary with fields of NmeaFix that are expected for this sentence, or None for other sentence types
+    """
+
+    sentence_type = message.sentence_type
+
+    if sentence_type not in ('GGA', 'GLL', 'RMC', 'VTG'):
+        return None
+
+    fields = {'talker': message.talker, 'sentence_type': sentence_type}
+
+    if sentence_type in ('GGA', 'GLL', 'RMC'):
+        # pynmea2 returns 0.0 for empty coordinates
+        fields['latitude'] = message.latitude if message.lat else None
+        fields['longitude'] = message.longitude if message.lon else None
+
+    if sentence_type == 'GGA':
+        fields['fix_quality'] = message.gps_qual
+        fields['satellite_count'] = _optional(message.num_sats, int)
+        fields['hdop'] = _optional(message.horizontal_dil)
+        fields['altitude'] = _optional(message.altitude) if message.altitude_units == 'M' else None
+        fields['geoid_separation'] = _optional(message.geo_sep) if message.geo_sep_units == 'M' else None
+    elif sentence_type == 'GLL':
+        fields['status'] = message.status or None
+        fields['mode'] = message.faa_mode or None
+    elif sentence_type == 'RMC':
+        fields['status'] = message.status or None
+        fields['mode'] = message.mode_indicator or None
+        fields['h_speed'] = _optional(message.spd_over_grnd)
+        fields['course'] = _optional(message.true_course)
+    elif sentence_type == 'VTG':
+        fields['mode'] = message.faa_mode or None
+        fields['h_speed'] = _optional(message.spd_over_grnd_kts)
+        fields['course'] = _optional(message.true_track)
+
+    return fields
+
+
+def compare_with_pynmea2():
+    """
+    :return: Number of mismatches between parser results and pynmea2 results
+    """
+
+    mismatch_count = 0
+
+    for sentence in CORPUS:
+        fix = parse_nmea_sentence(sentence)
+        expected_fields = get_reference_fields(pynmea2.parse(sentence))
+
+        if expected_fields is None or fix is None:
+            if expected_fields is not None or fix is not None:
+                print('Mismatch in sentence type of {!r}'.format(sentence))
+                mismatch_count += 1
+            continue
+
+        for name, expected_value in expected_fields.items():
+            value = getattr(fix, name)
+            if type(expected_value) is float and value is not None:
+                is_equal = abs(value - expected_value) < 1e-9
+            else:
+                is_equal = value == expected_value
+
+            if not is_equal:
+                print('Mismatch in {} of {!r}: {!r} instead of {!r}'.format(name, sentence, value, expected_value))
+                mismatch_count += 1
+
+    return mismatch_count
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for NMEA sentence parsing.')
+    arg_parser.add_argument('--sentences', dest='sentences', type=int, default=50000, help='number of parsed sentences')
+    args = arg_parser.parse_args()
+
+    mismatch_count = compare_with_pynmea2()
+    print('corpus: {:d} sentences compared with pynmea2, {:d} mismatches'.format(len(CORPUS), mismatch_count))
+
+    # position sentences only (other sentences are not parsed by transformation)
+    position_sentences = [sentence for sentence in CORPUS if sentence[3:6] in ('GGA', 'GLL', 'RMC', 'VTG')]
+    sentences = [position_sentences[i % len(position_sentences)] for i in range(args.sentences)]
+
+    for name, function in [('pynmea2', pynmea2.parse), ('position sentence parser', parse_nmea_sentence)]:
+        start_time = time.time()
+        for sentence in sentences:
+            function(sentence)
+        duration = time.time() - start_time
+
+        print('{}: {:.0f} sentences/s'.format(name, args.sentences / duration))
+
+    sys.exit(1 if mismatch_count else 0)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+"""benchmark_ogn_parser.py: Checks the OGN beacon parser against golden results of real beacons and compares its
+throughput with the previous parsing approach (19 patterns compiled per beacon and matched against every token)."""
+
+import argparse
+import re
+import sys
+import time
+
+import utils.conversion
+from utils.ogn_parser import parse_ogn_beacon
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# real beacons with expected parser results
+GOLDEN_BEACONS = [
+    ("FLRDDA5BA>APRS,qAS,LFMX:/160829h4415.41N/00600.03E'342/049/A=005524 id0ADDA5BA -454fpm -1.1rot 8.8dB 0e +51.2kHz gps4x5", {
+        'identifier': 'FLRDDA5BA', 'receiver_name': 'qAS,LFMX', 'timestamp': '160829', 'latitude': 44.256833,
+        'longitude': 6.0005, 'track': 342, 'h_speed': 49, 'altitude': 5524, 'address_type': 2, 'aircraft_type': 2,
+        'stealth': False, 'address': 'DDA5BA', 'climb_rate': -454, 'turn_rate': -1.1, 'signal_strength': 8.8,
+        'error_count': 0, 'frequency_offset': 51.2, 'gps_status': '4x5', 'unknown_tokens': None,
+    }),
+    ("ICA3D1B5A>APRS,qAR:/133959h0107.07N/00146.75W'259/067/A=003083 !W57! id053D1B5A -039fpm +0.1rot 8.2dB 1e +4.8kHz gps3x3 s6.01 h32 rDD04AF", {
+        'identifier': 'ICA3D1B5A', 'latitude': 1.117917, 'longitude': -1.779283, 'track': 259, 'h_speed': 67,
+        'altitude': 3083, 'address_type': 1, 'aircraft_type': 1, 'address': '3D1B5A', 'climb_rate': -39,
+        'turn_rate': 0.1, 'error_count': 1, 'software_version': 6.01, 'hardware_version': 32, 'real_id': 'DD04AF',
+        'unknown_tokens': None,
+    }),
+    ("FLRDDEEF1>APRS,qAS,EDFW:/063422h4945.11N/00932.89E'173/000/A=000997 !W75! id06DDEEF1 +020fpm +0.0rot FL009.85 37.5dB 0e -2.8kHz gps2x3 hear1084 hearB597", {
+        'latitude': 49.75195, 'longitude': 9.548250, 'track': 173, 'h_speed': 0, 'climb_rate': 20, 'flight_level': 9.85,
+        'signal_strength': 37.5, 'heard_ids': ['1084', 'B597'], 'unknown_tokens': None,
+    }),
+    # precision enhancement must follow hemisphere of zero coordinates (-0.0 compares equal to 0.0)
+    ("FLRDDEEF2>APRS,qAS,EDFW:/063422h0000.00S/00000.00W'173/000/A=000997 !W57! id06DDEEF2", {
+        'latitude': -0.000083, 'latitude_hemisphere': 'S', 'longitude': -0.000117, 'longitude_hemisphere': 'W',
+        'unknown_tokens': None,
+    }),
+    ("Lachens>APRS,TCPIP*,qAC,GLIDERN2:/165334h4344.70NI00639.19E&/A=005435 v0.2.1 CPU:0.3 RAM:1764.4/2121.4MB NTP:2.8ms/+4.9ppm +47.0C RF:+0.70dB", {
+        'identifier': 'Lachens', 'symbol_table': 'I', 'symbol_code': '&', 'track': None, 'altitude': 5435,
+        'address': None, 'ogn_decode_version': '0.2.1', 'cpu_load': 0.3, 'ram_used': 1764.4, 'ram_total': 2121.4,
+        'ram_unit': 'MB', 'ntp_offset_ms': 2.8, 'ntp_correction_ppm': 4.9, 'temperature_celsius': 47.0,
+        'rf_info': '+0.70dB', 'unknown_tokens': None,
+    }),
+]
+
+
+def parse_per_token_regexes(message):
+    """
+    Previous implementation (handle_ogn_data): patterns are compiled for every beacon, and every token is matched
+    against all of them.
+    """
+
+    data_parts = message.split(' ')
+    result = {}
+
+    m = re.match(r"^(.+?)>APRS,(.+?):/(\d{6})+h(\d{4}\.\d{2})(N|S)(.)(\d{5}\.\d{2})(E|W)(.)((\d{3})/(\d{3}))?/A=(\d{6})", data_parts[0])
+    if m:
+        result['identifier'] = m.group(1)
+        result['latitude'] = utils.conversion.ogn_coord_to_degrees(float(m.group(4)))
+        result['longitude'] = utils.conversion.ogn_coord_to_degrees(float(m.group(7)))
+        result['altitude'] = int(m.group(13))
+
+    patterns = [
+        re.compile(r"id(\S{2})(\S{6})"),
+        re.compile(r"([\+\-]\d+)fpm"),
+        re.compile(r"([\+\-]\d+\.\d+)rot"),
+        re.compile(r"(\d+\.\d+)dB"),
+        re.compile(r"(\d+)e"),
+        re.compile(r"\!W(.)(.)!"),
+        re.compile(r"hear(\w{4})"),
+        re.compile(r"([\+\-]\d+\.\d+)kHz"),
+        re.compile(r"gps(\d+x\d+)"),
+        re.compile(r"s(\d+\.\d+)"),
+        re.compile(r"h(\d+)"),
+        re.compile(r"r(\w{6})"),
+        re.compile(r"FL(\d{3}\.\d{2})"),
+        re.compile(r"v(\d\.\d\.\d\.\w+)"),
+        re.compile(r"CPU:([\d\.]+)"),
+        re.compile(r"RAM:([\d\.]+)/([\d\.]+)(\w+)"),
+        re.compile(r"NTP:([\d\.-]+)ms/([\d\.-]+)ppm"),
+        re.compile(r"([\d\.+-]+)C"),
+        re.compile(r"RF:([\w\d\.+-/]+)"),
+    ]
+
+    for data_part in data_parts[1:]:
+        matches = [pattern.match(data_part) for pattern in patterns]
+        for index, match in enumerate(matches):
+            if match is not None:
+                result[index] = match.groups()
+                break
+
+    return result
+
+
+def check_golden_beacons():
+    """
+    :return: Number of mismatches between parser results and golden results
+    """
+
+    mismatch_count = 0
+
+    for message, expected_fields in GOLDEN_BEACONS:
+        beacon = parse_ogn_beacon(message)
+
+        for name, expected_value in expected_fields.items():
+            value = getattr(beacon, name)
+            if type(expected_value) is float and value is not None:
+                value = round(value, 6)
+
+            if value != expected_value:
+                print('Mismatch in {} of {!r}: {!r} instead of {!r}'.format(name, message, value, expected_value))
+                mismatch_count += 1
+
+    return mismatch_count
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for OGN beacon parsing.')
+    arg_parser.add_argument('--beacons', dest='beacons', type=int, default=50000, help='number of parsed beacons')
+    args = arg_parser.parse_args()
+
+    mismatch_count = check_golden_beacons()
+    print('golden beacons: {:d} checked, {:d} mismatches'.format(len(GOLDEN_BEACONS), mismatch_count))
+
+    messages = [GOLDEN_BEACONS[i % len(GOLDEN_BEACONS)][0] for i in range(args.beacons)]
+
+    for name, function in [('per-token regexes', parse_per_token_regexes), ('precompiled parser', parse_ogn_beacon)]:
+        start_time = time.time()
+        for message in messages:
+            function(message)
+        duration = time.time() - start_time
+
+        print('{}: {:.0f} beacons/s'.format(name, args.beacons / duration))
+
+    sys.exit(1 if mismatch_count else 0)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""benchmark_sbs1_framing.py: Compares the previous per-chunk string splitting of SBS1 data with the byte-level line
+framer (throughput and number of correctly received messages for TCP chunks that split lines), and checks that an
+overlong line is discarded completely (its rest must not reach the parser as a line of its own)."""
+
+import argparse
+from collections import Counter
+import sys
+import time
+
+from utils.line_framer import LineFramer, get_field
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# dump1090 sends all message types, FlightBox is only interested in some of them
+SBS1_MESSAGES = [
+    'MSG,1,111,11111,3C49CC,111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,DLH1234 ,,,,,,,,,,,0',
+    'MSG,3,111,11111,3C49CC,111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,37000,,,51.22734,6.80611,,,0,0,0,0',
+    'MSG,4,111,11111,3C49CC,111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,,450,90,,,-64,,0,0,0,0',
+    'MSG,5,111,11111,3C49CC,111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,37000,,,,,,,0,,0,0',
+    'MSG,7,111,11111,3C49CC,111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,37000,,,,,,,,,,0',
+    'MSG,8,111,11111,3C49CC,111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,,,,,,,,,,,0',
+]
+
+MESSAGE_TYPES = ['1', '2', '3', '4']
+
+
+def split_strings(chunks, message_types):
+    """
+    Previous implementation: every chunk is decoded and split on its own.
+    """
+
+    messages = []
+
+    for data in chunks:
+        data_string = data.decode().strip()
+
+        for message in data_string.splitlines():
+            try:
+                message_type = message.split(',')[1]
+                if message_type in message_types:
+                    messages.append(message)
+            except:
+                pass
+
+    return messages
+
+
+def frame_bytes(chunks, message_types):
+    """
+    Current implementation: lines are framed across chunks and filtered before decoding.
+    """
+
+    messages = []
+
+    line_framer = LineFramer()
+    message_types = set(message_type.encode() for message_type in message_types)
+
+    for data in chunks:
+        for line in line_framer.feed(data):
+            if get_field(line, 1) in message_types:
+                messages.append(line.decode())
+
+    return messages
+
+
+def check_overlong_line(chunk_size):
+    """
+    :return: True if an overlong line without terminator is discarded completely and the following lines are received
+    """
+
+    stream = (SBS1_MESSAGES[1] + '\r\n' + 'x' * 10000 + SBS1_MESSAGES[2] + '\r\n' + SBS1_MESSAGES[3] + '\r\n').encode()
+
+    line_framer = LineFramer()
+    lines = [line.decode() for i in range(0, len(stream), chunk_size) for line in line_framer.feed(stream[i:i + chunk_size])]
+
+    print('overlong line: received {}, {:d} discarded'.format([line[:5] + '...' for line in lines], line_framer.get_discarded_count()))
+
+    return lines == [SBS1_MESSAGES[1], SBS1_MESSAGES[3]] and line_framer.get_discarded_count() == 1
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for SBS1 stream framing.')
+    arg_parser.add_argument('--messages', dest='messages', type=int, default=200000, help='number of SBS1 messages in stream')
+    arg_parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=1448, help='size of TCP chunks in bytes')
+    args = arg_parser.parse_args()
+
+    # generate stream as sent by dump1090 and split it into chunks (that split lines)
+    stream = ''.join(SBS1_MESSAGES[i % len(SBS1_MESSAGES)] + '\r\n' for i in range(args.messages)).encode()
+    chunks = [stream[i:i + args.chunk_size] for i in range(0, len(stream), args.chunk_size)]
+
+    expected_messages = [message for message in (SBS1_MESSAGES[i % len(SBS1_MESSAGES)] for i in range(args.messages)) if message.split(',')[1] in MESSAGE_TYPES]
+
+    for name, function in [('split strings', split_strings), ('frame bytes', frame_bytes)]:
+        start_time = time.time()
+        messages = function(chunks, MESSAGE_TYPES)
+        duration = time.time() - start_time
+
+        # count messages that have been received intact
+        correct_count = sum((Counter(messages) & Counter(expected_messages)).values())
+
+        print('{}: {:.0f} messages/s, {:d} of {:d} accepted messages received intact'.format(name, args.messages / duration, correct_count, len(expected_messages)))
+
+    sys.exit(0 if check_overlong_line(args.chunk_size) else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""benchmark_traffic_vectorized.py: Compares the vectorized calculation of traffic positions (NumPy, all aircraft in
+one pass) with the scalar calculation (per aircraft) for random traffic around own position, and measures the time per
+tick of both calculations for 10, 100, and 1000 aircraft. Fails if relative positions differ by more than the
+tolerance."""
+
+import argparse
+import math
+import random
+import sys
+import time
+
+import utils.calculation_numpy
+from transformation.transformation_sbs1ognnmea_flarm import GnssStatus, calculate_traffic_geometries, calculate_traffic_geometry, generate_flarm_messages
+from utils.aircraft_table import AircraftInfo
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+OWN_LATITUDE = 51.2
+OWN_LONGITUDE = 6.8
+OWN_ALTITUDE_FT = 2500.0
+
+
+def generate_traffic(aircraft_count, radius_m, random_generator):
+    """
+    :return: List of AircraftInfo around own position (some without altitude, track, or time of position)
+    """
+
+    emission_time = 1000.0
+    aircraft_list = []
+
+    for index in range(aircraft_count):
+        distance_m = radius_m * math.sqrt(random_generator.random())
+        bearing_rad = random_generator.uniform(0.0, 2.0 * math.pi)
+
+        aircraft = AircraftInfo()
+        aircraft.identifier = '{:06X}'.format(index)
+        aircraft.latitude = OWN_LATITUDE + math.degrees(distance_m * math.cos(bearing_rad) / 6371000.0)
+        aircraft.longitude = OWN_LONGITUDE + math.degrees(distance_m * math.sin(bearing_rad) / 6371000.0 / math.cos(math.radians(OWN_LATITUDE)))
+        aircraft.altitude = random_generator.choice([None, random_generator.uniform(500.0, 40000.0)])
+        aircraft.course = random_generator.choice([None, random_generator.uniform(0.0, 360.0)])
+        aircraft.h_speed = random_generator.choice([None, 0.0, random_generator.uniform(40.0, 480.0)])
+        aircraft.v_speed = random_generator.choice([None, random_generator.uniform(-2000.0, 2000.0)])
+        aircraft.position_time = random_generator.choice([None, emission_time - random_generator.uniform(-1.0, 10.0)])
+        aircraft_list.append(aircraft)
+
+    # aircraft without position are skipped
+    aircraft_list.append(AircraftInfo())
+
+    return aircraft_list
+
+
+def get_gnss_status():
+    gnss_status = GnssStatus()
+    gnss_status.latitude = OWN_LATITUDE
+    gnss_status.longitude = OWN_LONGITUDE
+    gnss_status.altitude = OWN_ALTITUDE_FT
+    gnss_status.course = 45.0
+    gnss_status.h_speed = 100.0
+    gnss_status.position_time = 999.5
+
+    return gnss_status
+
+
+def compare_geometries(scalar_geometries, vectorized_geometries, tolerance_m):
+    """
+    :return: List of (index, scalar geometry, vectorized geometry) tuples that differ by more than tolerance
+    """
+
+    mismatches = []
+
+    for index, (scalar_geometry, vectorized_geometry) in enumerate(zip(scalar_geometries, vectorized_geometries)):
+        if scalar_geometry is None or vectorized_geometry is None:
+            if scalar_geometry is not vectorized_geometry:
+                mismatches.append((index, scalar_geometry, vectorized_geometry))
+            continue
+
+        # distances (and vertical) in meters, bearings as offset in meters at distance of aircraft
+        differences = [abs(scalar_geometry[0] - vectorized_geometry[0]),
+                       math.radians(abs((scalar_geometry[1] - vectorized_geometry[1] + 180.0) % 360.0 - 180.0)) * scalar_geometry[0],
+                       math.radians(abs((scalar_geometry[2] - vectorized_geometry[2] + 180.0) % 360.0 - 180.0)) * scalar_geometry[0],
+                       abs(scalar_geometry[3] - vectorized_geometry[3]),
+                       abs(scalar_geometry[4] - vectorized_geometry[4])]
+
+        if (scalar_geometry[5] is None) != (vectorized_geometry[5] is None):
+            differences.append(float('inf'))
+        elif scalar_geometry[5] is not None:
+            differences.append(abs(scalar_geometry[5] - vectorized_geometry[5]))
+
+        if max(differences) > tolerance_m:
+            mismatches.append((index, scalar_geometry, vectorized_geometry))
+
+    return mismatches
+
+
+def measure_tick(gnss_status, aircraft_list, emission_time, max_extrapolation_time, geodesy, is_vectorized, repetitions):
+    """
+    :return: Mean time in seconds to generate FLARM messages of all aircraft (like one tick of data processor)
+    """
+
+    start_time = time.perf_counter()
+
+    for _ in range(repetitions):
+        geometries = [None] * len(aircraft_list)
+        if is_vectorized:
+            geometries = calculate_traffic_geometries(gnss_status, aircraft_list, emission_time, max_extrapolation_time, geodesy)
+
+        for aircraft, geometry in zip(aircraft_list, geometries):
+            generate_flarm_messages(gnss_status, aircraft, emission_time=emission_time, max_extrapolation_time=max_extrapolation_time, geometry=geometry, geodesy=geodesy)
+
+    return (time.perf_counter() - start_time) / repetitions
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark for vectorized calculation of FLARM traffic positions.')
+    arg_parser.add_argument('--aircraft-counts', dest='aircraft_counts', default='10,100,1000', help='comma-separated numbers of aircraft')
+    arg_parser.add_argument('--radius', dest='radius', type=float, default=100000.0, help='radius in meters of area around own position with traffic')
+    arg_parser.add_argument('--max-extrapolation-time', dest='max_extrapolation_time', type=float, default=5.0, help='maximum time in seconds positions are dead-reckoned')
+    arg_parser.add_argument('--tolerance', dest='tolerance', type=float, default=0.01, help='maximum difference in meters of relative positions')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=1.0, help='minimum measurement time in seconds per aircraft count')
+    arg_parser.add_argument('--geodesy', dest='geodesy', choices=sorted(utils.calculation_numpy.GEODESY_BACKENDS), default='vincenty', help='geodesy backend')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=1, help='seed of random traffic')
+    args = arg_parser.parse_args()
+
+    gnss_status = get_gnss_status()
+    emission_time = 1000.0
+
+    print('{:>8} {:>14} {:>14} {:>8} {:>11}'.format('aircraft', 'scalar [ms]', 'vectorized [ms]', 'speedup', 'mismatches'))
+
+    mismatch_count = 0
+
+    for aircraft_count in [int(aircraft_count) for aircraft_count in args.aircraft_counts.split(',')]:
+        aircraft_list = generate_traffic(aircraft_count, args.radius, random.Random(args.seed))
+
+        # compare results of both calculations
+        scalar_geometries = [calculate_traffic_geometry(gnss_status, aircraft, emission_time, args.max_extrapolation_time, args.geodesy) if aircraft.latitude else None for aircraft in aircraft_list]
+        vectorized_geometries = calculate_traffic_geometries(gnss_status, aircraft_list, emission_time, args.max_extrapolation_time, args.geodesy)
+
+        mismatches = compare_geometries(scalar_geometries, vectorized_geometries, args.tolerance)
+        for index, scalar_geometry, vectorized_geometry in mismatches[:5]:
+            print('mismatch of aircraft {:d}: {} != {}'.format(index, scalar_geometry, vectorized_geometry))
+        mismatch_count += len(mismatches)
+
+        # FLARM messages must be identical as well (apart from rounding of the last digit)
+        for aircraft, vectorized_geometry in zip(aircraft_list, vectorized_geometries):
+            scalar_messages = generate_flarm_messages(gnss_status, aircraft, emission_time=emission_time, max_extrapolation_time=args.max_extrapolation_time, geodesy=args.geodesy)
+            vectorized_messages = generate_flarm_messages(gnss_status, aircraft, emission_time=emission_time, max_extrapolation_time=args.max_extrapolation_time, geometry=vectorized_geometry, geodesy=args.geodesy)
+            if len(scalar_messages or []) != len(vectorized_messages or []):
+                mismatch_count += 1
+
+        # measure time per tick (at least given duration)
+        repetitions = max(int(args.duration / max(measure_tick(gnss_status, aircraft_list, emission_time, args.max_extrapolation_time, args.geodesy, False, 1), 1e-6)), 1)
+        scalar_time = measure_tick(gnss_status, aircraft_list, emission_time, args.max_extrapolation_time, args.geodesy, False, repetitions)
+        vectorized_time = measure_tick(gnss_status, aircraft_list, emission_time, args.max_extrapolation_time, args.geodesy, True, repetitions)
+
+        print('{:>8d} {:>14.3f} {:>14.3f} {:>7.1f}x {:>11d}'.format(aircraft_count, scalar_time * 1000.0, vectorized_time * 1000.0, scalar_time / vectorized_time, len(mismatches)))
+
+    sys.exit(0 if mismatch_count == 0 else 1)
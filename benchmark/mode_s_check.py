@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+"""mode_s_check.py: Checks Mode-S decoding and Beast framing against golden results: reference messages of aircraft
+identification, airborne position (global CPR decoding of an even/odd pair), both airborne velocity subtypes, altitude
+encodings (25 ft with Q-bit, Gillham encoded altitudes are ignored), and parity errors. The Beast framer is checked
+with escaped characters in timestamp and signal level, frames split across reads, and resynchronization after
+corrupted frames. Finally, the committed capture (captures/beast_reference.bin, generated from the reference messages
+with --write-capture) is framed and decoded like a recorded capture."""
+
+import argparse
+import os
+import sys
+
+from benchmark.beast_capture_server import encode_frame, read_capture
+from utils.mode_s import BeastFramer, ModeSDecoder, mode_s_crc, BEAST_MODE_S_LONG, BEAST_TIMESTAMP_FREQUENCY
+from utils.sbs1 import SBS1_IDENTIFICATION, SBS1_AIRBORNE_POSITION, SBS1_AIRBORNE_VELOCITY
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+CAPTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'captures', 'beast_reference.bin')
+
+# Beast timestamp of first message (contains escape characters, which must be doubled in the stream)
+CAPTURE_START_TIMESTAMP = 0x1a001a1a0000
+
+# maximum difference of decoded floating point values
+TOLERANCE = 5e-5
+
+
+def with_parity(message):
+    """
+    :param message: Hex string of extended squitter without parity field (22 characters)
+    :return: Hex string of message with valid parity field
+    """
+    return message + '{:06X}'.format(mode_s_crc(bytes.fromhex(message)))
+
+
+# (message, receive time in seconds, expected fields of SBS1 record or None if no record is expected), decoded in this
+# order by one decoder (reference messages from "The 1090 Megahertz Riddle" by Junzi Sun)
+GOLDEN_MESSAGES = [
+    # aircraft identification
+    ('8D4840D6202CC371C32CE0576098', 0.0, {
+        'icao_id': 0x4840D6, 'msg_type': SBS1_IDENTIFICATION, 'callsign': 'KLM1023', 'altitude': None,
+    }),
+    # airborne position, odd message first (no position yet), then even message (global decoding, even is newest)
+    ('8D40621D58C386435CC412692AD6', 0.0, {
+        'icao_id': 0x40621D, 'msg_type': SBS1_AIRBORNE_POSITION, 'altitude': 38000.0, 'latitude': None,
+        'longitude': None,
+    }),
+    ('8D40621D58C382D690C8AC2863A7', 2.0, {
+        'icao_id': 0x40621D, 'msg_type': SBS1_AIRBORNE_POSITION, 'altitude': 38000.0, 'latitude': 52.2572,
+        'longitude': 3.91937,
+    }),
+    # airborne velocity, subtype 1 (ground speed)
+    ('8D485020994409940838175B284F', 3.0, {
+        'icao_id': 0x485020, 'msg_type': SBS1_AIRBORNE_VELOCITY, 'h_speed': 159.2011, 'course': 182.8804,
+        'v_speed': -832.0,
+    }),
+    # airborne velocity, subtype 3 (air speed and heading)
+    ('8DA05F219B06B6AF189400CBC33F', 3.0, {
+        'icao_id': 0xA05F21, 'msg_type': SBS1_AIRBORNE_VELOCITY, 'h_speed': 375.0, 'course': 243.984375,
+        'v_speed': -2304.0,
+    }),
+    # airborne position with Gillham encoded altitude (Q-bit cleared, altitude is ignored)
+    (with_parity('8D40621E58C282D690C8AC'), 4.0, {
+        'icao_id': 0x40621E, 'msg_type': SBS1_AIRBORNE_POSITION, 'altitude': None, 'latitude': None,
+    }),
+    # identification with parity error (last bit flipped)
+    ('8D4840D6202CC371C32CE0576099', 5.0, None),
+]
+
+
+def compare_record(sbs1_record, expected_fields):
+    """
+    :return: List of (name, value, expected value) tuples of mismatching fields
+    """
+
+    if expected_fields is None or sbs1_record is None:
+        return [] if sbs1_record is None and expected_fields is None else [('record', sbs1_record, expected_fields)]
+
+    mismatches = []
+
+    for name, expected_value in expected_fields.items():
+        value = getattr(sbs1_record, name)
+
+        if type(expected_value) is float and value is not None:
+            is_ok = abs(value - expected_value) <= TOLERANCE
+        else:
+            is_ok = value == expected_value
+
+        if not is_ok:
+            mismatches.append((name, value, expected_value))
+
+    return mismatches
+
+
+def check_golden_messages():
+    """
+    :return: Number of mismatches between decoder results and golden results
+    """
+
+    decoder = ModeSDecoder()
+    mismatch_count = 0
+
+    for message, receive_time, expected_fields in GOLDEN_MESSAGES:
+        for name, value, expected_value in compare_record(decoder.decode(bytes.fromhex(message), receive_time), expected_fields):
+            print('Mismatch in {} of {}: {!r} instead of {!r}'.format(name, message, value, expected_value))
+            mismatch_count += 1
+
+    if decoder.crc_error_count != 1:
+        print('Parity errors: {:d} instead of 1'.format(decoder.crc_error_count))
+        mismatch_count += 1
+
+    print('golden messages: {:d} checked, {:d} mismatches'.format(len(GOLDEN_MESSAGES), mismatch_count))
+
+    return mismatch_count
+
+
+def generate_frames():
+    """
+    :return: List of (frame type, timestamp, signal level, message) tuples of golden messages (timestamps and signal
+             levels partly consist of escape characters)
+    """
+    return [(BEAST_MODE_S_LONG, CAPTURE_START_TIMESTAMP + int(receive_time * BEAST_TIMESTAMP_FREQUENCY), 0x1a if index % 2 == 0 else 0x80 + index, bytes.fromhex(message)) for index, (message, receive_time, _) in enumerate(GOLDEN_MESSAGES)]
+
+
+def check_framer():
+    """
+    :return: Number of framing cases that did not return the expected frames
+    """
+
+    frames = generate_frames()
+    stream = b''.join(encode_frame(*frame) for frame in frames)
+
+    failure_count = 0
+
+    # whole stream in one read, frames with escape characters are unescaped
+    if BeastFramer().feed(stream) != frames:
+        print('Framer: stream with escape characters not framed correctly')
+        failure_count += 1
+
+    # stream split into two reads at every position (also between escape character and its double)
+    for split_position in range(1, len(stream)):
+        framer = BeastFramer()
+        if framer.feed(stream[:split_position]) + framer.feed(stream[split_position:]) != frames:
+            print('Framer: stream split at byte {:d} not framed correctly'.format(split_position))
+            failure_count += 1
+
+    # stream fed byte by byte
+    framer = BeastFramer()
+    if [frame for position in range(len(stream)) for frame in framer.feed(stream[position:position + 1])] != frames:
+        print('Framer: stream fed byte by byte not framed correctly')
+        failure_count += 1
+
+    # stream joined within a frame and truncated frame followed by next frame (resynchronization on frame start; the
+    # truncated frame must not end with a single escape character, which would escape the next frame start)
+    first_frame = encode_frame(*frames[0])
+    framer = BeastFramer()
+    if framer.feed(first_frame[5:] + first_frame[:10] + stream) != frames or framer.get_discarded_count() == 0:
+        print('Framer: no resynchronization after corrupted frames')
+        failure_count += 1
+
+    print('framer: stream of {:d} bytes, {:d} failures'.format(len(stream), failure_count))
+
+    return failure_count
+
+
+def check_capture(capture_path):
+    """
+    :return: Number of mismatches between decoded capture and golden results
+    """
+
+    frames = read_capture(capture_path)
+
+    mismatch_count = 0
+
+    if frames != generate_frames():
+        print('Capture {} does not contain golden messages'.format(capture_path))
+        mismatch_count += 1
+
+    decoder = ModeSDecoder()
+
+    for (frame_type, timestamp, signal_level, message), (_, _, expected_fields) in zip(frames, GOLDEN_MESSAGES):
+        for name, value, expected_value in compare_record(decoder.decode(message, timestamp / BEAST_TIMESTAMP_FREQUENCY), expected_fields):
+            print('Mismatch in {} of captured message {}: {!r} instead of {!r}'.format(name, message.hex().upper(), value, expected_value))
+            mismatch_count += 1
+
+    print('capture: {:d} frames decoded, {:d} mismatches'.format(len(frames), mismatch_count))
+
+    return mismatch_count
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Golden checks of Mode-S decoding and Beast framing.')
+    arg_parser.add_argument('--capture', dest='capture', default=CAPTURE_PATH, help='path to Beast capture of golden messages')
+    arg_parser.add_argument('--write-capture', dest='write_capture', action='store_true', help='(re-)generate capture of golden messages')
+    args = arg_parser.parse_args()
+
+    if args.write_capture:
+        with open(args.capture, 'wb') as capture_file:
+            capture_file.write(b''.join(encode_frame(*frame) for frame in generate_frames()))
+
+    error_count = check_golden_messages()
+    error_count += check_framer()
+    error_count += check_capture(args.capture)
+
+    sys.exit(1 if error_count else 0)
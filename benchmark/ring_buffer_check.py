@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+"""ring_buffer_check.py: Checks the shared memory ring buffer of the data hub: records of varying size wrap around the
+end of a small buffer (wrap marker) and reach a reader in order, a reader that falls behind is lapped and counts its
+lost records (published as 'lapped' gauge of output modules), the content type filter of readers, the wakeup latency of
+a waiting reader, and that the data hub worker splits batches that are too large for the buffer instead of
+terminating."""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import sys
+from threading import Thread
+import time
+
+from benchmark.benchmark_data_hub_batching import BenchmarkSink
+from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_worker import DataHubWorker
+from data_hub.shared_memory_ring_buffer import SharedMemoryRingBuffer
+from output.output_module import get_data_hub_items
+from utils.statistics import Statistics
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+def check_wraparound(capacity, record_count):
+    """
+    :return: True if a reader that keeps up receives all records in order while the buffer wraps around
+    """
+
+    ring_buffer = SharedMemoryRingBuffer(capacity=capacity)
+    reader = ring_buffer.create_reader()
+
+    received = []
+    for index in range(record_count):
+        # records of varying size, so that space at the end of the buffer is skipped with wrap markers
+        ring_buffer.put((index, 'x' * (index * 37 % (capacity // 4))))
+        received.append(reader.get(timeout=0.1)[0])
+
+    reader.close()
+    ring_buffer.close()
+
+    print('wraparound: {:d} records through {:d} bytes, {:d} received in order, {:d} lapped'.format(record_count, capacity, sum(1 for index, value in enumerate(received) if index == value), reader.get_lapped_count()))
+
+    return received == list(range(record_count)) and reader.get_lapped_count() == 0
+
+
+def check_lapped_reader(capacity, record_count):
+    """
+    :return: True if a reader that has not read while the buffer was overwritten skips to the oldest record still in
+             the buffer and counts all records before it as lost
+    """
+
+    ring_buffer = SharedMemoryRingBuffer(capacity=capacity)
+    reader = ring_buffer.create_reader()
+
+    for index in range(record_count):
+        ring_buffer.put((index, 'x' * 100))
+
+    # read like output modules do, so that lost records are published in statistics
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+    statistics = Statistics('LappedReader')
+
+    received = [loop.run_until_complete(get_data_hub_items(loop, executor, reader, statistics))[0]]
+    while received[-1] != record_count - 1:
+        received.append(loop.run_until_complete(get_data_hub_items(loop, executor, reader, statistics))[0])
+
+    loop.close()
+    executor.shutdown()
+
+    lapped_count = reader.get_lapped_count()
+    lapped_gauge = statistics.get_snapshot()['gauges'].get('lapped')
+
+    reader.close()
+    ring_buffer.close()
+
+    print('lapped reader: received records {:d}..{:d}, {:d} counted as lost, lapped gauge {}'.format(received[0], received[-1], lapped_count, lapped_gauge))
+
+    return 0 < received[0] == lapped_count == lapped_gauge and received == list(range(received[0], record_count))
+
+
+def check_content_type_filter():
+    """
+    :return: True if readers only get items of their content types (and no empty batches)
+    """
+
+    ring_buffer = SharedMemoryRingBuffer(capacity=64 * 1024)
+    nmea_reader = ring_buffer.create_reader(['nmea'])
+    any_reader = ring_buffer.create_reader(['ANY'])
+
+    ring_buffer.put([DataHubItem('sbs1', 'a'), DataHubItem('nmea', 'b'), DataHubItem('ogn', 'c')])
+    ring_buffer.put([DataHubItem('sbs1', 'd')])
+    ring_buffer.put([DataHubItem('nmea', 'e')])
+
+    nmea_items = nmea_reader.get(timeout=0.1) + nmea_reader.get(timeout=0.1)
+    any_items = any_reader.get(timeout=0.1) + any_reader.get(timeout=0.1) + any_reader.get(timeout=0.1)
+
+    nmea_reader.close()
+    any_reader.close()
+    ring_buffer.close()
+
+    print('content type filter: nmea reader got {}, ANY reader got {}'.format([item.get_content_data() for item in nmea_items], [item.get_content_data() for item in any_items]))
+
+    return [item.get_content_data() for item in nmea_items] == ['b', 'e'] and [item.get_content_data() for item in any_items] == ['a', 'b', 'c', 'd', 'e']
+
+
+def check_wakeup_latency(record_count, timeout):
+    """
+    :return: Maximum time in seconds between put and get of a reader that is waiting for records
+    """
+
+    ring_buffer = SharedMemoryRingBuffer(capacity=64 * 1024)
+    reader = ring_buffer.create_reader()
+
+    latencies = []
+
+    def read():
+        for _ in range(record_count):
+            put_time = reader.get(timeout=timeout)
+            latencies.append(time.perf_counter() - put_time)
+
+    read_thread = Thread(target=read)
+    read_thread.start()
+
+    for _ in range(record_count):
+        time.sleep(0.002)
+        ring_buffer.put(time.perf_counter())
+
+    read_thread.join()
+
+    reader.close()
+    ring_buffer.close()
+
+    print('wakeup latency: {:d} records, max {:.1f} ms (get timeout {:.1f} s)'.format(record_count, max(latencies) * 1000.0, timeout))
+
+    return max(latencies)
+
+
+def check_oversized_batch(capacity):
+    """
+    :return: True if a batch larger than half of the buffer (maximum record size) is split into records that fit and
+             all items reach the reader
+    """
+
+    data_hub_worker = DataHubWorker(None, backend='shared_memory', ring_buffer_size=capacity)
+    sink = BenchmarkSink('BenchmarkSink-0', ['sbs1'])
+    data_hub_worker.add_output_module(sink)
+
+    # about 150 bytes per pickled item, so batch fills three quarters of buffer
+    batch = [DataHubItem('sbs1', '{:06d}'.format(index) + 'x' * 100) for index in range(capacity // 200)]
+    data_hub_worker._forward_batch(batch)
+
+    received = []
+    end_time = time.time() + 1.0
+    while len(received) < len(batch) and time.time() < end_time:
+        received += sink.data_input_queue.get(timeout=0.1)
+
+    sink.data_input_queue.close()
+    data_hub_worker._ring_buffer.close()
+
+    print('oversized batch: {:d} items in buffer of {:d} bytes, {:d} received'.format(len(batch), capacity, len(received)))
+
+    return [item.get_content_data() for item in received] == [item.get_content_data() for item in batch]
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Checks of shared memory ring buffer of data hub.')
+    arg_parser.add_argument('--capacity', dest='capacity', type=int, default=4096, help='capacity in bytes of ring buffer')
+    arg_parser.add_argument('--records', dest='records', type=int, default=1000, help='number of records')
+    args = arg_parser.parse_args()
+
+    is_ok = check_wraparound(args.capacity, args.records)
+    is_ok = check_lapped_reader(args.capacity, args.records) and is_ok
+    is_ok = check_content_type_filter() and is_ok
+
+    # notifications must not get lost, so waiting readers must not sleep until timeout
+    is_ok = check_wakeup_latency(200, 1.0) < 0.5 and is_ok
+
+    is_ok = check_oversized_batch(args.capacity) and is_ok
+
+    sys.exit(0 if is_ok else 1)
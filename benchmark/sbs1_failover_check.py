@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""sbs1_failover_check.py: Checks reconnecting and failover of the SBS1 input module with two local SBS1 servers
+(preferred and standby endpoint in failover mode). The preferred server is stopped: the module must switch to the
+standby server, and the waiting time between attempts to reconnect to the preferred server must grow. When the
+preferred server is back, the module must reconnect and switch back to it. Exits with 1 if any step fails."""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmark.benchmark_gnss_reader import CollectingDataHub
+from input.input_network_sbs1 import InputNetworkSbs1, POOL_MODE_FAILOVER
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class LocalSbs1Server(object):
+    """
+    SBS1 server on a local port that sends a position message of its own aircraft to all clients periodically.
+    """
+
+    def __init__(self, loop, icao_id, port=0):
+        self._loop = loop
+        self._message = 'MSG,3,111,11111,{},111111,2015/05/10,18:32:02.542,2015/05/10,18:32:02.513,,3000,,,51.22734,6.80611,,,0,0,0,0\r\n'.format(icao_id).encode()
+        self._server = None
+        self._transports = set()
+
+        self.port = port
+
+    @asyncio.coroutine
+    def start(self):
+        self._server = yield from self._loop.create_server(lambda: Sbs1ServerProtocol(self._transports), '127.0.0.1', self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        # stop listening and close all connections (like a crashed dump1090)
+        self._server.close()
+        for transport in list(self._transports):
+            transport.close()
+
+    def send(self):
+        for transport in self._transports:
+            transport.write(self._message)
+
+
+class Sbs1ServerProtocol(asyncio.Protocol):
+    def __init__(self, transports):
+        self._transports = transports
+        self._transport = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._transports.add(transport)
+
+    def connection_lost(self, exc):
+        self._transports.discard(self._transport)
+
+
+def record_connection_attempts(loop):
+    """
+    :return: Dictionary with list of times of connection attempts per port (filled while loop is running)
+    """
+
+    attempts = {}
+    create_connection = loop.create_connection
+
+    def recording_create_connection(protocol_factory, host=None, port=None, *args, **kwargs):
+        attempts.setdefault(port, []).append(time.time())
+        return create_connection(protocol_factory, host, port, *args, **kwargs)
+
+    loop.create_connection = recording_create_connection
+
+    return attempts
+
+
+def get_sources(data_hub, start_time):
+    """
+    :return: Set of aircraft (i.e., servers) whose messages have been handed over to data hub since start_time
+    """
+    return set(content.split(',')[4] for receive_time, content in data_hub.items if receive_time >= start_time)
+
+
+@asyncio.coroutine
+def wait_for_sources(servers, data_hub, expected_sources, timeout):
+    """
+    :return: Time in seconds until only expected servers are received (None if not within timeout)
+    """
+
+    start_time = time.time()
+
+    while time.time() - start_time < timeout:
+        for server in servers:
+            server.send()
+
+        step_time = time.time()
+        yield from asyncio.sleep(0.05)
+
+        if get_sources(data_hub, step_time) == expected_sources:
+            return time.time() - start_time
+
+    return None
+
+
+@asyncio.coroutine
+def run_check(loop, args):
+    preferred_server = LocalSbs1Server(loop, 'AAAAAA')
+    standby_server = LocalSbs1Server(loop, 'BBBBBB')
+    yield from preferred_server.start()
+    yield from standby_server.start()
+    servers = [preferred_server, standby_server]
+
+    attempts = record_connection_attempts(loop)
+
+    data_hub = CollectingDataHub()
+    input_network_sbs1 = InputNetworkSbs1(data_hub, endpoints=[('127.0.0.1', preferred_server.port), ('127.0.0.1', standby_server.port)], mode=POOL_MODE_FAILOVER, min_backoff=args.min_backoff, max_backoff=args.max_backoff)
+    module_task = loop.create_task(input_network_sbs1.run_async(loop))
+
+    is_ok = True
+
+    # both servers up: only preferred endpoint is used
+    duration = yield from wait_for_sources(servers, data_hub, {'AAAAAA'}, 2.0)
+    print('both servers up: {}'.format('preferred endpoint active after {:.2f} s'.format(duration) if duration is not None else 'preferred endpoint not active'))
+    is_ok = is_ok and duration is not None
+
+    # preferred server stopped: standby endpoint takes over
+    preferred_server.stop()
+    stop_time = time.time()
+
+    duration = yield from wait_for_sources(servers, data_hub, {'BBBBBB'}, 2.0)
+    print('preferred server stopped: {}'.format('standby endpoint active after {:.2f} s'.format(duration) if duration is not None else 'standby endpoint not active'))
+    is_ok = is_ok and duration is not None
+
+    # attempts to reconnect to preferred server back off
+    outage_end_time = stop_time + args.outage_duration
+    while time.time() < outage_end_time:
+        standby_server.send()
+        yield from asyncio.sleep(0.05)
+
+    attempt_times = [attempt_time for attempt_time in attempts.get(preferred_server.port, []) if attempt_time > stop_time]
+    intervals = [second - first for first, second in zip(attempt_times, attempt_times[1:])]
+    print('reconnect attempts during outage: {:d}, intervals {}'.format(len(attempt_times), ['{:.2f}'.format(interval) for interval in intervals]))
+
+    # intervals double until maximum (with some tolerance for scheduling)
+    is_backing_off = len(intervals) >= 3 and all(second >= min(first * 1.5, args.max_backoff * 0.9) for first, second in zip(intervals, intervals[1:]))
+    is_backing_off = is_backing_off and intervals[0] >= args.min_backoff * 0.9 and intervals[-1] <= args.max_backoff * 1.5
+    is_ok = is_ok and is_backing_off
+
+    # preferred server back: module reconnects and switches back
+    yield from preferred_server.start()
+
+    duration = yield from wait_for_sources(servers, data_hub, {'AAAAAA'}, args.max_backoff * 2.0 + 1.0)
+    print('preferred server back: {}'.format('preferred endpoint active after {:.2f} s'.format(duration) if duration is not None else 'preferred endpoint not active'))
+    is_ok = is_ok and duration is not None
+
+    health = input_network_sbs1._endpoint_pool.get_health()
+    print('endpoint health: {}'.format(health))
+    is_ok = is_ok and health[str(input_network_sbs1._endpoint_pool.endpoints[0])]['connections'] == 2 and health[str(input_network_sbs1._endpoint_pool.endpoints[1])]['connected']
+
+    module_task.cancel()
+    try:
+        yield from module_task
+    except asyncio.CancelledError:
+        pass
+
+    for server in servers:
+        server.stop()
+
+    return is_ok
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Check of reconnecting and failover of SBS1 input.')
+    arg_parser.add_argument('--min-backoff', dest='min_backoff', type=float, default=0.1, help='minimum time in seconds between attempts to connect')
+    arg_parser.add_argument('--max-backoff', dest='max_backoff', type=float, default=0.8, help='maximum time in seconds between attempts to connect')
+    arg_parser.add_argument('--outage-duration', dest='outage_duration', type=float, default=3.0, help='time in seconds preferred server is down')
+    args = arg_parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    is_ok = loop.run_until_complete(run_check(loop, args))
+    loop.close()
+
+    sys.exit(0 if is_ok else 1)
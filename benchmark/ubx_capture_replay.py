@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+"""ubx_capture_replay.py: Replays a recorded u-blox serial stream (e.g., recorded with 'cat /dev/ttyACM0 > capture.ubx'
+after configuring NAV-PVT output) through a pseudo terminal into the UBX input module, and checks that all NAV-PVT
+fixes and NMEA sentences of the capture are published and that the receiver is configured. Without a capture, a
+stream of a turning aircraft (10 Hz NAV-PVT interleaved with NMEA sentences and a corrupted frame) is generated."""
+
+import argparse
+import asyncio
+import calendar
+import math
+import os
+import select
+import sys
+import tempfile
+import time
+
+from benchmark.benchmark_gnss_reader import CollectingDataHub, nmea_sentence, SimulatedReceiver
+from input.input_serial_ubx import InputSerialUbx
+from utils.nmea import is_valid_nmea_sentence
+from utils.ubx import encode_ubx_message, parse_nav_pvt, UbxFramer, NAV_PVT_STRUCT, UBX_CFG_MSG, UBX_CFG_RATE, UBX_CLASS_CFG, UBX_CLASS_NAV, UBX_NAV_PVT
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# center and radius of simulated turn
+CENTER_LATITUDE = 51.2
+CENTER_LONGITUDE = 6.8
+TURN_RADIUS_M = 300.0
+GROUND_SPEED_MPS = 40.0
+
+
+def generate_capture(duration, navigation_rate):
+    """
+    :return: Serial stream of a u-blox receiver with NAV-PVT (92 bytes payload) at navigation rate and GGA once per
+             second, with one corrupted NAV-PVT frame
+    """
+
+    capture = b''
+    start_time = calendar.timegm((2015, 6, 1, 12, 0, 0))
+    epoch_count = int(duration * navigation_rate)
+
+    for epoch in range(epoch_count):
+        epoch_time = start_time + epoch / navigation_rate
+        angle = GROUND_SPEED_MPS * (epoch / navigation_rate) / TURN_RADIUS_M
+
+        latitude = CENTER_LATITUDE + math.degrees(TURN_RADIUS_M * math.cos(angle) / 6371000.0)
+        longitude = CENTER_LONGITUDE + math.degrees(TURN_RADIUS_M * math.sin(angle) / 6371000.0 / math.cos(math.radians(CENTER_LATITUDE)))
+        heading = (math.degrees(angle) + 90.0) % 360.0
+
+        utc = time.gmtime(epoch_time)
+        nano = int(round((epoch_time % 1.0) * 1e9))
+
+        payload = NAV_PVT_STRUCT.pack(int(epoch_time * 1000) % 604800000, utc.tm_year, utc.tm_mon, utc.tm_mday, utc.tm_hour, utc.tm_min, utc.tm_sec, 0x07, 30, nano,
+                                      3, 0x01, 0, 9, int(round(longitude * 1e7)), int(round(latitude * 1e7)), 347000, 300000, 2500, 4000,
+                                      int(GROUND_SPEED_MPS * 1000 * math.cos(math.radians(heading))), int(GROUND_SPEED_MPS * 1000 * math.sin(math.radians(heading))), 0,
+                                      int(GROUND_SPEED_MPS * 1000), int(round(heading * 1e5)), 500, 100000, 150)
+        frame = encode_ubx_message(UBX_CLASS_NAV, UBX_NAV_PVT, payload + bytes(92 - len(payload)))
+
+        if epoch == epoch_count // 2:
+            # corrupted frame (wrong checksum)
+            frame = frame[:-1] + bytes(((frame[-1] + 1) & 0xff,))
+
+        capture += frame
+
+        if epoch % int(navigation_rate) == 0:
+            capture += nmea_sentence('GNGGA,{:02d}{:02d}{:02d}.00,5112.000,N,00648.000,E,1,09,1.0,300.0,M,47.0,M,,'.format(utc.tm_hour, utc.tm_min, utc.tm_sec))
+
+    return capture
+
+
+@asyncio.coroutine
+def replay(receiver, capture, navigation_rate, speed):
+    # wait until module is attached
+    yield from asyncio.sleep(0.5)
+
+    # send stream in chunks of one navigation epoch (NAV-PVT frame and following sentences)
+    chunks = []
+    start = 0
+    for index in range(1, len(capture) - 1):
+        if capture[index] == 0xb5 and capture[index + 1] == 0x62:
+            chunks.append(capture[start:index])
+            start = index
+    chunks.append(capture[start:])
+
+    start_time = time.time()
+    for chunk in chunks:
+        receiver.send(chunk)
+        yield from asyncio.sleep(1.0 / navigation_rate / speed if speed > 0 else 0.0)
+
+    yield from asyncio.sleep(0.5)
+
+    return time.time() - start_time
+
+
+def read_configuration(receiver):
+    """
+    :return: List of (message class, message id, payload) tuples that the module has sent to receiver
+    """
+
+    data = b''
+    while select.select([receiver.get_master()], [], [], 0.0)[0]:
+        data += os.read(receiver.get_master(), 4096)
+
+    return [frame for frame in UbxFramer().feed(data) if frame[0] is not None]
+
+
+class ReplayReceiver(SimulatedReceiver):
+    def get_master(self):
+        return self._master
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Replay of u-blox serial streams into the UBX input module.')
+    arg_parser.add_argument('capture', nargs='?', help='path to recorded serial stream (generated if omitted)')
+    arg_parser.add_argument('--write-capture', dest='write_capture', help='write generated stream to this path')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=10.0, help='duration in seconds of generated stream')
+    arg_parser.add_argument('--navigation-rate', dest='navigation_rate', type=float, default=10.0, help='navigation rate in Hz')
+    arg_parser.add_argument('--speed', dest='speed', type=float, default=1.0, help='replay speed factor (0 for as fast as possible)')
+    args = arg_parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, 'rb') as capture_file:
+            capture = capture_file.read()
+    else:
+        capture = generate_capture(args.duration, args.navigation_rate)
+        if args.write_capture:
+            with open(args.write_capture, 'wb') as capture_file:
+                capture_file.write(capture)
+
+    # expected results of offline decoding
+    offline_framer = UbxFramer()
+    frames = offline_framer.feed(capture)
+    expected_fixes = [parse_nav_pvt(payload) for message_class, message_id, payload in frames if message_class == UBX_CLASS_NAV and message_id == UBX_NAV_PVT]
+    expected_sentences = [payload.decode() for message_class, _, payload in frames if message_class is None and is_valid_nmea_sentence(payload) and payload[3:6] in (b'GGA', b'RMC', b'VTG', b'GLL')]
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        device_path = os.path.join(temp_directory, 'ubx')
+
+        receiver = ReplayReceiver(device_path)
+        receiver.plug_in()
+
+        data_hub = CollectingDataHub()
+        input_serial_ubx = InputSerialUbx(data_hub, device_path, 9600, navigation_rate=args.navigation_rate)
+
+        loop = asyncio.get_event_loop()
+        module_task = loop.create_task(input_serial_ubx.run_async(loop))
+
+        replay_duration = loop.run_until_complete(replay(receiver, capture, args.navigation_rate, args.speed))
+        configuration = read_configuration(receiver)
+
+        module_task.cancel()
+        try:
+            loop.run_until_complete(module_task)
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    fixes = [content for _, content in data_hub.items if type(content) is not str]
+    sentences = [content for _, content in data_hub.items if type(content) is str]
+
+    configured_rates = [payload for message_class, message_id, payload in configuration if message_class == UBX_CLASS_CFG and message_id == UBX_CFG_RATE]
+    configured_messages = [payload for message_class, message_id, payload in configuration if message_class == UBX_CLASS_CFG and message_id == UBX_CFG_MSG]
+
+    print('capture: {:d} bytes, {:d} NAV-PVT fixes, {:d} NMEA sentences, {:d} corrupted frames'.format(len(capture), len(expected_fixes), len(expected_sentences), offline_framer.checksum_error_count))
+    print('published: {:d} fixes, {:d} NMEA sentences in {:.1f} s ({:.1f} fixes/s)'.format(len(fixes), len(sentences), replay_duration, len(fixes) / replay_duration))
+    print('configuration: {:d} CFG-RATE, {:d} CFG-MSG messages'.format(len(configured_rates), len(configured_messages)))
+
+    is_ok = (fixes == expected_fixes
+             and sentences == expected_sentences
+             and len(configured_rates) == 1 and int.from_bytes(configured_rates[0][:2], 'little') == int(round(1000.0 / args.navigation_rate))
+             and bytes((UBX_CLASS_NAV, UBX_NAV_PVT, 1)) in configured_messages)
+
+    sys.exit(0 if is_ok else 1)
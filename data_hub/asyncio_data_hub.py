@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import threading
+
+from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_routing_table import DataHubRoutingTable
+from utils.statistics import Statistics
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class AsyncioDataHub(object):
+    """
+    In-memory data hub for running all modules as asyncio tasks in a single event loop. It replaces both the central
+    data hub queue and the DataHubWorker: items handed over via put are forwarded immediately to the asyncio queues of
+    all output modules that requested their content type.
+    """
+
+    def __init__(self, loop):
+        # configure logging
+        self._logger = logging.getLogger('AsyncioDataHub')
+        self._logger.info('Initializing')
+
+        # store event loop and thread running it (put may also be called from other threads)
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+
+        # initialize output module queues and index of output modules by content type
+        self._data_input_queues = []
+        self._output_module_names = []
+        self._routing_table = DataHubRoutingTable()
+
+        # initialize statistics
+        self._statistics = Statistics('AsyncioDataHub')
+
+    def set_statistics_queue(self, statistics_queue):
+        self._statistics.set_statistics_queue(statistics_queue)
+
+    def add_output_module(self, output_module):
+        # generate new queue for passing data to output module
+        data_input_queue = asyncio.Queue()
+
+        # tell output module about queue
+        output_module.set_data_input_queue(data_input_queue)
+
+        # add queue to routing index
+        self._data_input_queues.append(data_input_queue)
+        self._output_module_names.append(output_module.name)
+        self._routing_table.add_subscriber(len(self._data_input_queues) - 1, output_module.get_desired_content_types())
+
+        self._logger.debug('Output module added: ' + str(output_module))
+
+    def put(self, data):
+        # make sure items are forwarded inside event loop
+        if threading.get_ident() != self._loop_thread_id:
+            self._loop.call_soon_threadsafe(self._forward, data)
+        else:
+            self._forward(data)
+
+    def _forward(self, data):
+        # forward poison pill to all output modules
+        if data is None:
+            for data_input_queue in self._data_input_queues:
+                data_input_queue.put_nowait(None)
+
+            return
+
+        if type(data) is not list:
+            data = [data]
+
+        # sort items into batches of output modules that requested their data type
+        output_batches = [[] for data_input_queue in self._data_input_queues]
+        for data_hub_item in data:
+            if type(data_hub_item) is DataHubItem:
+                content_type = data_hub_item.get_content_type()
+
+                for output_module_index in self._routing_table.get_subscribers(content_type):
+                    output_batches[output_module_index].append(data_hub_item)
+
+                self._statistics.count('items_in', content_type)
+            else:
+                self._logger.warning('Dropping data (wrong data type)')
+
+        for data_input_queue, output_module_name, output_batch in zip(self._data_input_queues, self._output_module_names, output_batches):
+            if output_batch:
+                data_input_queue.put_nowait(output_batch)
+
+                self._statistics.count('items_out', output_module_name, len(output_batch))
+
+            self._statistics.set_gauge('queue_depth_' + output_module_name, data_input_queue.qsize())
+
+        self._statistics.publish_if_due()
+
+    def close(self):
+        pass
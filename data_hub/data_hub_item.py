@@ -2,21 +2,92 @@ __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
+# content types that are transferred as small integer codes (order must not be changed, new types are appended)
+CONTENT_TYPES = ('nmea', 'sbs1', 'ogn', 'flarm', 'test', 'sbs1_record', 'ownship_fix')
+CONTENT_TYPE_CODES = {content_type: code for code, content_type in enumerate(CONTENT_TYPES)}
+
+
+def restore_data_hub_item(content_type_code, content_data, timestamp=None, source_type_code=None):
+    """
+    Restores DataHubItem from its compact pickle representation (see DataHubItem.__reduce__).
+
+    :param content_type_code: Integer code of content type or content type string (for types without code)
+    :param content_data: Content data
+    :param timestamp: Ingress timestamp (optional)
+    :param source_type_code: Integer code or string of source type (optional)
+    :return: DataHubItem
+    """
+
+    data_hub_item = DataHubItem.__new__(DataHubItem)
+
+    if type(content_type_code) is int:
+        data_hub_item._content_type = CONTENT_TYPES[content_type_code]
+    else:
+        data_hub_item._content_type = content_type_code
+
+    data_hub_item._content_data = content_data
+    data_hub_item._timestamp = timestamp
+
+    if type(source_type_code) is int:
+        data_hub_item._source_type = CONTENT_TYPES[source_type_code]
+    else:
+        data_hub_item._source_type = source_type_code
+
+    return data_hub_item
+
 
 class DataHubItem(object):
     """
     This class is the main data container for exchanging information between different modules.
+
+    To keep the inter-process communication overhead low, items have no instance dictionary and are pickled as a call
+    to restore_data_hub_item with the integer code of the content type instead of the regular object state.
+
+    Items may carry a trace stamp: the timestamp at which the data entered the system and, for items derived from
+    other items (like FLARM messages generated from SBS1 data), the content type of the original data (source type).
     """
 
-    def __init__(self, content_type, content_data):
-        self.__content_type = content_type
-        self.__content_data = content_data
+    __slots__ = ('_content_type', '_content_data', '_timestamp', '_source_type')
+
+    def __init__(self, content_type, content_data, timestamp=None, source_type=None):
+        self._content_type = content_type
+        self._content_data = content_data
+        self._timestamp = timestamp
+        self._source_type = source_type
+
+    def __reduce__(self):
+        content_type_code = CONTENT_TYPE_CODES.get(self._content_type, self._content_type)
+
+        if self._timestamp is None:
+            return restore_data_hub_item, (content_type_code, self._content_data)
+
+        if self._source_type is None:
+            return restore_data_hub_item, (content_type_code, self._content_data, self._timestamp)
+
+        source_type_code = CONTENT_TYPE_CODES.get(self._source_type, self._source_type)
+
+        return restore_data_hub_item, (content_type_code, self._content_data, self._timestamp, source_type_code)
 
     def __str__(self):
-        return '(' + self.__content_type + ') "' + self.__content_data + '"'
+        return '(' + self._content_type + ') "' + str(self._content_data) + '"'
 
     def get_content_type(self):
-        return self.__content_type
+        return self._content_type
 
     def get_content_data(self):
-        return self.__content_data
+        return self._content_data
+
+    def get_timestamp(self):
+        """
+        :return: Time (as returned by time.time()) at which item entered the system, or None if not set
+        """
+        return self._timestamp
+
+    def get_source_type(self):
+        """
+        :return: Content type of data from which this item originates (own content type if not derived)
+        """
+        if self._source_type is None:
+            return self._content_type
+
+        return self._source_type
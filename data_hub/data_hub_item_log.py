@@ -0,0 +1,216 @@
+import bisect
+import logging
+import mmap
+import os
+import pickle
+import struct
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# file header of item log
+LOG_MAGIC = b'FLBXLOG1'
+
+# record header: payload length, receive time, content type code, payload encoding
+RECORD_HEADER = struct.Struct('<IdBB')
+
+# content type codes of log file format (independent of codes used for inter-process communication, codes must never
+# be changed or reused, new content types get new codes)
+LOG_CONTENT_TYPE_CODES = {
+    'nmea': 0,
+    'sbs1': 1,
+    'ogn': 2,
+    'flarm': 3,
+    'test': 4,
+    'sbs1_record': 5,
+    'ownship_fix': 6,
+}
+LOG_CONTENT_TYPES = {code: content_type for content_type, code in LOG_CONTENT_TYPE_CODES.items()}
+
+# content type code of items whose content type has no integer code (content type is prefixed to payload)
+CONTENT_TYPE_CODE_OTHER = 0xFF
+
+# payload encodings
+PAYLOAD_ENCODING_UTF8 = 0
+PAYLOAD_ENCODING_PICKLE = 1
+
+# entry of time index file: receive time, file offset of first record received at or after this time
+INDEX_ENTRY = struct.Struct('<dQ')
+
+
+def get_index_path(path):
+    return path + '.idx'
+
+
+class DataHubItemLogWriter(object):
+    """
+    Appends data hub items to a compact binary log. Every record consists of a length-prefixed header with the receive
+    time and the integer code of the content type, followed by the content data (UTF-8 for strings, which covers all
+    current content types, pickled otherwise).
+
+    Every index_interval seconds, the receive time and file offset of the next record are appended to a separate index
+    file (path + '.idx'), which allows readers to start at any point in time without scanning the whole log.
+    """
+
+    def __init__(self, path, index_interval=1.0):
+        self._index_interval = index_interval
+        self._next_index_time = 0.0
+
+        is_new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+
+        self._log_file = open(path, 'ab')
+        self._index_file = open(get_index_path(path), 'ab')
+
+        if is_new_file:
+            self._log_file.write(LOG_MAGIC)
+
+    def write(self, data_hub_items, receive_time):
+        """
+        :param data_hub_items: List of data hub items
+        :param receive_time: Time (as returned by time.time()) at which items have been received
+        """
+
+        if receive_time >= self._next_index_time:
+            self._index_file.write(INDEX_ENTRY.pack(receive_time, self._log_file.tell()))
+            self._next_index_time = receive_time + self._index_interval
+
+        records = []
+        for data_hub_item in data_hub_items:
+            content_type = data_hub_item.get_content_type()
+            content_data = data_hub_item.get_content_data()
+
+            content_type_code = LOG_CONTENT_TYPE_CODES.get(content_type, CONTENT_TYPE_CODE_OTHER)
+
+            if type(content_data) is str:
+                payload_encoding = PAYLOAD_ENCODING_UTF8
+                payload = content_data.encode()
+            else:
+                payload_encoding = PAYLOAD_ENCODING_PICKLE
+                payload = pickle.dumps(content_data, protocol=pickle.HIGHEST_PROTOCOL)
+
+            if content_type_code == CONTENT_TYPE_CODE_OTHER:
+                content_type_bytes = content_type.encode()
+                payload = struct.pack('<B', len(content_type_bytes)) + content_type_bytes + payload
+
+            records.append(RECORD_HEADER.pack(len(payload), receive_time, content_type_code, payload_encoding))
+            records.append(payload)
+
+        self._log_file.write(b''.join(records))
+
+    def flush(self):
+        self._log_file.flush()
+        self._index_file.flush()
+
+    def close(self):
+        self._log_file.close()
+        self._index_file.close()
+
+
+class DataHubItemLogReader(object):
+    """
+    Reads a log written by DataHubItemLogWriter via a memory map, so that records are decoded directly from the page
+    cache without copying the file into memory.
+    """
+
+    def __init__(self, path):
+        self._logger = logging.getLogger('DataHubItemLogReader')
+
+        # unknown content type codes (e.g., of logs written by newer versions) that have been reported
+        self._unknown_content_type_codes = set()
+
+        if os.path.getsize(path) < len(LOG_MAGIC):
+            raise ValueError('Not a FlightBox item log: {}'.format(path))
+
+        self._log_file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._log_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(LOG_MAGIC)] != LOG_MAGIC:
+            self.close()
+            raise ValueError('Not a FlightBox item log: {}'.format(path))
+
+        # load time index (optional)
+        self._index_times = []
+        self._index_offsets = []
+        if os.path.exists(get_index_path(path)):
+            with open(get_index_path(path), 'rb') as index_file:
+                for index_time, index_offset in INDEX_ENTRY.iter_unpack(index_file.read()):
+                    self._index_times.append(index_time)
+                    self._index_offsets.append(index_offset)
+
+    def get_offset(self, start_time=None):
+        """
+        :param start_time: Receive time of first record of interest (None for beginning of log)
+        :return: File offset at which reading has to start to get all records received at or after start_time
+        """
+
+        if start_time is None:
+            return len(LOG_MAGIC)
+
+        index_position = bisect.bisect_right(self._index_times, start_time) - 1
+        if index_position < 0:
+            return len(LOG_MAGIC)
+
+        return self._index_offsets[index_position]
+
+    def get_start_time(self):
+        """
+        :return: Receive time of first record, or None if log is empty
+        """
+
+        for receive_time, content_type, content_data in self.read():
+            return receive_time
+
+        return None
+
+    def read(self, offset=None, content_types=None):
+        """
+        Generator of (receive time, content type, content data) tuples in order of the log. Reading stops at a truncated record
+        (e.g., when the recorder has been terminated while writing), records of unknown content types are skipped.
+
+        :param offset: File offset of first record (see get_offset)
+        :param content_types: Set of content types to read (None for all)
+        """
+
+        log_mmap = self._mmap
+        log_size = len(log_mmap)
+
+        if offset is None:
+            offset = len(LOG_MAGIC)
+
+        while offset + RECORD_HEADER.size <= log_size:
+            payload_length, receive_time, content_type_code, payload_encoding = RECORD_HEADER.unpack_from(log_mmap, offset)
+
+            payload_offset = offset + RECORD_HEADER.size
+            offset = payload_offset + payload_length
+
+            if offset > log_size:
+                break
+
+            if content_type_code == CONTENT_TYPE_CODE_OTHER:
+                content_type_length = log_mmap[payload_offset]
+                content_type = log_mmap[payload_offset + 1:payload_offset + 1 + content_type_length].decode()
+                payload_offset += 1 + content_type_length
+            else:
+                content_type = LOG_CONTENT_TYPES.get(content_type_code)
+
+                if content_type is None:
+                    # skip record of unknown content type (report every unknown code once)
+                    if content_type_code not in self._unknown_content_type_codes:
+                        self._unknown_content_type_codes.add(content_type_code)
+                        self._logger.warning('Skipping records of unknown content type code {:d}'.format(content_type_code))
+                    continue
+
+            if content_types is not None and content_type not in content_types:
+                continue
+
+            if payload_encoding == PAYLOAD_ENCODING_UTF8:
+                content_data = log_mmap[payload_offset:offset].decode()
+            else:
+                content_data = pickle.loads(log_mmap[payload_offset:offset])
+
+            yield receive_time, content_type, content_data
+
+    def close(self):
+        self._mmap.close()
+        self._log_file.close()
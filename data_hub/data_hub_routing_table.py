@@ -0,0 +1,45 @@
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class DataHubRoutingTable(object):
+    """
+    Index that maps content types to the subscribers that requested them. The index is compiled whenever a subscriber
+    is added, so that looking up the subscribers of an item is a single dictionary access.
+    """
+
+    def __init__(self):
+        # list of (subscriber, content types) tuples in order of registration
+        self._subscriptions = []
+
+        # compiled index: content type -> list of subscribers (including wildcard subscribers)
+        self._routes = {}
+
+        # subscribers that requested all content types ('ANY')
+        self._wildcard_subscribers = []
+
+    def add_subscriber(self, subscriber, content_types):
+        self._subscriptions.append((subscriber, content_types))
+
+        self._compile()
+
+    def _compile(self):
+        self._wildcard_subscribers = [subscriber for subscriber, content_types in self._subscriptions if 'ANY' in content_types]
+
+        # collect all content types that have been requested explicitly
+        explicit_content_types = set()
+        for subscriber, content_types in self._subscriptions:
+            explicit_content_types.update(content_type for content_type in content_types if content_type != 'ANY')
+
+        # keep order of registration in each route
+        self._routes = {}
+        for content_type in explicit_content_types:
+            self._routes[content_type] = [subscriber for subscriber, content_types in self._subscriptions if content_type in content_types or 'ANY' in content_types]
+
+    def get_subscribers(self, content_type):
+        """
+        :param content_type: Content type of data hub item
+        :return: List of subscribers that requested content type
+        """
+        return self._routes.get(content_type, self._wildcard_subscribers)
@@ -1,8 +1,14 @@
 import logging
+import queue
 import setproctitle
+import time
 from multiprocessing import Process, Queue
 
 from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_routing_table import DataHubRoutingTable
+from data_hub.shared_memory_ring_buffer import SharedMemoryRingBuffer
+from data_hub.subscriber_buffer import SubscriberBuffer, DEFAULT_OVERFLOW_POLICIES
+from utils.statistics import Statistics
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
@@ -13,9 +19,20 @@ class DataHubWorker(Process):
     """
     The DataHubWorker is the central data handling entity that receives DataHubItems from input and transformation
     modules and forwards them as requested by output and transformation modules.
+
+    Items can be handed over to the data hub either one by one or as lists (batches). The worker collects incoming
+    items into batches of up to batch_size items (waiting at most flush_interval seconds for a batch to fill up) and
+    forwards each batch as one list per output module queue.
+
+    Output module queues are bounded (queue_size batches). If an output module falls behind, its items are staged in a
+    SubscriberBuffer, where the overflow policy of each content type (see DEFAULT_OVERFLOW_POLICIES) decides which items
+    are dropped.
+
+    With the 'shared_memory' backend, each batch is written only once into a SharedMemoryRingBuffer instead, and every
+    output module reads the items it is interested in directly from shared memory.
     """
 
-    def __init__(self, data_hub):
+    def __init__(self, data_hub, batch_size=64, flush_interval=0.02, backend='queue', ring_buffer_size=4 * 1024 * 1024, queue_size=16, overflow_policies=None, staging_size=1000):
         # call parent constructor
         super().__init__()
 
@@ -26,37 +43,89 @@ class DataHubWorker(Process):
         # set data hub queue
         self._data_hub = data_hub
 
-        # initialize output modules
+        # store batching parameters
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+
+        # store output module queue parameters
+        self._queue_size = queue_size
+        self._overflow_policies = overflow_policies if overflow_policies is not None else DEFAULT_OVERFLOW_POLICIES
+        self._staging_size = staging_size
+
+        # initialize logging of dropped items
+        self._drop_counts_log_interval = 10.0
+        self._drop_counts_log_time = 0.0
+        self._logged_drop_counts = {}
+
+        # maximum time in seconds to wait for each output module queue at termination (a stalled output module must
+        # not keep the worker from terminating)
+        self._termination_timeout = 1.0
+
+        # initialize shared memory ring buffer (if selected)
+        self._ring_buffer = None
+        if backend == 'shared_memory':
+            self._ring_buffer = SharedMemoryRingBuffer(capacity=ring_buffer_size)
+        elif backend != 'queue':
+            raise ValueError('Unknown data hub backend: {}'.format(backend))
+
+        # initialize output modules and index of output modules by content type
         self._output_modules = []
+        self._routing_table = DataHubRoutingTable()
+
+        # initialize statistics (waiting time for first item of batch is limited so that statistics are published
+        # regularly even if no items arrive)
+        self._statistics = Statistics('DataHubWorker')
+        self._statistics_interval = 1.0
+
+    def set_statistics_queue(self, statistics_queue):
+        self._statistics.set_statistics_queue(statistics_queue)
 
     def run(self):
         setproctitle.setproctitle("flightbox_datahubworker")
 
         self._logger.info('Running')
 
-        while True:
+        is_running = True
+
+        while is_running:
             try:
-                # get new item from data hub
-                data_hub_item = self._data_hub.get()
-
-                # check if item is a poison pill
-                if data_hub_item is None:
-                    # exit loop
-                    break
-
-                if type(data_hub_item) is DataHubItem:
-                    self._logger.debug('Received ' + str(data_hub_item))
-
-                    # iterate over all known output modules
-                    for output_module in self._output_modules:
-                        # check if received data type is in output module's requested data types
-                        if data_hub_item.get_content_type() in output_module['content_types'] \
-                                or 'ANY' in output_module['content_types']:
-                            self._logger.debug('Passing data to ' + str(output_module['output_module']))
-                            # forward data via queue
-                            output_module['queue'].put(data_hub_item)
-                else:
-                    self._logger.warning('Dropping data (wrong data type)')
+                # initialize new batch
+                batch = []
+                batch_deadline = None
+
+                # collect items until batch is full or flush interval has passed
+                while len(batch) < self._batch_size:
+                    try:
+                        if batch_deadline is None:
+                            # wait for first item of batch (only wait for limited time if items are still staged)
+                            if self._has_staged_items():
+                                data = self._data_hub.get(timeout=self._flush_interval)
+                            else:
+                                data = self._data_hub.get(timeout=self._statistics_interval)
+                            batch_deadline = time.time() + self._flush_interval
+                        else:
+                            timeout = batch_deadline - time.time()
+                            if timeout <= 0:
+                                break
+
+                            data = self._data_hub.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+
+                    # check if item is a poison pill
+                    if data is None:
+                        # exit loop after forwarding current batch
+                        is_running = False
+                        break
+
+                    if type(data) is list:
+                        batch.extend(data)
+                    else:
+                        batch.append(data)
+
+                self._forward_batch(batch)
+
+                self._update_statistics()
 
             except(KeyboardInterrupt, SystemExit):
                 break
@@ -64,24 +133,142 @@ class DataHubWorker(Process):
         # close data hub queue
         self._data_hub.close()
 
+        # terminate output modules reading from ring buffer and close ring buffer
+        if self._ring_buffer:
+            self._ring_buffer.put(None)
+            self._ring_buffer.close()
+
         # terminate output modules and close queues
         for output_module in self._output_modules:
+            # hand over remaining items (items that cannot be delivered in time are dropped)
+            if not output_module['buffer'].flush(timeout=self._termination_timeout):
+                dropped_count = output_module['buffer'].drop_staged_items()
+                self._logger.warning('Dropped {:d} staged items of {} at termination (output module falling behind)'.format(dropped_count, output_module['name']))
+
             # send poison pill to output module
-            output_module['queue'].put(None)
+            try:
+                output_module['queue'].put(None, timeout=self._termination_timeout)
+            except queue.Full:
+                self._logger.warning('Could not send poison pill to {} (queue full)'.format(output_module['name']))
+
+                # do not wait for queued data to be written to a queue nobody reads from
+                output_module['queue'].cancel_join_thread()
 
             # close queue
             output_module['queue'].close()
 
         self._logger.info('Terminating')
 
+    def _forward_batch(self, batch):
+        # compile list of valid items
+        data_hub_items = []
+        for data_hub_item in batch:
+            if type(data_hub_item) is DataHubItem:
+                data_hub_items.append(data_hub_item)
+            else:
+                self._logger.warning('Dropping data (wrong data type)')
+
+        if not data_hub_items and not self._has_staged_items():
+            return
+
+        start_time = time.time()
+
+        self._statistics.count_items('items_in', data_hub_items)
+
+        if data_hub_items:
+            self._logger.debug('Received batch of {:d} items'.format(len(data_hub_items)))
+
+            # write batch once to ring buffer (output modules filter items themselves)
+            if self._ring_buffer:
+                self._put_into_ring_buffer(data_hub_items)
+
+                self._statistics.add_time('processing', time.time() - start_time)
+
+                return
+
+        # sort items into batches of output modules that requested their data type
+        output_batches = [[] for output_module in self._output_modules]
+        for data_hub_item in data_hub_items:
+            for output_module_index in self._routing_table.get_subscribers(data_hub_item.get_content_type()):
+                output_batches[output_module_index].append(data_hub_item)
+
+        for output_module, output_batch in zip(self._output_modules, output_batches):
+            if output_batch:
+                self._logger.debug('Passing {:d} items to {}'.format(len(output_batch), str(output_module['output_module'])))
+                output_module['buffer'].add(output_batch)
+
+                self._statistics.count('items_out', output_module['name'], len(output_batch))
+
+            # forward data via queue (items stay in buffer if output module is falling behind)
+            output_module['buffer'].flush()
+
+        self._statistics.add_time('processing', time.time() - start_time)
+
+        self._log_drop_counts()
+
+    def _put_into_ring_buffer(self, data_hub_items):
+        try:
+            self._ring_buffer.put(data_hub_items)
+        except ValueError:
+            # batch is too large for ring buffer, so split it (items that do not fit on their own are dropped)
+            if len(data_hub_items) > 1:
+                self._put_into_ring_buffer(data_hub_items[:len(data_hub_items) // 2])
+                self._put_into_ring_buffer(data_hub_items[len(data_hub_items) // 2:])
+            else:
+                self._logger.warning('Dropping item of type {} (too large for ring buffer)'.format(data_hub_items[0].get_content_type()))
+                self._statistics.count_items('dropped_oversized', data_hub_items)
+
+    def _update_statistics(self):
+        for output_module in self._output_modules:
+            # queue depth (in batches) is not available on all platforms (e.g., Mac OS X)
+            try:
+                self._statistics.set_gauge('queue_depth_' + output_module['name'], output_module['queue'].qsize())
+            except NotImplementedError:
+                pass
+
+            self._statistics.set_gauge('dropped_' + output_module['name'], output_module['buffer'].get_drop_counts())
+
+        self._statistics.publish_if_due()
+
+    def _has_staged_items(self):
+        for output_module in self._output_modules:
+            if output_module['buffer'].has_staged_items():
+                return True
+
+        return False
+
+    def _log_drop_counts(self):
+        current_time = time.time()
+        if current_time - self._drop_counts_log_time < self._drop_counts_log_interval:
+            return
+
+        self._drop_counts_log_time = current_time
+
+        for output_module in self._output_modules:
+            drop_counts = output_module['buffer'].get_drop_counts()
+            if drop_counts and drop_counts != self._logged_drop_counts.get(output_module['name']):
+                self._logged_drop_counts[output_module['name']] = drop_counts
+                self._logger.warning('Dropped items of {} (output module falling behind): {}'.format(output_module['name'], drop_counts))
+
     def add_output_module(self, output_module):
-        # generate new queue for inter-process communication
-        queue = Queue()
+        if self._ring_buffer:
+            # generate new reader of ring buffer
+            output_module.set_data_input_queue(self._ring_buffer.create_reader(output_module.get_desired_content_types()))
+
+            self._logger.debug('Output module added: ' + str(output_module))
+
+            return
+
+        # generate new (bounded) queue for inter-process communication
+        data_input_queue = Queue(maxsize=self._queue_size)
 
         # tell output module about queue
-        output_module.set_data_input_queue(queue)
+        output_module.set_data_input_queue(data_input_queue)
 
         # add module to internal list
-        self._output_modules.append({'output_module': output_module, 'queue': queue, 'content_types': output_module.get_desired_content_types()})
+        self._output_modules.append({'output_module': output_module, 'name': output_module.name, 'queue': data_input_queue, 'buffer': SubscriberBuffer(data_input_queue, self._overflow_policies, staging_size=self._staging_size), 'content_types': output_module.get_desired_content_types()})
+
+        # update routing index
+        self._routing_table.add_subscriber(len(self._output_modules) - 1, self._output_modules[-1]['content_types'])
 
         self._logger.debug('Output module added: ' + str(self._output_modules[-1]))
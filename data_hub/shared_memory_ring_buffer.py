@@ -0,0 +1,232 @@
+import logging
+from collections import deque
+from multiprocessing import Condition
+from multiprocessing.shared_memory import SharedMemory
+import pickle
+import struct
+
+from data_hub.data_hub_item import DataHubItem
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# header: write position, sequence number of next record, position of oldest record, sequence number of oldest record
+HEADER_FORMAT = '<QQQQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# record header: payload length, sequence number
+RECORD_HEADER_FORMAT = '<IQ'
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER_FORMAT)
+
+# marker that is written instead of a payload length if the remaining space at the end of the buffer is skipped
+WRAP_MARKER = 0xFFFFFFFF
+
+
+class SharedMemoryRingBuffer(object):
+    """
+    Single-producer/multi-consumer ring buffer in shared memory. The producer (DataHubWorker) appends pickled records,
+    and every consumer reads them in place via its own SharedMemoryRingBufferReader, which keeps its own read position.
+    Positions are byte offsets that increase monotonically; the offset inside the buffer is the position modulo the
+    buffer capacity.
+
+    The producer never waits for consumers. Records that are overwritten before a slow consumer could read them are
+    skipped by that consumer (it has been lapped), and the number of lost records is counted.
+    """
+
+    def __init__(self, capacity=4 * 1024 * 1024):
+        # configure logging
+        self._logger = logging.getLogger('SharedMemoryRingBuffer')
+        self._logger.info('Initializing')
+
+        # create shared memory block (header and data region)
+        self._capacity = capacity
+        self._shared_memory = SharedMemory(create=True, size=HEADER_SIZE + capacity)
+
+        # condition is used to protect header and to notify readers about new records
+        self._condition = Condition()
+
+        # initialize producer state
+        self._write_position = 0
+        self._write_sequence = 0
+        self._tail_position = 0
+        self._tail_sequence = 0
+
+        # start positions and sequence numbers of all records that are still in buffer (only known by producer)
+        self._records = deque()
+
+        self._write_header()
+
+    def _write_header(self):
+        struct.pack_into(HEADER_FORMAT, self._shared_memory.buf, 0, self._write_position, self._write_sequence, self._tail_position, self._tail_sequence)
+
+    def create_reader(self, content_types=None):
+        """
+        :param content_types: List of content types the reader is interested in (None or 'ANY' for all)
+        :return: New reader that starts at the current write position
+        """
+        return SharedMemoryRingBufferReader(self._shared_memory, self._capacity, self._condition, content_types, self._write_position, self._write_sequence)
+
+    def put(self, obj):
+        payload = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        record_size = RECORD_HEADER_SIZE + len(payload)
+
+        if record_size > self._capacity // 2:
+            raise ValueError('Record of {:d} bytes does not fit into ring buffer of {:d} bytes'.format(record_size, self._capacity))
+
+        # skip remaining space at end of buffer if record does not fit
+        position = self._write_position
+        remaining = self._capacity - position % self._capacity
+        if remaining < record_size:
+            position += remaining
+
+        end_position = position + record_size
+
+        # release all records that will be overwritten by new record
+        while self._records and self._records[0][0] < end_position - self._capacity:
+            self._records.popleft()
+        if self._records:
+            self._tail_position, self._tail_sequence = self._records[0]
+        else:
+            self._tail_position, self._tail_sequence = position, self._write_sequence
+
+        # publish new tail before overwriting data, so that readers can detect records that became invalid
+        with self._condition:
+            self._write_header()
+
+        # mark skipped space at end of buffer (may overwrite oldest record, which has been released above)
+        if position != self._write_position and remaining >= RECORD_HEADER_SIZE:
+            struct.pack_into(RECORD_HEADER_FORMAT, self._shared_memory.buf, HEADER_SIZE + self._write_position % self._capacity, WRAP_MARKER, self._write_sequence)
+
+        # write record
+        offset = HEADER_SIZE + position % self._capacity
+        struct.pack_into(RECORD_HEADER_FORMAT, self._shared_memory.buf, offset, len(payload), self._write_sequence)
+        self._shared_memory.buf[offset + RECORD_HEADER_SIZE:offset + record_size] = payload
+
+        self._records.append((position, self._write_sequence))
+        self._write_position = end_position
+        self._write_sequence += 1
+
+        # publish new write position and wake up readers
+        with self._condition:
+            self._write_header()
+            self._condition.notify_all()
+
+    def close(self):
+        self._shared_memory.close()
+        self._shared_memory.unlink()
+
+
+class SharedMemoryRingBufferReader(object):
+    """
+    Consumer side of SharedMemoryRingBuffer. Provides the same get/close interface as the queues that are used as data
+    input queues of output modules.
+    """
+
+    def __init__(self, shared_memory, capacity, condition, content_types, read_position, read_sequence):
+        # configure logging
+        self._logger = logging.getLogger('SharedMemoryRingBufferReader')
+
+        # store arguments in object variables
+        self._shared_memory = shared_memory
+        self._capacity = capacity
+        self._condition = condition
+        self._read_position = read_position
+        self._read_sequence = read_sequence
+
+        # determine content type filter
+        self._content_types = None
+        if content_types is not None and 'ANY' not in content_types:
+            self._content_types = set(content_types)
+
+        # records that have been read from buffer but not yet returned
+        self._pending = deque()
+
+        # number of records lost because reader has been lapped by producer
+        self._lapped_count = 0
+
+    def _read_header(self):
+        with self._condition:
+            return struct.unpack_from(HEADER_FORMAT, self._shared_memory.buf, 0)
+
+    def _has_new_records(self):
+        # caller holds condition
+        return struct.unpack_from(HEADER_FORMAT, self._shared_memory.buf, 0)[0] != self._read_position
+
+    def _skip_lapped(self, tail_position, tail_sequence):
+        if self._read_position < tail_position:
+            lost_count = tail_sequence - self._read_sequence
+            self._lapped_count += lost_count
+            self._logger.warning('Reader has been lapped, skipping {:d} records'.format(lost_count))
+
+            self._read_position = tail_position
+            self._read_sequence = tail_sequence
+
+    def _read_records(self, timeout):
+        # wait for new records (header is checked while holding condition, so that notifications cannot get lost)
+        with self._condition:
+            self._condition.wait_for(self._has_new_records, timeout)
+            write_position, write_sequence, tail_position, tail_sequence = struct.unpack_from(HEADER_FORMAT, self._shared_memory.buf, 0)
+
+        self._skip_lapped(tail_position, tail_sequence)
+
+        # read all available records in place
+        records = []
+        buf = self._shared_memory.buf
+        position = self._read_position
+        while position < write_position:
+            remaining = self._capacity - position % self._capacity
+            if remaining < RECORD_HEADER_SIZE:
+                position += remaining
+                continue
+
+            offset = HEADER_SIZE + position % self._capacity
+            payload_length, sequence = struct.unpack_from(RECORD_HEADER_FORMAT, buf, offset)
+            if payload_length == WRAP_MARKER:
+                position += remaining
+                continue
+
+            try:
+                records.append((position, pickle.loads(buf[offset + RECORD_HEADER_SIZE:offset + RECORD_HEADER_SIZE + payload_length])))
+            except Exception:
+                # record has been overwritten while reading, will be detected below
+                records.append((position, None))
+
+            position += RECORD_HEADER_SIZE + payload_length
+
+        # check if producer has overwritten any of the records in the meantime
+        write_position, write_sequence, tail_position, tail_sequence = self._read_header()
+        if records and records[0][0] < tail_position:
+            # positions of subsequent records cannot be trusted either, so discard all records and restart at tail
+            self._skip_lapped(tail_position, tail_sequence)
+            return
+
+        self._read_position = position
+        self._read_sequence += len(records)
+
+        for record_position, record in records:
+            # apply content type filter to batches of data hub items
+            if self._content_types is not None and type(record) is list:
+                record = [data_hub_item for data_hub_item in record if type(data_hub_item) is not DataHubItem or data_hub_item.get_content_type() in self._content_types]
+                if not record:
+                    continue
+
+            self._pending.append(record)
+
+    def get(self, timeout=1.0):
+        """
+        Blocks until a record is available.
+
+        :param timeout: Interval in seconds in which the shared header is checked again while waiting
+        :return: Next record
+        """
+        while not self._pending:
+            self._read_records(timeout)
+
+        return self._pending.popleft()
+
+    def get_lapped_count(self):
+        return self._lapped_count
+
+    def close(self):
+        self._shared_memory.close()
@@ -0,0 +1,160 @@
+from collections import deque, OrderedDict
+import queue
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# keep up to a limited number of items per content type and drop the oldest ones when the subscriber falls behind
+OVERFLOW_POLICY_DROP_OLDEST = 'drop_oldest'
+
+# keep only the latest item per content type and message type (e.g., per NMEA sentence type)
+OVERFLOW_POLICY_LATEST = 'latest'
+
+# never drop items, wait until subscriber has read enough items from its queue
+OVERFLOW_POLICY_BLOCK = 'block'
+
+OVERFLOW_POLICIES = (OVERFLOW_POLICY_DROP_OLDEST, OVERFLOW_POLICY_LATEST, OVERFLOW_POLICY_BLOCK)
+
+DEFAULT_OVERFLOW_POLICIES = {
+    'sbs1': OVERFLOW_POLICY_DROP_OLDEST,
+    'sbs1_record': OVERFLOW_POLICY_DROP_OLDEST,
+    'ogn': OVERFLOW_POLICY_DROP_OLDEST,
+    'flarm': OVERFLOW_POLICY_DROP_OLDEST,
+    'nmea': OVERFLOW_POLICY_LATEST,
+    'ownship_fix': OVERFLOW_POLICY_LATEST,
+}
+
+
+def get_message_key(data_hub_item):
+    """
+    :param data_hub_item: DataHubItem
+    :return: Key that identifies the message type of an item, like the NMEA sentence identifier ('$GPGGA')
+    """
+
+    content_data = data_hub_item.get_content_data()
+    if type(content_data) is str:
+        return data_hub_item.get_content_type(), content_data.partition(',')[0]
+
+    return data_hub_item.get_content_type(), None
+
+
+class SubscriberBuffer(object):
+    """
+    Staging area in front of the bounded queue of one subscriber (output or transformation module). Items that cannot
+    be put into the queue because the subscriber is falling behind are kept here, and the overflow policy of their
+    content type decides which of them are dropped. This way, a stalled subscriber neither blocks the data hub worker
+    (except for items with the 'block' policy) nor lets memory grow without bound.
+    """
+
+    def __init__(self, data_input_queue, overflow_policies, default_overflow_policy=OVERFLOW_POLICY_BLOCK, staging_size=1000):
+        # store arguments in object variables
+        self._data_input_queue = data_input_queue
+        self._overflow_policies = overflow_policies
+        self._default_overflow_policy = default_overflow_policy
+        self._staging_size = staging_size
+
+        # staged items in order of arrival (sequence number -> item)
+        self._staged_items = OrderedDict()
+        self._sequence_number = 0
+
+        # indexes of staged items for overflow policies
+        self._drop_oldest_sequence_numbers = {}
+        self._latest_sequence_numbers = {}
+        self._blocking_item_count = 0
+
+        # number of dropped items per content type
+        self._drop_counts = {}
+
+    def _drop(self, sequence_number):
+        data_hub_item = self._staged_items.pop(sequence_number, None)
+        if data_hub_item is not None:
+            content_type = data_hub_item.get_content_type()
+            self._drop_counts[content_type] = self._drop_counts.get(content_type, 0) + 1
+
+    def add(self, data_hub_items):
+        for data_hub_item in data_hub_items:
+            sequence_number = self._sequence_number
+            self._sequence_number += 1
+
+            content_type = data_hub_item.get_content_type()
+            overflow_policy = self._overflow_policies.get(content_type, self._default_overflow_policy)
+
+            if overflow_policy == OVERFLOW_POLICY_DROP_OLDEST:
+                sequence_numbers = self._drop_oldest_sequence_numbers.get(content_type)
+                if sequence_numbers is None:
+                    sequence_numbers = self._drop_oldest_sequence_numbers[content_type] = deque()
+
+                sequence_numbers.append(sequence_number)
+                if len(sequence_numbers) > self._staging_size:
+                    self._drop(sequence_numbers.popleft())
+
+            elif overflow_policy == OVERFLOW_POLICY_LATEST:
+                message_key = get_message_key(data_hub_item)
+
+                previous_sequence_number = self._latest_sequence_numbers.get(message_key)
+                if previous_sequence_number is not None:
+                    self._drop(previous_sequence_number)
+
+                self._latest_sequence_numbers[message_key] = sequence_number
+
+            else:
+                self._blocking_item_count += 1
+
+            self._staged_items[sequence_number] = data_hub_item
+
+    def flush(self, timeout=None):
+        """
+        Hands over all staged items to subscriber queue as one batch. Blocks only if staged items contain items with
+        'block' policy; otherwise items stay staged if queue is full.
+
+        :param timeout: Maximum time in seconds to wait for free space in queue (for all policies), None waits forever
+                        for items with 'block' policy only
+        :return: True if staged items have been handed over (or there were none), False if queue was full
+        """
+
+        if not self._staged_items:
+            return True
+
+        try:
+            if timeout is None:
+                self._data_input_queue.put(list(self._staged_items.values()), block=self._blocking_item_count > 0)
+            else:
+                self._data_input_queue.put(list(self._staged_items.values()), timeout=timeout)
+        except queue.Full:
+            return False
+
+        # reset staging area
+        self._staged_items.clear()
+        self._drop_oldest_sequence_numbers.clear()
+        self._latest_sequence_numbers.clear()
+        self._blocking_item_count = 0
+
+        return True
+
+    def has_staged_items(self):
+        return len(self._staged_items) > 0
+
+    def drop_staged_items(self):
+        """
+        Drops all staged items (counted as dropped), e.g., if they cannot be delivered at termination.
+
+        :return: Number of dropped items
+        """
+
+        dropped_count = len(self._staged_items)
+
+        for sequence_number in list(self._staged_items):
+            self._drop(sequence_number)
+
+        self._drop_oldest_sequence_numbers.clear()
+        self._latest_sequence_numbers.clear()
+        self._blocking_item_count = 0
+
+        return dropped_count
+
+    def get_drop_counts(self):
+        """
+        :return: Dictionary with number of dropped items per content type
+        """
+        return dict(self._drop_counts)
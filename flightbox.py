@@ -3,24 +3,35 @@
 """flightbox.py: Main FlightBox interface."""
 
 import argparse
+import asyncio
 import logging
 import logging.handlers
 from multiprocessing import Queue
 import multiprocessing.util
 import os
+import queue
 import setproctitle
 import time
 
 # enable asyncio debug mode
 # os.environ['PYTHONASYNCIODEBUG'] = '1'
 
+from data_hub.asyncio_data_hub import AsyncioDataHub
 from data_hub.data_hub_worker import DataHubWorker
+from data_hub.subscriber_buffer import DEFAULT_OVERFLOW_POLICIES, OVERFLOW_POLICIES
 from input.test_data_generator import TestDataGenerator
-from input.input_network_sbs1 import InputNetworkSbs1
+from input.input_file_replay import InputFileReplay
+from input.input_network_beast import InputNetworkBeast
+from input.input_network_sbs1 import InputNetworkSbs1, POOL_MODES
 from input.input_network_ogn_server import InputNetworkOgnServer
 from input.input_serial_gnss import InputSerialGnss
+from input.input_serial_ubx import InputSerialUbx
+from output.output_file_recorder import OutputFileRecorder
 from output.output_network_airconnect import OutputNetworkAirConnect
-from transformation.transformation_sbs1ognnmea_flarm import Sbs1OgnNmeaToFlarmTransformation
+from transformation.transformation_sbs1ognnmea_flarm import Sbs1OgnNmeaToFlarmTransformation, TRAFFIC_CALCULATION_MODES
+from utils.geodesy import GEODESY_BACKENDS
+from utils.range_filter import OwnshipPosition, RangeFilter
+from utils.statistics_server import StatisticsServer
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
@@ -29,9 +40,70 @@ __email__ = "thorsten.biermann@gmail.com"
 
 arg_parser = argparse.ArgumentParser(description='FlightBox collects input from various devices, like GNSS, ADS-B, and combines them in one NMEA (FLARM) data stream.')
 arg_parser.add_argument('--log-file', dest='log_file', help='path to log file')
-arg_parser.set_defaults(log_file='/tmp/flightbox.log')
+arg_parser.add_argument('--runtime', dest='runtime', choices=['multiprocessing', 'asyncio'], help='run modules in separate processes or as tasks in a single asyncio event loop')
+arg_parser.add_argument('--batch-size', dest='batch_size', type=int, help='maximum number of data hub items forwarded in one batch')
+arg_parser.add_argument('--flush-interval', dest='flush_interval', type=float, help='maximum time in seconds the data hub waits for a batch to fill up')
+arg_parser.add_argument('--data-hub-backend', dest='data_hub_backend', choices=['queue', 'shared_memory'], help='transport used for forwarding data hub items to output modules')
+arg_parser.add_argument('--ring-buffer-size', dest='ring_buffer_size', type=int, help='size in bytes of shared memory ring buffer (shared_memory backend only)')
+arg_parser.add_argument('--queue-size', dest='queue_size', type=int, help='maximum number of batches waiting in queue of each output module')
+arg_parser.add_argument('--overflow-policy', dest='overflow_policies', action='append', metavar='CONTENT_TYPE=POLICY', help='overflow policy ({}) for content type, can be given multiple times'.format(', '.join(OVERFLOW_POLICIES)))
+arg_parser.add_argument('--stats-port', dest='stats_port', type=int, help='local TCP port serving statistics of all modules as JSON (0 disables statistics)')
+arg_parser.add_argument('--trace-sample-interval', dest='trace_sample_interval', type=int, help='trace latency of every n-th input item from ingress to client (0 disables tracing)')
+arg_parser.add_argument('--record', dest='record_path', help='record all data hub items in binary log at this path')
+arg_parser.add_argument('--replay', dest='replay_path', help='replay binary log at this path instead of using input modules')
+arg_parser.add_argument('--replay-speed', dest='replay_speed', type=float, help='replay speed factor (0 for as fast as possible)')
+arg_parser.add_argument('--replay-content-types', dest='replay_content_types', help='comma-separated list of content types to replay')
+arg_parser.add_argument('--sbs1-records', dest='sbs1_records', action='store_true', help='parse SBS1 messages once in input module and publish typed records')
+arg_parser.add_argument('--sbs1-endpoint', dest='sbs1_endpoints', action='append', metavar='HOST:PORT', help='SBS1 server (like dump1090), can be given multiple times (default: 127.0.0.1:30003)')
+arg_parser.add_argument('--sbs1-mode', dest='sbs1_mode', choices=POOL_MODES, help='merge messages of all SBS1 servers or use them for failover (in order of configuration)')
+arg_parser.add_argument('--sbs1-conflation-interval', dest='sbs1_conflation_interval', type=float, help='hand over only latest SBS1 message per aircraft and message type in this interval in seconds (0 disables conflation)')
+arg_parser.add_argument('--adsb-input', dest='adsb_input', choices=['sbs1', 'beast'], help='ADS-B receiver interface: SBS1 text messages or Beast binary frames (decoded by FlightBox)')
+arg_parser.add_argument('--beast-endpoint', dest='beast_endpoint', metavar='HOST:PORT', help='Beast server (like dump1090)')
+arg_parser.add_argument('--receiver-position', dest='receiver_position', metavar='LAT,LON', help='position of ADS-B receiver (enables decoding of surface positions of Beast input)')
+arg_parser.add_argument('--max-extrapolation-time', dest='max_extrapolation_time', type=float, help='maximum time in seconds positions of own aircraft and traffic are dead-reckoned to time of FLARM message generation (0 disables extrapolation)')
+arg_parser.add_argument('--traffic-calculation', dest='traffic_calculation', choices=TRAFFIC_CALCULATION_MODES, help='calculate traffic positions per aircraft (scalar) or for all aircraft at once with NumPy (vectorized, auto uses it if NumPy is available and enough aircraft are tracked)')
+arg_parser.add_argument('--geodesy', dest='geodesy', choices=sorted(GEODESY_BACKENDS), help='calculation of distances and bearings of traffic: WGS-84 ellipsoid (vincenty, karney), sphere (spherical), or local tangent plane (flat, fastest, errors up to 0.44 m within FLARM range)')
+arg_parser.add_argument('--max-aircraft', dest='max_aircraft', type=int, help='maximum number of tracked aircraft, least recently seen aircraft are dropped first (0 for no limit)')
+arg_parser.add_argument('--range-filter-radius', dest='range_filter_radius', type=float, help='drop ADS-B and OGN traffic outside of +/- this distance in meters around own position (0 disables filter)')
+arg_parser.add_argument('--gnss-port', dest='gnss_port', help='serial device of GNSS receiver')
+arg_parser.add_argument('--gnss-baud-rate', dest='gnss_baud_rate', type=int, help='baud rate of GNSS receiver')
+arg_parser.add_argument('--gnss-sentences', dest='gnss_sentences', metavar='TYPES', help='comma-separated NMEA sentence types (like GGA, any talker) or addresses (like GPGGA) that are forwarded from GNSS receiver (\'all\' forwards all sentences)')
+arg_parser.add_argument('--gnss-protocol', dest='gnss_protocol', choices=['nmea', 'ubx'], help='GNSS receiver interface: NMEA sentences or u-blox UBX NAV-PVT messages (u-blox 7 or later)')
+arg_parser.add_argument('--gnss-navigation-rate', dest='gnss_navigation_rate', type=float, help='navigation solutions per second of u-blox receiver (UBX protocol only)')
+arg_parser.set_defaults(log_file='/tmp/flightbox.log', runtime='multiprocessing', batch_size=64, flush_interval=0.02, data_hub_backend='queue', ring_buffer_size=4 * 1024 * 1024, queue_size=16, overflow_policies=[], stats_port=8088, trace_sample_interval=0, replay_speed=1.0, replay_content_types='nmea,sbs1,sbs1_record,ogn,ownship_fix', sbs1_endpoints=[], sbs1_mode='merge', sbs1_conflation_interval=0.0, adsb_input='sbs1', beast_endpoint='127.0.0.1:30005', max_extrapolation_time=5.0, traffic_calculation='auto', geodesy='vincenty', max_aircraft=1000, range_filter_radius=40000.0, gnss_port='/dev/ttyACM0', gnss_baud_rate=9600, gnss_sentences='GGA,RMC,VTG,GLL', gnss_protocol='nmea', gnss_navigation_rate=10.0)
 args = arg_parser.parse_args()
 
+# compile SBS1 endpoints
+sbs1_endpoints = []
+for sbs1_endpoint in args.sbs1_endpoints or ['127.0.0.1:30003']:
+    host_name, _, port = sbs1_endpoint.rpartition(':')
+    if not host_name or not port.isdigit():
+        arg_parser.error('invalid SBS1 endpoint: {}'.format(sbs1_endpoint))
+    sbs1_endpoints.append((host_name, int(port)))
+
+# compile Beast endpoint
+beast_host_name, _, beast_port = args.beast_endpoint.rpartition(':')
+if not beast_host_name or not beast_port.isdigit():
+    arg_parser.error('invalid Beast endpoint: {}'.format(args.beast_endpoint))
+
+# compile receiver position
+receiver_position = None
+if args.receiver_position:
+    try:
+        receiver_position = tuple(float(value) for value in args.receiver_position.split(','))
+    except ValueError:
+        receiver_position = ()
+    if len(receiver_position) != 2:
+        arg_parser.error('invalid receiver position: {}'.format(args.receiver_position))
+
+# compile overflow policies of output module queues
+overflow_policies = dict(DEFAULT_OVERFLOW_POLICIES)
+for overflow_policy in args.overflow_policies:
+    content_type, _, policy = overflow_policy.partition('=')
+    if policy not in OVERFLOW_POLICIES:
+        arg_parser.error('invalid overflow policy: {}'.format(overflow_policy))
+    overflow_policies[content_type] = policy
+
 
 class LoggingFilter(logging.Filter):
     def filter(self, record):
@@ -40,6 +112,8 @@ class LoggingFilter(logging.Filter):
             return False
         elif record.name.startswith('InputNetworkSbs1'):
             return False
+        elif record.name.startswith('InputNetworkBeast'):
+            return False
 
         return True
 
@@ -98,7 +172,103 @@ def flightbox_init():
     flightbox_logger.info('Started logging framework')
 
 
-# main function
+# statistics setup (identical for all runtimes)
+def flightbox_init_statistics(modules, statistics_queue):
+    """
+    :param modules: Modules (and data hub) that publish their statistics
+    :param statistics_queue: Queue into which modules put their statistics snapshots
+    """
+    global args
+    global statistics_server
+
+    if args.stats_port == 0:
+        return
+
+    for module in modules:
+        module.set_statistics_queue(statistics_queue)
+
+    # start statistics server in main process
+    statistics_server = StatisticsServer(statistics_queue, port=args.stats_port)
+    statistics_server.start()
+
+
+# module setup (identical for all runtimes)
+def flightbox_create_modules(data_hub, data_hub_worker):
+    """
+    :param data_hub: Data hub to which input and transformation modules hand over their items
+    :param data_hub_worker: Object that forwards items to output and transformation modules (provides add_output_module)
+    :return: Tuple of output/transformation modules and input modules
+    """
+    global args
+
+    # initialize module lists
+    output_modules = []
+    input_modules = []
+
+    # instantiate AirConnect (output) module
+    air_connect_output = OutputNetworkAirConnect()
+    data_hub_worker.add_output_module(air_connect_output)
+    output_modules.append(air_connect_output)
+
+    # instantiate SBS1/OGN/NMEA to FLARM transformation module
+    sbs1ognnmea_to_flarm_transformation = Sbs1OgnNmeaToFlarmTransformation(data_hub, max_extrapolation_time=args.max_extrapolation_time, traffic_calculation=args.traffic_calculation, geodesy=args.geodesy, max_aircraft=args.max_aircraft)
+    data_hub_worker.add_output_module(sbs1ognnmea_to_flarm_transformation)
+    output_modules.append(sbs1ognnmea_to_flarm_transformation)
+
+    # instantiate recorder (output) module
+    if args.record_path:
+        file_recorder_output = OutputFileRecorder(args.record_path)
+        data_hub_worker.add_output_module(file_recorder_output)
+        output_modules.append(file_recorder_output)
+
+    if args.replay_path:
+        # instantiate replay (input) module, which replaces all other input modules
+        input_file_replay = InputFileReplay(data_hub, args.replay_path, speed=args.replay_speed, content_types=args.replay_content_types.split(','), batch_size=args.batch_size)
+        input_modules.append(input_file_replay)
+    else:
+        # instantiate test data (input) module
+        # test_data_generator = TestDataGenerator(data_hub)
+        # input_modules.append(test_data_generator)
+
+        # own position is shared by GNSS module with range filters of traffic input modules
+        ownship_position = OwnshipPosition()
+
+        def create_range_filter():
+            if args.range_filter_radius > 0:
+                return RangeFilter(ownship_position, args.range_filter_radius)
+
+            return None
+
+        if args.adsb_input == 'beast':
+            # instantiate Beast (input) module
+            input_network_beast = InputNetworkBeast(data_hub, beast_host_name, int(beast_port), reference_position=receiver_position, range_filter=create_range_filter())
+            input_modules.append(input_network_beast)
+        else:
+            # instantiate SBS1 (input) module
+            input_network_sbs1 = InputNetworkSbs1(data_hub, message_types=['1', '2', '3', '4'], publish_records=args.sbs1_records, endpoints=sbs1_endpoints, mode=args.sbs1_mode, conflation_interval=args.sbs1_conflation_interval, range_filter=create_range_filter())
+            input_modules.append(input_network_sbs1)
+
+        # instantiate OGN (input) module
+        input_network_ogn = InputNetworkOgnServer(data_hub, range_filter=create_range_filter())
+        input_modules.append(input_network_ogn)
+
+        # instantiate GNSS (input) module
+        # serial device on Linux is /dev/ttyACM0, on Mac OS X e.g. /dev/cu.usbmodem1411
+        gnss_sentences = None if args.gnss_sentences.lower() == 'all' else args.gnss_sentences.split(',')
+        if args.gnss_protocol == 'ubx':
+            input_serial_gnss = InputSerialUbx(data_hub, args.gnss_port, args.gnss_baud_rate, navigation_rate=args.gnss_navigation_rate, batch_size=args.batch_size, ownship_position=ownship_position, allowed_sentences=gnss_sentences)
+        else:
+            input_serial_gnss = InputSerialGnss(data_hub, args.gnss_port, args.gnss_baud_rate, batch_size=args.batch_size, ownship_position=ownship_position, allowed_sentences=gnss_sentences)
+        input_modules.append(input_serial_gnss)
+
+    # enable latency tracing of input items (if requested)
+    for input_module in input_modules:
+        input_module.set_trace_sample_interval(args.trace_sample_interval)
+
+    return output_modules, input_modules
+
+
+# main function (all modules run in separate processes)
 def flightbox_main():
     global args
     global flightbox_logger
@@ -108,43 +278,24 @@ def flightbox_main():
 
     flightbox_logger.info('Entering main procedure')
 
+    # initialize list of sub-processes
+    processes = []
+
     try:
         # instantiate central data hub queue (used for all data exchange between modules)
         data_hub = Queue()
 
-        # initialize list of sub-processes
-        processes = []
-
         # instantiate data hub worker
-        data_hub_worker = DataHubWorker(data_hub)
+        data_hub_worker = DataHubWorker(data_hub, batch_size=args.batch_size, flush_interval=args.flush_interval, backend=args.data_hub_backend, ring_buffer_size=args.ring_buffer_size, queue_size=args.queue_size, overflow_policies=overflow_policies)
         processes.append(data_hub_worker)
 
-        # instantiate AirConnect (output) module
-        air_connect_output = OutputNetworkAirConnect()
-        data_hub_worker.add_output_module(air_connect_output)
-        processes.append(air_connect_output)
+        # instantiate all other modules
+        output_modules, input_modules = flightbox_create_modules(data_hub, data_hub_worker)
+        processes.extend(output_modules)
+        processes.extend(input_modules)
 
-        # instantiate SBS1/OGN/NMEA to FLARM transformation module
-        sbs1ognnmea_to_flarm_transformation = Sbs1OgnNmeaToFlarmTransformation(data_hub)
-        data_hub_worker.add_output_module(sbs1ognnmea_to_flarm_transformation)
-        processes.append(sbs1ognnmea_to_flarm_transformation)
-
-        # instantiate test data (input) module
-        # test_data_generator = TestDataGenerator(data_hub)
-        # processes.append(test_data_generator)
-
-        # instantiate SBS1 (input) module
-        input_network_sbs1 = InputNetworkSbs1(data_hub, '127.0.0.1', 30003, message_types=['1', '2', '3', '4'])
-        processes.append(input_network_sbs1)
-
-        # instantiate OGN (input) module
-        input_network_ogn = InputNetworkOgnServer(data_hub)
-        processes.append(input_network_ogn)
-
-        # instantiate GNSS (input) module
-        # input_serial_gnss = InputSerialGnss(data_hub, '/dev/cu.usbmodem1411', 9600)    # serial device on Mac OS X
-        input_serial_gnss = InputSerialGnss(data_hub, '/dev/ttyACM0', 9600)    # serial device on Linux
-        processes.append(input_serial_gnss)
+        # enable statistics of all modules (collected via inter-process queue)
+        flightbox_init_statistics(processes, Queue())
 
         # start all modules in separate processes
 
@@ -154,16 +305,14 @@ def flightbox_main():
         time.sleep(1)
 
         # start output and transformation modules next to avoid losing any message
-        air_connect_output.start()
-        sbs1ognnmea_to_flarm_transformation.start()
+        for output_module in output_modules:
+            output_module.start()
 
         time.sleep(1)
 
         # start input modules last when all processing modules are ready
-        # test_data_generator.start()
-        input_network_sbs1.start()
-        input_network_ogn.start()
-        input_serial_gnss.start()
+        for input_module in input_modules:
+            input_module.start()
 
         time.sleep(1)
 
@@ -180,6 +329,45 @@ def flightbox_main():
                 flightbox_logger.debug('Process ' + process.name + ' already died')
 
 
+# main function (all modules run as tasks in one asyncio event loop of this process)
+def flightbox_main_asyncio():
+    global flightbox_logger
+    global data_hub
+
+    flightbox_logger.info('Entering main procedure (asyncio runtime)')
+
+    # get asyncio loop
+    loop = asyncio.get_event_loop()
+
+    # instantiate in-memory data hub (replaces data hub queue and data hub worker)
+    data_hub = AsyncioDataHub(loop)
+
+    # instantiate all modules
+    output_modules, input_modules = flightbox_create_modules(data_hub, data_hub)
+
+    # enable statistics of all modules (all modules run in this process)
+    flightbox_init_statistics([data_hub] + output_modules + input_modules, queue.Queue())
+
+    # create tasks, output and transformation modules first to avoid losing any message
+    tasks = [loop.create_task(module.run_async(loop)) for module in output_modules + input_modules]
+
+    try:
+        # run until first module terminates (same as a died process, which makes the watchdog restart FlightBox)
+        done, pending = loop.run_until_complete(asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED))
+
+        for task in done:
+            if task.exception():
+                flightbox_logger.error('Module terminated with exception: {!r}'.format(task.exception()))
+    except(KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        # cancel all remaining tasks
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+
 # cleanup procedure (should be executed before exiting)
 def flightbox_cleanup():
     global logging_queue
@@ -187,6 +375,12 @@ def flightbox_cleanup():
     global flightbox_logger
     global data_hub
     global data_hub_worker
+    global statistics_server
+
+    # terminate statistics server
+    if statistics_server:
+        flightbox_logger.info('Terminating statistics server')
+        statistics_server.stop()
 
     # terminate logging thread
     flightbox_logger.info('Terminating logging thread')
@@ -205,6 +399,7 @@ if __name__ == "__main__":
     flightbox_logger = None
     data_hub = None
     data_hub_worker = None
+    statistics_server = None
 
     setproctitle.setproctitle("flightbox")
 
@@ -212,7 +407,10 @@ if __name__ == "__main__":
     flightbox_init()
 
     # execute main function
-    flightbox_main()
+    if args.runtime == 'asyncio':
+        flightbox_main_asyncio()
+    else:
+        flightbox_main()
 
     # clean up framework
     flightbox_cleanup()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import setproctitle
+import time
+
+from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_item_log import DataHubItemLogReader
+from input.input_module import InputModule
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class InputFileReplay(InputModule):
+    """
+    Input module that replays a log recorded by OutputFileRecorder. The log is memory-mapped and its items are handed
+    over to the data hub with their original timing (speed 1.0), accelerated by a factor (e.g., speed 10.0), or as
+    fast as possible (speed 0). This allows reproducing field problems and load-testing the transformation and output
+    modules with recorded flights.
+    """
+
+    def __init__(self, data_hub, path, speed=1.0, content_types=None, start_offset=0.0, repeat=False, batch_size=64):
+        """
+        :param path: Path of log
+        :param speed: Replay speed factor (0 for as fast as possible)
+        :param content_types: Content types to replay (None for all)
+        :param start_offset: Seconds of log to skip at beginning
+        :param repeat: Restart replay at end of log
+        :param batch_size: Maximum number of items handed over to data hub in one batch
+        """
+
+        # call parent constructor
+        super().__init__(data_hub=data_hub)
+
+        # configure logging
+        self._logger = logging.getLogger('InputFileReplay')
+        self._logger.info('Initializing')
+
+        # store arguments in object variables
+        self._path = path
+        self._speed = speed
+        self._content_types = set(content_types) if content_types else None
+        self._start_offset = start_offset
+        self._repeat = repeat
+        self._batch_size = batch_size
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_input_file_replay")
+
+        self._logger.info('Running')
+
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        try:
+            # start loop
+            loop.run_until_complete(self.run_async(loop))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.stop()
+
+        # close data hub queue
+        self._data_hub.close()
+
+        self._logger.info('Terminating')
+
+    @asyncio.coroutine
+    def run_async(self, loop):
+        log_reader = DataHubItemLogReader(self._path)
+
+        try:
+            while True:
+                yield from self._replay(log_reader)
+
+                if not self._repeat:
+                    break
+        finally:
+            log_reader.close()
+
+        # keep running like all other input modules (terminating would stop FlightBox)
+        while True:
+            yield from asyncio.sleep(3600)
+
+    @asyncio.coroutine
+    def _replay(self, log_reader):
+        log_start_time = log_reader.get_start_time()
+        if log_start_time is None:
+            self._logger.warning('Log {} is empty'.format(self._path))
+            return
+
+        # skip beginning of log (via time index)
+        first_record_time = log_start_time + self._start_offset
+        offset = log_reader.get_offset(first_record_time)
+
+        self._logger.info('Replaying {} (speed {})'.format(self._path, self._speed if self._speed else 'max'))
+
+        replay_start_time = time.time()
+        item_count = 0
+
+        data_hub_items = []
+
+        for receive_time, content_type, content_data in log_reader.read(offset=offset, content_types=self._content_types):
+            if receive_time < first_record_time:
+                continue
+
+            if self._speed:
+                # wait until item is due (hand over items that are already due first)
+                delay = (receive_time - first_record_time) / self._speed - (time.time() - replay_start_time)
+                if delay > 0:
+                    if data_hub_items:
+                        self._data_hub.put(data_hub_items)
+                        data_hub_items = []
+
+                    yield from asyncio.sleep(delay)
+
+            data_hub_items.append(DataHubItem(content_type, content_data, timestamp=self._trace_sampler.stamp()))
+            item_count += 1
+
+            if len(data_hub_items) >= self._batch_size:
+                self._data_hub.put(data_hub_items)
+                data_hub_items = []
+
+                # let other tasks run
+                yield from asyncio.sleep(0)
+
+        if data_hub_items:
+            self._data_hub.put(data_hub_items)
+
+        replay_duration = time.time() - replay_start_time
+
+        self._logger.info('Replayed {:d} items in {:.1f} seconds ({:.0f} items/s)'.format(item_count, replay_duration, item_count / replay_duration if replay_duration > 0 else 0.0))
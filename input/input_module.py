@@ -1,13 +1,20 @@
+from abc import ABCMeta, abstractmethod
 from multiprocessing import Process
 
+from utils.latency_tracing import TraceSampler
+from utils.statistics import Statistics, StatisticsDataHub
+
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
 
-class InputModule(Process):
+class InputModule(Process, metaclass=ABCMeta):
     """
     Generic input module class.
+
+    Modules implement their functionality in the run_async coroutine, so that they can either run in their own process
+    (run) or as asyncio task in a shared event loop.
     """
 
     def __init__(self, data_hub):
@@ -16,3 +23,29 @@ class InputModule(Process):
 
         # set data hub queue
         self._data_hub = data_hub
+
+        # initialize statistics
+        self._statistics = Statistics(type(self).__name__)
+
+        # initialize trace sampler (tracing is disabled by default)
+        self._trace_sampler = TraceSampler()
+
+    def set_statistics_queue(self, statistics_queue):
+        self._statistics.set_statistics_queue(statistics_queue)
+
+        # count all items that are handed over to data hub
+        self._data_hub = StatisticsDataHub(self._data_hub, self._statistics)
+
+    def set_trace_sample_interval(self, sample_interval):
+        """
+        :param sample_interval: Every sample_interval-th item gets a trace stamp at ingress (0 disables tracing)
+        """
+        self._trace_sampler.set_sample_interval(sample_interval)
+
+    @abstractmethod
+    def run_async(self, loop):
+        """
+        Coroutine with functionality of module.
+
+        :param loop: Event loop
+        """
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import setproctitle
+import time
+
+from data_hub.data_hub_item import DataHubItem
+from input.input_module import InputModule
+from utils.mode_s import BeastFramer, ModeSDecoder, BEAST_MODE_S_LONG, BEAST_MODE_S_SHORT
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class NetworkBeastClientProtocol(asyncio.Protocol):
+    """
+    Beast binary protocol implementation (client side).
+    """
+
+    def __init__(self, loop, data_hub, decoder, statistics, connection_closed, trace_sampler, range_filter=None):
+        self._logger = logging.getLogger('InputNetworkBeast.Client')
+        self._logger.debug('Initializing')
+
+        # store arguments in object variables
+        self._loop = loop
+        self._data_hub = data_hub
+        self._decoder = decoder
+        self._statistics = statistics
+        self._connection_closed = connection_closed
+        self._trace_sampler = trace_sampler
+        self._range_filter = range_filter
+
+        # initialize frame parser (frames may be split across chunks)
+        self._beast_framer = BeastFramer()
+
+    def connection_made(self, transport):
+        self._logger.info('Connection established to {}'.format(transport.get_extra_info('peername')))
+
+    def data_received(self, data):
+        receive_time = time.time()
+
+        # collect all decoded messages of this chunk in one batch
+        data_hub_items = []
+
+        for frame_type, frame_timestamp, signal_level, message in self._beast_framer.feed(data):
+            # Mode A/C and status frames do not contain aircraft state
+            if frame_type != BEAST_MODE_S_LONG and frame_type != BEAST_MODE_S_SHORT:
+                continue
+
+            self._statistics.count('mode_s', 'messages')
+
+            sbs1_record = self._decoder.decode(message, receive_time)
+            if sbs1_record is not None:
+                # drop positions far away from own position
+                if self._range_filter is not None and not self._range_filter.check(sbs1_record.icao_id, sbs1_record.latitude, sbs1_record.longitude):
+                    continue
+
+                data_hub_items.append(DataHubItem('sbs1_record', sbs1_record, timestamp=self._trace_sampler.stamp()))
+
+        # hand over batch to data hub
+        if data_hub_items:
+            self._data_hub.put(data_hub_items)
+
+    def connection_lost(self, exc):
+        self._logger.debug('Connection terminated')
+
+        # notify module about terminated connection
+        if not self._connection_closed.done():
+            self._connection_closed.set_result(exc)
+
+
+class InputNetworkBeast(InputModule):
+    """
+    Input module that connects to the Beast binary interface of ADS-B receivers, like dump1090 (port 30005), and
+    decodes Mode-S extended squitter messages itself. Decoded messages are published as SBS1 records (content type
+    'sbs1_record'), so that they are processed like parsed SBS1 messages.
+    """
+
+    def __init__(self, data_hub, host_name='127.0.0.1', port=30005, reference_position=None, min_backoff=1.0, max_backoff=60.0, range_filter=None):
+        """
+        :param host_name: Host name of Beast server
+        :param port: Port of Beast server
+        :param reference_position: (latitude, longitude) tuple of receiver (enables decoding of surface positions of
+                                   aircraft that have not been seen airborne)
+        :param min_backoff: Minimum time in seconds between connection attempts
+        :param max_backoff: Maximum time in seconds between connection attempts
+        :param range_filter: RangeFilter object for dropping traffic far away from own position (None disables filter)
+        """
+
+        # call parent constructor
+        super().__init__(data_hub=data_hub)
+
+        # configure logging
+        self._logger = logging.getLogger('InputNetworkBeast')
+        self._logger.info('Initializing')
+
+        # store parameters in object variables
+        self._host_name = host_name
+        self._port = port
+        self._reference_position = reference_position
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._range_filter = range_filter
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_input_network_beast")
+
+        self._logger.info('Running')
+
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        try:
+            # start loop
+            loop.run_until_complete(self.run_async(loop))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.stop()
+            loop.close()
+
+        # close data hub queue
+        self._data_hub.close()
+
+        self._logger.info('Terminating')
+
+    @asyncio.coroutine
+    def run_async(self, loop):
+        # decoder state (CPR positions of aircraft) is kept across connections
+        decoder = ModeSDecoder(reference_position=self._reference_position)
+
+        yield from asyncio.gather(
+            self._report_statistics(decoder),
+            self._connect_loop(loop, decoder)
+        )
+
+    @asyncio.coroutine
+    def _connect_loop(self, loop, decoder):
+        backoff = self._min_backoff
+
+        while True:
+            connection_closed = loop.create_future()
+
+            try:
+                self._logger.info('Creating new connection to {}:{:d}'.format(self._host_name, self._port))
+                yield from loop.create_connection(lambda: NetworkBeastClientProtocol(loop=loop, data_hub=self._data_hub, decoder=decoder, statistics=self._statistics, connection_closed=connection_closed, trace_sampler=self._trace_sampler, range_filter=self._range_filter), self._host_name, self._port)
+            except OSError:
+                self._logger.info('Server not up. Retrying to connect in {:.0f} seconds.'.format(backoff))
+                yield from asyncio.sleep(backoff)
+
+                backoff = min(backoff * 2.0, self._max_backoff)
+
+                continue
+
+            backoff = self._min_backoff
+
+            # wait until connection is terminated
+            yield from connection_closed
+
+            self._logger.warning('Connection to {}:{:d} lost'.format(self._host_name, self._port))
+
+    @asyncio.coroutine
+    def _report_statistics(self, decoder):
+        while True:
+            yield from asyncio.sleep(10.0)
+
+            # forget aircraft that are out of range
+            decoder.remove_stale(time.time())
+
+            self._statistics.set_gauge('crc_errors', decoder.crc_error_count)
+            self._statistics.set_gauge('unsupported_messages', decoder.unsupported_count)
+            if self._range_filter is not None:
+                self._statistics.set_gauge('range_filtered', self._range_filter.filtered_count)
+            self._statistics.publish_if_due()
@@ -4,104 +4,184 @@ import logging
 import re
 import setproctitle
 import sys
-from threading import Lock
 
 from data_hub.data_hub_item import DataHubItem
 from input.input_module import InputModule
+import utils.calculation
+import utils.conversion
+import utils.ogn_parser
+from utils.line_framer import LineFramer
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
+# login request of APRS client (first line of connection)
+OGN_LOGIN_PATTERN = re.compile(br"user (\S+) pass (\S+) vers (.+)")
+
+
+def is_beacon_in_range(beacon, range_filter):
+    """
+    :param beacon: APRS beacon (str)
+    :param range_filter: RangeFilter object
+    :return: True if beacon should be kept (beacons without position are always kept)
+    """
+
+    # positions are relative to receiver location configured as 0 (see handle_ogn_data), so own position is required
+    reference_position = range_filter.get_reference_position()
+    if reference_position is None:
+        return True
+
+    # same position pattern as parser of transformation module (beacons it cannot parse are kept)
+    m = utils.ogn_parser.POSITION_PATTERN.match(beacon)
+    if m is None:
+        return True
+
+    latitude = utils.conversion.ogn_coord_to_degrees(float(m.group(4)))
+    if m.group(5) == 'S':
+        latitude = -latitude
+
+    longitude = utils.conversion.ogn_coord_to_degrees(float(m.group(7)))
+    if m.group(8) == 'W':
+        longitude = -longitude
+
+    return range_filter.check(m.group(1), utils.calculation.lat_abs_from_rel_flarm_coordinate(reference_position[0], latitude), utils.calculation.lon_abs_from_rel_flarm_coordinate(reference_position[1], longitude))
+
 
 @asyncio.coroutine
-def ogn_aprs_heartbeat(loop, clients, clients_lock, server_name, server_software):
+def ogn_aprs_heartbeat(loop, clients, server_name, server_software, statistics, range_filter=None):
     logger = logging.getLogger('InputNetworkOgnServer.Heartbeat')
 
     while True:
-        heartbeat = '# {} {} {} {}'.format(server_software, datetime.datetime.utcnow().strftime('%d %b %Y %H:%M:%S GMT'), server_name, '127.0.0.1:14580')
+        heartbeat = '# {} {} {} {}\r\n'.format(server_software, datetime.datetime.utcnow().strftime('%d %b %Y %H:%M:%S GMT'), server_name, '127.0.0.1:14580')
+
+        logger.debug('Sending heartbeat: {!r}'.format(heartbeat))
 
-        logger.debug('Sending heartbeat: {}'.format(heartbeat))
+        # client set is only changed by protocol callbacks in this event loop, so no lock is required
+        for client in list(clients):
+            client.send_string_data(heartbeat)
 
-        with clients_lock:
-            for client in clients:
-                client.send_string_data(str(heartbeat + '\r\n'))
+        statistics.set_gauge('receivers', sorted(client.get_receiver_name() for client in clients))
+        if range_filter is not None:
+            statistics.set_gauge('range_filtered', range_filter.filtered_count)
+        statistics.publish_if_due()
 
         yield from asyncio.sleep(20)
 
 
 class OgnAprsServerClientProtocol(asyncio.Protocol):
     """
-    APRS protocol implementation (server side).
+    APRS protocol implementation (server side). Every connection is one receiver (ogn-decode instance), which logs in
+    with its first line and sends beacons afterwards.
     """
 
-    def __init__(self, clients, clients_lock, data_hub, server_name, server_software):
+    # connection states
+    STATE_LOGIN = 0
+    STATE_STREAMING = 1
+
+    def __init__(self, clients, data_hub, server_name, server_software, statistics, trace_sampler, range_filter=None):
         self._logger = logging.getLogger('OgnAprsServerClientProtocol.Server')
         self._logger.debug('Initializing')
 
         # store arguments in object variables
         self._clients = clients
-        self._clients_lock = clients_lock
         self._data_hub = data_hub
         self._server_name = server_name
         self._server_software = server_software
+        self._statistics = statistics
+        self._trace_sampler = trace_sampler
+        self._range_filter = range_filter
 
         # initialize transport object
         self._transport = None
 
+        # initialize connection state (receiver is named after its peer until it has logged in)
+        self._state = self.STATE_LOGIN
+        self._receiver_name = None
+
+        # initialize line framer (beacons may be split across chunks)
+        self._line_framer = LineFramer()
+
+    def get_receiver_name(self):
+        return self._receiver_name
+
     def connection_made(self, transport):
         peername = transport.get_extra_info('peername')
         self._logger.info('New connection from {}'.format(peername))
 
         # keep transport object
         self._transport = transport
+        self._receiver_name = '{}:{}'.format(*peername[:2]) if peername else 'unknown'
 
         # add this client to global client set
-        with self._clients_lock:
-            self._clients.add(self)
+        self._clients.add(self)
 
         # send initial message
         self.send_string_data('# {}\r\n'.format(self._server_software))
 
     def connection_lost(self, exc):
-        self._logger.info('Connection closed to {}'.format(self._transport.get_extra_info('peername')))
+        self._logger.info('Connection closed to receiver {}'.format(self._receiver_name))
 
         # remove this client from global client set
-        with self._clients_lock:
-            self._clients.remove(self)
+        self._clients.discard(self)
 
     def data_received(self, data):
-        data_string = data.decode().strip()
+        lines = self._line_framer.feed(data)
 
-        self._logger.debug('Data received: {}'.format(data_string))
+        # handle login request (first line of connection, other first lines are handled like beacons)
+        if self._state == self.STATE_LOGIN and lines:
+            if self._handle_login(lines[0]):
+                del lines[0]
 
-        # check for login request
-        m = re.match(r"user (\w+) pass (\w+) vers (.+)", data_string)
-        if m:
-            user_name = m.group(1)
-            password = m.group(2)
+        messages = []
 
-            # return authentication successful (credentials are not verified in current implementation)
-            self.send_string_data('# logresp {} verified, server {}\r\n'.format(user_name, self._server_name))
+        for line in lines:
+            # skip comments (like filter commands of clients)
+            if line.startswith(b'#'):
+                continue
 
-            return
+            # check for special commands
+            if line.lower() == b'exit':
+                self._transport.close()
+                break
 
-        # pre-process input
-        data_string_lower = data_string.lower()
+            try:
+                message = line.decode()
+            except UnicodeDecodeError:
+                self._logger.warning('Dropping undecodable beacon of receiver {}: {!r}'.format(self._receiver_name, line))
+                continue
 
-        # check for special commands
-        if data_string_lower == 'exit':
-            self._transport.close()
+            # drop beacons far away from own position
+            if self._range_filter is not None and not is_beacon_in_range(message, self._range_filter):
+                continue
 
-            return
+            messages.append(message)
 
-        messages = data_string.splitlines()
-        for message in messages:
-            try:
-                data_hub_item = DataHubItem('ogn', message)
-                self._data_hub.put(data_hub_item)
-            except:
-                pass
+        # hand over all messages of this chunk in one batch (and count beacons per receiver)
+        if messages:
+            self._statistics.count('beacons', self._receiver_name, len(messages))
+            self._data_hub.put([DataHubItem('ogn', message, timestamp=self._trace_sampler.stamp()) for message in messages])
+
+    def _handle_login(self, line):
+        """
+        :return: True if line is a login request
+        """
+
+        self._state = self.STATE_STREAMING
+
+        m = OGN_LOGIN_PATTERN.match(line)
+        if m is None:
+            self._logger.warning('Receiver {} did not log in: {!r}'.format(self._receiver_name, line))
+            return False
+
+        self._receiver_name = m.group(1).decode()
+
+        self._logger.info('Receiver {} logged in'.format(self._receiver_name))
+
+        # return authentication successful (credentials are not verified in current implementation)
+        self.send_string_data('# logresp {} verified, server {}\r\n'.format(self._receiver_name, self._server_name))
+
+        return True
 
     def send_string_data(self, data):
         self.send_data(str.encode(data))
@@ -112,11 +192,16 @@ class OgnAprsServerClientProtocol(asyncio.Protocol):
 
 class InputNetworkOgnServer(InputModule):
     """
-    Input module that emulates an APRS server to which an Open Glider Network (OGN) decoder can connect. The OGN decoder
-    is used to receive FLARM messages.
+    Input module that emulates an APRS server to which Open Glider Network (OGN) decoders can connect. The OGN decoders
+    are used to receive FLARM messages; several decoders (e.g., of multiple receivers or antennas) can be connected at
+    the same time.
     """
 
-    def __init__(self, data_hub):
+    def __init__(self, data_hub, range_filter=None):
+        """
+        :param range_filter: RangeFilter object for dropping traffic far away from own position (None disables filter)
+        """
+
         # call parent constructor
         super().__init__(data_hub=data_hub)
 
@@ -124,13 +209,13 @@ class InputNetworkOgnServer(InputModule):
         self._logger = logging.getLogger('InputNetworkOgnServer')
         self._logger.debug('Initializing')
 
-        # initialize client set
-        self.clients_lock = Lock()
+        # initialize client set (one client per connected receiver)
         self.clients = set()
 
         # initialize object variables
         self._server_software = 'flightbox 1.0'
         self._server_name = 'FLIGHTBOX'
+        self._range_filter = range_filter
 
     def run(self):
         setproctitle.setproctitle("flightbox_input_network_ogn_server")
@@ -140,28 +225,27 @@ class InputNetworkOgnServer(InputModule):
         # get asyncio loop
         loop = asyncio.get_event_loop()
 
-        # create server coroutine
-        ogn_aprs_server = loop.create_server(lambda: OgnAprsServerClientProtocol(clients=self.clients, clients_lock=self.clients_lock, data_hub=self._data_hub, server_name=self._server_name, server_software=self._server_software), host='', port=14580)
-
-        # compile task list that will run in loop
-        tasks = asyncio.gather(
-            asyncio.async(ogn_aprs_heartbeat(loop=loop, clients=self.clients, clients_lock=self.clients_lock, server_name=self._server_name, server_software=self._server_software)),
-            asyncio.async(ogn_aprs_server)
-        )
-
         try:
             # start loop
-            loop.run_until_complete(tasks)
+            loop.run_until_complete(self.run_async(loop))
         except(KeyboardInterrupt, SystemExit):
             pass
         except:
             self._logger.exception(sys.exc_info()[0])
-            tasks.cancel()
         finally:
-            ogn_aprs_server.close()
             loop.stop()
 
         # close data hub queue
         self._data_hub.close()
 
         self._logger.info('Terminating')
+
+    @asyncio.coroutine
+    def run_async(self, loop):
+        # start server
+        ogn_aprs_server = yield from loop.create_server(lambda: OgnAprsServerClientProtocol(clients=self.clients, data_hub=self._data_hub, server_name=self._server_name, server_software=self._server_software, statistics=self._statistics, trace_sampler=self._trace_sampler, range_filter=self._range_filter), host='', port=14580)
+
+        try:
+            yield from ogn_aprs_heartbeat(loop=loop, clients=self.clients, server_name=self._server_name, server_software=self._server_software, statistics=self._statistics, range_filter=self._range_filter)
+        finally:
+            ogn_aprs_server.close()
@@ -1,73 +1,384 @@
 import asyncio
 import logging
 import setproctitle
+import time
 
 from data_hub.data_hub_item import DataHubItem
 from input.input_module import InputModule
+from utils.line_framer import LineFramer, get_field
+from utils.sbs1 import Sbs1Record, parse_sbs1_message
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
+# all endpoints are connected and their messages are merged into one stream
+POOL_MODE_MERGE = 'merge'
+
+# all endpoints are connected, but only messages of first connected endpoint (in order of configuration) are used
+POOL_MODE_FAILOVER = 'failover'
+
+POOL_MODES = (POOL_MODE_MERGE, POOL_MODE_FAILOVER)
+
+
+class Sbs1Endpoint(object):
+    """
+    Connection state and health information of one SBS1 server (like a dump1090 instance).
+    """
+
+    def __init__(self, host_name, port):
+        self.host_name = host_name
+        self.port = port
+
+        # connection state
+        self.is_connected = False
+        self.is_active = False
+        self.connected_time = None
+        self.disconnected_time = None
+
+        # health information
+        self.connection_count = 0
+        self.failed_attempt_count = 0
+        self.last_time_to_reconnect = None
+        self.message_count = 0
+
+    def __str__(self):
+        return '{}:{:d}'.format(self.host_name, self.port)
+
+    def get_health(self, message_rate):
+        return {
+            'connected': self.is_connected,
+            'active': self.is_active,
+            'connections': self.connection_count,
+            'failed_attempts': self.failed_attempt_count,
+            'last_time_to_reconnect_seconds': self.last_time_to_reconnect,
+            'messages_per_second': message_rate,
+        }
+
+
+class Sbs1Conflator(object):
+    """
+    Latest state per aircraft and message type. Messages received between two flushes are merged, so that only one
+    item per aircraft and message type is handed over to the data hub per flush interval (the transformation only uses
+    the latest state of each aircraft anyway). Fields missing in parsed records are taken from the previous record.
+    """
+
+    def __init__(self):
+        # (ICAO address, message type) -> (content type, content data, trace timestamp)
+        self._messages = {}
+
+        # number of messages received since last flush
+        self._received_count = 0
+
+    def add_message(self, fields, message, timestamp):
+        """
+        :param fields: First fields of raw message (at least up to ICAO address)
+        :param message: Raw message (str)
+        """
+
+        self._received_count += 1
+        self._messages[(fields[4], fields[1])] = ('sbs1', message, timestamp)
+
+    def add_record(self, sbs1_record, timestamp):
+        self._received_count += 1
+
+        key = (sbs1_record.icao_id, sbs1_record.msg_type)
+
+        previous_message = self._messages.get(key)
+        if previous_message is not None and None in sbs1_record:
+            sbs1_record = Sbs1Record(*[value if value is not None else previous_value for value, previous_value in zip(sbs1_record, previous_message[1])])
+
+        self._messages[key] = ('sbs1_record', sbs1_record, timestamp)
+
+    def flush(self):
+        """
+        :return: Tuple of list of merged data hub items and number of received messages since last flush
+        """
+
+        data_hub_items = [DataHubItem(content_type, content_data, timestamp=timestamp) for content_type, content_data, timestamp in self._messages.values()]
+        received_count = self._received_count
+
+        self._messages = {}
+        self._received_count = 0
+
+        return data_hub_items, received_count
+
 
 class NetworkSbs1ClientProtocol(asyncio.Protocol):
     """
     SBS1 protocol implementation (client side).
     """
 
-    def __init__(self, loop, data_hub, message_types):
+    def __init__(self, loop, data_hub, endpoint, message_types, connection_closed, trace_sampler, publish_records=False, conflator=None, range_filter=None):
         self._logger = logging.getLogger('InputNetworkSbs1.Client')
         self._logger.debug('Initializing')
 
         # store arguments in object variables
         self._loop = loop
         self._data_hub = data_hub
-        self._message_types = message_types
+        self._endpoint = endpoint
+        self._connection_closed = connection_closed
+        self._trace_sampler = trace_sampler
+        self._publish_records = publish_records
+        self._conflator = conflator
+        self._range_filter = range_filter
+
+        # message types are compared with raw type field of lines (None accepts all message types)
+        self._message_types = None
+        if message_types is not None:
+            self._message_types = set(message_type.encode() for message_type in message_types)
+
+        # initialize line framer (lines may be split across chunks)
+        self._line_framer = LineFramer()
 
     def connection_made(self, transport):
         self._logger.info('Connection established to {}'.format(transport.get_extra_info('peername')))
 
     def data_received(self, data):
-        data_string = data.decode().strip()
+        self._logger.debug('Data received: {!r}'.format(data))
+
+        lines = self._line_framer.feed(data)
+
+        self._endpoint.message_count += len(lines)
+
+        # discard messages of standby endpoints
+        if not self._endpoint.is_active:
+            return
+
+        # merge messages into latest state per aircraft (flushed periodically by module)
+        if self._conflator is not None:
+            self._conflate(lines)
+            return
+
+        # collect all messages of this chunk in one batch
+        data_hub_items = []
+
+        for line in lines:
+            # check message type (second field) before decoding line
+            if self._message_types is not None and get_field(line, 1) not in self._message_types:
+                continue
+
+            # publish parsed record or raw message
+            if self._publish_records:
+                sbs1_record = parse_sbs1_message(line)
+                if sbs1_record is not None:
+                    if self._range_filter is not None and not self._range_filter.check(sbs1_record.icao_id, sbs1_record.latitude, sbs1_record.longitude):
+                        continue
+
+                    data_hub_items.append(DataHubItem('sbs1_record', sbs1_record, timestamp=self._trace_sampler.stamp()))
+                else:
+                    self._logger.warning('Dropping unparsable SBS1 message: {!r}'.format(line))
+
+                continue
+
+            # drop positions far away from own position
+            if self._range_filter is not None and not self._is_line_in_range(line):
+                continue
+
+            try:
+                data_hub_items.append(DataHubItem('sbs1', line.decode(), timestamp=self._trace_sampler.stamp()))
+            except UnicodeDecodeError:
+                self._logger.warning('Dropping undecodable SBS1 message: {!r}'.format(line))
+
+        # hand over batch to data hub
+        if data_hub_items:
+            self._data_hub.put(data_hub_items)
+
+    def _conflate(self, lines):
+        for line in lines:
+            # split off fields up to ICAO address only
+            fields = line.split(b',', 5)
+            if len(fields) < 6:
+                continue
+
+            # check message type (second field) before decoding line
+            if self._message_types is not None and fields[1] not in self._message_types:
+                continue
+
+            if self._publish_records:
+                sbs1_record = parse_sbs1_message(line)
+                if sbs1_record is not None:
+                    if self._range_filter is not None and not self._range_filter.check(sbs1_record.icao_id, sbs1_record.latitude, sbs1_record.longitude):
+                        continue
+
+                    self._conflator.add_record(sbs1_record, self._trace_sampler.stamp())
+                else:
+                    self._logger.warning('Dropping unparsable SBS1 message: {!r}'.format(line))
+
+                continue
+
+            # drop positions far away from own position
+            if self._range_filter is not None and not self._is_line_in_range(line):
+                continue
+
+            try:
+                self._conflator.add_message(fields, line.decode(), self._trace_sampler.stamp())
+            except UnicodeDecodeError:
+                self._logger.warning('Dropping undecodable SBS1 message: {!r}'.format(line))
 
-        self._logger.debug('Data received: {!r}'.format(data_string))
+    def _is_line_in_range(self, line):
+        # split off fields up to position only
+        fields = line.split(b',', 16)
+        if len(fields) < 17:
+            return True
 
-        messages = data_string.splitlines()
-        for message in messages:
+        if fields[14] and fields[15]:
             try:
-                message_type = message.split(',')[1]
-                if message_type in self._message_types:
-                    data_hub_item = DataHubItem('sbs1', message)
-                    self._data_hub.put(data_hub_item)
-            except:
-                pass
+                return self._range_filter.check(fields[4], float(fields[14]), float(fields[15]))
+            except ValueError:
+                return True
+
+        return self._range_filter.check(fields[4])
 
     def connection_lost(self, exc):
         self._logger.debug('Connection terminated')
-        self._loop.stop()
+
+        # notify connect loop about terminated connection
+        if not self._connection_closed.done():
+            self._connection_closed.set_result(exc)
 
 
 @asyncio.coroutine
-def connect_loop(loop, data_hub, host_name, port, message_types):
+def connect_loop(loop, data_hub, endpoint, endpoint_pool, message_types, trace_sampler, publish_records=False, conflator=None, range_filter=None, min_backoff=1.0, max_backoff=60.0):
+    """
+    Keeps connection to one endpoint. After a failed attempt, the waiting time before the next attempt is doubled (up
+    to max_backoff); it is reset when a connection has been established.
+    """
+
     logger = logging.getLogger('InputNetworkSbs1.ConnectLoop')
 
+    backoff = min_backoff
+
     while True:
+        connection_closed = loop.create_future()
+
         try:
-            logger.info("Creating new connection")
-            yield from loop.create_connection(lambda: NetworkSbs1ClientProtocol(loop=loop, data_hub=data_hub, message_types=message_types), host_name, port)
+            logger.info('Creating new connection to {}'.format(endpoint))
+            yield from loop.create_connection(lambda: NetworkSbs1ClientProtocol(loop=loop, data_hub=data_hub, endpoint=endpoint, message_types=message_types, connection_closed=connection_closed, trace_sampler=trace_sampler, publish_records=publish_records, conflator=conflator, range_filter=range_filter), endpoint.host_name, endpoint.port)
         except OSError:
-            logger.info("Server not up. Retrying to connect in 5 seconds.")
-            yield from asyncio.sleep(5)
+            endpoint.failed_attempt_count += 1
+
+            logger.info('Server {} not up. Retrying to connect in {:.0f} seconds.'.format(endpoint, backoff))
+            yield from asyncio.sleep(backoff)
+
+            backoff = min(backoff * 2.0, max_backoff)
+
+            continue
+
+        # update health information
+        backoff = min_backoff
+        endpoint.connected_time = time.time()
+        endpoint.connection_count += 1
+        if endpoint.disconnected_time is not None:
+            endpoint.last_time_to_reconnect = endpoint.connected_time - endpoint.disconnected_time
+            logger.info('Reconnected to {} after {:.1f} seconds'.format(endpoint, endpoint.last_time_to_reconnect))
+
+        endpoint_pool.set_connected(endpoint, True)
+
+        # wait until connection is terminated
+        yield from connection_closed
+
+        endpoint.disconnected_time = time.time()
+        endpoint_pool.set_connected(endpoint, False)
+
+        logger.warning('Connection to {} lost'.format(endpoint))
+
+
+class Sbs1EndpointPool(object):
+    """
+    Pool of SBS1 endpoints that decides which endpoints are active, i.e., whose messages are handed over to the data
+    hub: all connected endpoints (merge mode) or only the first connected endpoint in order of configuration (failover
+    mode, with automatic fallback to preferred endpoints when they are back).
+    """
+
+    def __init__(self, endpoints, mode=POOL_MODE_MERGE):
+        if mode not in POOL_MODES:
+            raise ValueError('Unknown SBS1 pool mode: {}'.format(mode))
+
+        self._logger = logging.getLogger('InputNetworkSbs1.EndpointPool')
+
+        self.endpoints = endpoints
+        self._mode = mode
+        self._active_endpoint = None
+
+        # message counts at last health report (for calculating message rates)
+        self._report_time = time.time()
+        self._report_message_counts = [0 for endpoint in endpoints]
+
+    def set_connected(self, endpoint, is_connected):
+        endpoint.is_connected = is_connected
+
+        self._update_active_endpoints()
+
+    def _update_active_endpoints(self):
+        if self._mode == POOL_MODE_MERGE:
+            for endpoint in self.endpoints:
+                endpoint.is_active = endpoint.is_connected
+
+            return
+
+        # failover: activate first connected endpoint only
+        active_endpoint = None
+        for endpoint in self.endpoints:
+            if endpoint.is_connected and active_endpoint is None:
+                active_endpoint = endpoint
+
+            endpoint.is_active = endpoint is active_endpoint
+
+        if active_endpoint is self._active_endpoint:
+            return
+
+        self._active_endpoint = active_endpoint
+
+        if active_endpoint is not None:
+            self._logger.info('Active endpoint: {}'.format(active_endpoint))
         else:
-            break
+            self._logger.warning('No endpoint connected')
+
+    def get_health(self):
+        """
+        :return: Dictionary with health information of every endpoint (message rates since last call)
+        """
+
+        current_time = time.time()
+        duration = current_time - self._report_time
+
+        health = {}
+        for index, endpoint in enumerate(self.endpoints):
+            message_rate = (endpoint.message_count - self._report_message_counts[index]) / duration if duration > 0 else 0.0
+            self._report_message_counts[index] = endpoint.message_count
+
+            health[str(endpoint)] = endpoint.get_health(message_rate)
+
+        self._report_time = current_time
+
+        return health
 
 
 class InputNetworkSbs1(InputModule):
     """
-    Input module that connects to ADS-B receiver that has an SBS1 interface, like dump1090.
+    Input module that connects to ADS-B receivers that have an SBS1 interface, like dump1090. Several receivers can be
+    configured as pool of endpoints, whose messages are either merged or used for failover. Lost connections are
+    re-established automatically with exponential backoff. Optionally, messages are conflated into the latest state per
+    aircraft and message type, which is handed over to the data hub periodically.
     """
 
-    def __init__(self, data_hub, host_name, port, message_types = None):
+    def __init__(self, data_hub, host_name=None, port=None, message_types = None, publish_records = False, endpoints=None, mode=POOL_MODE_MERGE, health_interval=10.0, conflation_interval=0.0, range_filter=None, min_backoff=1.0, max_backoff=60.0):
+        """
+        :param host_name: Host name of single SBS1 server (alternative to endpoints)
+        :param port: Port of single SBS1 server
+        :param message_types: SBS1 message types to forward (None for all)
+        :param publish_records: Publish parsed messages (content type 'sbs1_record') instead of raw messages ('sbs1')
+        :param endpoints: List of (host name, port) tuples of SBS1 servers
+        :param mode: Pool mode ('merge' or 'failover')
+        :param health_interval: Interval in seconds for reporting health of endpoints
+        :param conflation_interval: Interval in seconds for handing over latest state per aircraft and message type (0
+                                    disables conflation, every message is handed over immediately)
+        :param range_filter: RangeFilter object for dropping traffic far away from own position (None disables filter)
+        :param min_backoff: Minimum time in seconds between attempts to connect to an endpoint
+        :param max_backoff: Maximum time in seconds between attempts to connect to an endpoint
+        """
+
         # call parent constructor
         super().__init__(data_hub=data_hub)
 
@@ -75,10 +386,19 @@ class InputNetworkSbs1(InputModule):
         self._logger = logging.getLogger('InputNetworkSbs1')
         self._logger.info('Initializing')
 
+        # compile endpoint list
+        if endpoints is None:
+            endpoints = [(host_name, port)]
+
         # store parameters in object variables
-        self._host_name = host_name
-        self._port = port
+        self._endpoint_pool = Sbs1EndpointPool([Sbs1Endpoint(endpoint_host_name, endpoint_port) for endpoint_host_name, endpoint_port in endpoints], mode=mode)
         self._message_types = message_types
+        self._publish_records = publish_records
+        self._health_interval = health_interval
+        self._conflation_interval = conflation_interval
+        self._range_filter = range_filter
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
 
     def run(self):
         setproctitle.setproctitle("flightbox_input_network_sbs1")
@@ -90,8 +410,7 @@ class InputNetworkSbs1(InputModule):
 
         try:
             # start loop
-            loop.run_until_complete(connect_loop(loop=loop, data_hub=self._data_hub, host_name=self._host_name, port=self._port, message_types=self._message_types))
-            loop.run_forever()
+            loop.run_until_complete(self.run_async(loop))
         except(KeyboardInterrupt, SystemExit):
             pass
         finally:
@@ -102,3 +421,49 @@ class InputNetworkSbs1(InputModule):
         self._data_hub.close()
 
         self._logger.info('Terminating')
+
+    @asyncio.coroutine
+    def run_async(self, loop):
+        tasks = [self._report_health()]
+
+        # all endpoints share one conflation table
+        conflator = None
+        if self._conflation_interval > 0:
+            conflator = Sbs1Conflator()
+            tasks.append(self._flush_conflator(conflator))
+
+        # keep connections to all endpoints and report their health
+        tasks.extend(connect_loop(loop=loop, data_hub=self._data_hub, endpoint=endpoint, endpoint_pool=self._endpoint_pool, message_types=self._message_types, trace_sampler=self._trace_sampler, publish_records=self._publish_records, conflator=conflator, range_filter=self._range_filter, min_backoff=self._min_backoff, max_backoff=self._max_backoff) for endpoint in self._endpoint_pool.endpoints)
+
+        yield from asyncio.gather(*tasks)
+
+    @asyncio.coroutine
+    def _flush_conflator(self, conflator):
+        while True:
+            yield from asyncio.sleep(self._conflation_interval)
+
+            data_hub_items, received_count = conflator.flush()
+
+            # count reduction of items
+            self._statistics.count('conflation', 'received', received_count)
+            self._statistics.count('conflation', 'flushed', len(data_hub_items))
+
+            if data_hub_items:
+                self._data_hub.put(data_hub_items)
+            else:
+                self._statistics.publish_if_due()
+
+    @asyncio.coroutine
+    def _report_health(self):
+        while True:
+            yield from asyncio.sleep(self._health_interval)
+
+            health = self._endpoint_pool.get_health()
+
+            self._logger.debug('Endpoint health: {}'.format(health))
+
+            # statistics are published even if no messages are received
+            self._statistics.set_gauge('endpoints', health)
+            if self._range_filter is not None:
+                self._statistics.set_gauge('range_filtered', self._range_filter.filtered_count)
+            self._statistics.publish_if_due()
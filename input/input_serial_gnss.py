@@ -1,22 +1,41 @@
+import asyncio
 import logging
+import os
 import serial
 import setproctitle
-import time
 
 from data_hub.data_hub_item import DataHubItem
 from input.input_module import InputModule
+from utils.line_framer import LineFramer
+from utils.nmea import is_valid_nmea_sentence, parse_nmea_sentence, NmeaSentenceFilter
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
+# sentences that are used by transformation or forwarded to navigation apps (GSV and GSA are not needed)
+DEFAULT_ALLOWED_SENTENCES = ('GGA', 'RMC', 'VTG', 'GLL')
+
 
 class InputSerialGnss(InputModule):
     """
     Input module that connects to serial GNSS device to get NMEA position data.
+
+    The serial port is read without blocking via the event loop: all available bytes are read at once, split into
+    sentences, and only sentences with a valid checksum that pass the allow-list are handed over to the data hub. If
+    the device disappears (e.g., USB receiver is unplugged), the port is re-opened as soon as it is available again.
     """
 
-    def __init__(self, data_hub, port, baud_rate):
+    def __init__(self, data_hub, port, baud_rate, batch_size=64, ownship_position=None, allowed_sentences=DEFAULT_ALLOWED_SENTENCES, min_backoff=0.25, max_backoff=1.0):
+        """
+        :param ownship_position: OwnshipPosition object that is updated with every fix (used by range filters of other
+                                 input modules)
+        :param allowed_sentences: Sentence types (like 'GGA', any talker) or addresses (like 'GPGGA') that are handed
+                                  over to data hub (None accepts all sentences)
+        :param min_backoff: Minimum time in seconds between attempts to open serial port
+        :param max_backoff: Maximum time in seconds between attempts to open serial port
+        """
+
         # call parent constructor
         super().__init__(data_hub=data_hub)
 
@@ -27,50 +46,158 @@ class InputSerialGnss(InputModule):
         # store parameters in object variables
         self._port = port
         self._baud_rate = baud_rate
+        self._batch_size = batch_size
+        self._ownship_position = ownship_position
+        self._sentence_filter = NmeaSentenceFilter(allowed_sentences)
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
 
     def run(self):
         setproctitle.setproctitle("flightbox_input_serial_gnss")
 
         self._logger.info('Running')
 
-        # initialize serial object
-        s = None
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        try:
+            # start loop
+            loop.run_until_complete(self.run_async(loop))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.stop()
+            loop.close()
+
+        # close data input queue
+        self._data_hub.close()
+
+        self._logger.info('Terminating')
+
+    @asyncio.coroutine
+    def run_async(self, loop):
+        backoff = self._min_backoff
+        is_attached = True
 
         while True:
             try:
-                # wait before attaching to serial port
-                time.sleep(5)
-
-                # create serial object
-                s = serial.Serial(self._port, self._baud_rate)
-
-                # read loop
-                while True:
-                    try:
-                        # get line from serial device (blocking call)
-                        line = s.readline().decode().strip()
-                    except:
-                        # in case read was unsuccessful, exit read loop
-                        break
-
-                    self._logger.debug('Data received: {!r}'.format(line))
-
-                    # generate new data hub item and hand over to data hub
-                    data_hub_item = DataHubItem('nmea', line)
-                    self._data_hub.put(data_hub_item)
-            except(KeyboardInterrupt, SystemExit):
-                # exit re-connect loop in case of termination is requested
-                break
-            except:
-                self._logger.warning('Could not attach to serial port {} with baud rate {:d}'.format(self._port, self._baud_rate))
-
-                # continue in any other exception case
+                # open serial port without blocking reads (timeout 0)
+                s = serial.Serial(self._port, self._baud_rate, timeout=0)
+            except (serial.SerialException, OSError, ValueError):
+                # only log first failed attempt, device may be unplugged for a long time
+                if is_attached:
+                    self._logger.warning('Could not attach to serial port {} with baud rate {:d}'.format(self._port, self._baud_rate))
+                    is_attached = False
+
+                yield from asyncio.sleep(backoff)
+
+                backoff = min(backoff * 2.0, self._max_backoff)
+
+                continue
+
+            self._logger.info('Attached to serial port {} with baud rate {:d}'.format(self._port, self._baud_rate))
+            is_attached = True
+
+            try:
+                self._configure_device(s)
+            except (serial.SerialException, OSError):
+                # device rejects configuration, retry with same backoff as for failed attempts to open port
+                self._logger.warning('Could not configure device at serial port {}'.format(self._port))
+                s.close()
+
+                yield from asyncio.sleep(backoff)
+
+                backoff = min(backoff * 2.0, self._max_backoff)
+
+                continue
+
+            backoff = self._min_backoff
+
+            detached = loop.create_future()
+            framer = self._create_framer()
+
+            fd = s.fileno()
+            loop.add_reader(fd, self._read_available, fd, framer, detached)
+
+            try:
+                # wait until device is unplugged or read fails
+                yield from detached
+            except (serial.SerialException, OSError):
                 pass
             finally:
-                if s:
-                    s.close()
+                loop.remove_reader(fd)
+                s.close()
 
-        # close data input queue
-        self._data_hub.close()
+            self._logger.warning('Serial port {} lost'.format(self._port))
 
-        self._logger.info('Terminating')
+    def _create_framer(self):
+        return LineFramer(max_line_length=256)
+
+    def _configure_device(self, s):
+        # NMEA receivers are used with their default configuration
+        pass
+
+    def _read_available(self, fd, framer, detached):
+        try:
+            # read all bytes that are available (usually a complete burst of sentences)
+            data = os.read(fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            if not detached.done():
+                detached.set_result(e)
+            return
+
+        # end of file: device has been removed
+        if not data:
+            if not detached.done():
+                detached.set_result(None)
+            return
+
+        data_hub_items = self._handle_data(data, framer)
+
+        # hand over items of this read to data hub
+        for i in range(0, len(data_hub_items), self._batch_size):
+            self._data_hub.put(data_hub_items[i:i + self._batch_size])
+
+    def _handle_data(self, data, line_framer):
+        """
+        :return: List of data hub items generated from chunk of serial stream
+        """
+
+        data_hub_items = []
+
+        for sentence in line_framer.feed(data):
+            self._handle_sentence(sentence, data_hub_items)
+
+        return data_hub_items
+
+    def _handle_sentence(self, sentence, data_hub_items):
+        if not is_valid_nmea_sentence(sentence):
+            self._statistics.count('nmea', 'checksum_errors')
+            return
+
+        if not self._sentence_filter.is_allowed(sentence):
+            self._statistics.count('nmea', 'filtered')
+            return
+
+        line = sentence.decode('ascii', errors='replace')
+
+        self._logger.debug('Data received: {!r}'.format(line))
+
+        # share own position with other input modules
+        if self._ownship_position is not None and line[3:6] == 'GGA':
+            self._update_ownship_position(line)
+
+        # generate new data hub item and add it to batch
+        data_hub_items.append(DataHubItem('nmea', line, timestamp=self._trace_sampler.stamp()))
+
+    def _update_ownship_position(self, sentence):
+        try:
+            fix = parse_nmea_sentence(sentence)
+        except ValueError:
+            return
+
+        # ignore sentences without fix
+        if fix is not None and fix.has_position():
+            self._ownship_position.set_position(fix.latitude, fix.longitude)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import setproctitle
+
+from data_hub.data_hub_item import DataHubItem
+from input.input_serial_gnss import InputSerialGnss, DEFAULT_ALLOWED_SENTENCES
+from utils.ubx import get_configuration_messages, parse_nav_pvt, UbxFramer, UBX_ACK_ACK, UBX_ACK_NAK, UBX_CLASS_ACK, UBX_CLASS_NAV, UBX_NAV_PVT
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class InputSerialUbx(InputSerialGnss):
+    """
+    Input module that connects to serial u-blox GNSS device (u-blox 7 or later) and gets position fixes as binary UBX
+    NAV-PVT messages at a high navigation rate.
+
+    On every attach, the receiver is configured to send NAV-PVT with every navigation solution, which are published
+    as own position fixes (content type 'ownship_fix'). NMEA sentences that are still sent by the receiver (once per
+    second) are handed over to the data hub like with InputSerialGnss, so that navigation apps keep getting them.
+    """
+
+    def __init__(self, data_hub, port, baud_rate, navigation_rate=10.0, batch_size=64, ownship_position=None, allowed_sentences=DEFAULT_ALLOWED_SENTENCES, min_backoff=0.25, max_backoff=1.0):
+        """
+        :param navigation_rate: Navigation solutions per second (u-blox 7 supports up to 10 Hz, high rates may need a
+                                USB connection or a higher baud rate)
+        """
+
+        # call parent constructor
+        super().__init__(data_hub=data_hub, port=port, baud_rate=baud_rate, batch_size=batch_size, ownship_position=ownship_position, allowed_sentences=allowed_sentences, min_backoff=min_backoff, max_backoff=max_backoff)
+
+        # configure logging
+        self._logger = logging.getLogger('InputSerialUbx')
+
+        # store parameters in object variables
+        self._navigation_rate = navigation_rate
+
+        # NMEA sentences that the receiver keeps sending (types of allow-list)
+        self._nmea_sentences = tuple(sentence[-3:].upper() for sentence in allowed_sentences) if allowed_sentences is not None else DEFAULT_ALLOWED_SENTENCES
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_input_serial_ubx")
+
+        self._logger.info('Running')
+
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        try:
+            # start loop
+            loop.run_until_complete(self.run_async(loop))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.stop()
+            loop.close()
+
+        # close data input queue
+        self._data_hub.close()
+
+        self._logger.info('Terminating')
+
+    def _create_framer(self):
+        return UbxFramer()
+
+    def _configure_device(self, s):
+        # receiver may have lost its configuration while it was unplugged, so configure it on every attach
+        self._logger.info('Configuring NAV-PVT at {:.0f} Hz'.format(self._navigation_rate))
+
+        for message in get_configuration_messages(self._navigation_rate, self._nmea_sentences):
+            s.write(message)
+
+    def _handle_data(self, data, ubx_framer):
+        data_hub_items = []
+
+        for message_class, message_id, payload in ubx_framer.feed(data):
+            if message_class is None:
+                # NMEA sentence
+                self._handle_sentence(payload, data_hub_items)
+
+            elif message_class == UBX_CLASS_NAV and message_id == UBX_NAV_PVT:
+                ownship_fix = parse_nav_pvt(payload)
+                if ownship_fix is None:
+                    continue
+
+                self._statistics.count('ubx', 'nav_pvt')
+
+                # share own position with other input modules
+                if self._ownship_position is not None and 2 <= ownship_fix.fix_quality <= 4:
+                    self._ownship_position.set_position(ownship_fix.latitude, ownship_fix.longitude)
+
+                data_hub_items.append(DataHubItem('ownship_fix', ownship_fix, timestamp=self._trace_sampler.stamp()))
+
+            elif message_class == UBX_CLASS_ACK:
+                if message_id == UBX_ACK_ACK:
+                    self._statistics.count('ubx', 'acknowledged')
+                elif message_id == UBX_ACK_NAK and len(payload) >= 2:
+                    self._statistics.count('ubx', 'rejected')
+                    self._logger.warning('Configuration message 0x{:02x} 0x{:02x} rejected by receiver'.format(payload[0], payload[1]))
+
+        self._statistics.set_gauge('ubx_checksum_errors', ubx_framer.checksum_error_count)
+
+        return data_hub_items
@@ -1,6 +1,6 @@
+import asyncio
 import datetime
 import logging
-import time
 
 from data_hub.data_hub_item import DataHubItem
 from input.input_module import InputModule
@@ -26,22 +26,31 @@ class TestDataGenerator(InputModule):
     def run(self):
         self._logger.info('Running')
 
-        while True:
-            try:
-                # create new item for data hub
-                data_hub_item = DataHubItem('test', 'test data ' + str(datetime.datetime.now()))
-
-                self._logger.debug('Genereated dummy data ' + str(data_hub_item))
-
-                # hand over data hub item to data hub
-                self._data_hub.put(data_hub_item)
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
 
-                time.sleep(5)
-
-            except(KeyboardInterrupt, SystemExit):
-                break
+        try:
+            # start loop
+            loop.run_until_complete(self.run_async(loop))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.stop()
 
         # close data hub queue
         self._data_hub.close()
 
         self._logger.info('Terminating')
+
+    @asyncio.coroutine
+    def run_async(self, loop):
+        while True:
+            # create new item for data hub
+            data_hub_item = DataHubItem('test', 'test data ' + str(datetime.datetime.now()))
+
+            self._logger.debug('Genereated dummy data ' + str(data_hub_item))
+
+            # hand over data hub item to data hub
+            self._data_hub.put(data_hub_item)
+
+            yield from asyncio.sleep(5)
@@ -0,0 +1,110 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import setproctitle
+import sys
+import time
+
+from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_item_log import DataHubItemLogWriter
+from output.output_module import OutputModule, get_data_hub_items
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+@asyncio.coroutine
+def input_processor(loop, data_input_queue, log_writer, statistics):
+    logger = logging.getLogger('FileRecorderOutput.InputProcessor')
+
+    # get executor that can run in the background (and is asyncio-enabled)
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    # flush log to disk once per second (writes are buffered in between)
+    flush_interval = 1.0
+    last_flush_time = time.time()
+
+    while True:
+        # get new batch of items from data hub
+        data_hub_items = yield from get_data_hub_items(loop, executor, data_input_queue, statistics)
+
+        # check if item is a poison pill
+        if data_hub_items is None:
+            logger.debug('Received poison pill')
+
+            # exit loop
+            break
+
+        start_time = time.time()
+
+        # append batch to log
+        log_writer.write([data_hub_item for data_hub_item in data_hub_items if type(data_hub_item) is DataHubItem], start_time)
+
+        if start_time - last_flush_time >= flush_interval:
+            log_writer.flush()
+            last_flush_time = start_time
+
+        # update statistics
+        statistics.count_items('items_in', data_hub_items)
+        statistics.add_time('processing', time.time() - start_time)
+        statistics.publish_if_due()
+
+
+class OutputFileRecorder(OutputModule):
+    """
+    Output module that records data hub items of the given content types (all by default) in a binary log (see
+    DataHubItemLogWriter), which can be replayed with InputFileReplay.
+    """
+
+    def __init__(self, path, content_types=None):
+        # call parent constructor
+        super().__init__()
+
+        # configure logging
+        self._logger = logging.getLogger('FileRecorderOutput')
+        self._logger.info('Initializing')
+
+        # store arguments in object variables
+        self._path = path
+        self._content_types = content_types
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_output_file_recorder")
+
+        self._logger.info('Running')
+
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        try:
+            # start loop
+            loop.run_until_complete(self.run_async(loop))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        except:
+            self._logger.exception(sys.exc_info()[0])
+        finally:
+            loop.stop()
+
+        # close data input queue
+        self._data_input_queue.close()
+
+        self._logger.info('Terminating')
+
+    @asyncio.coroutine
+    def run_async(self, loop):
+        log_writer = DataHubItemLogWriter(self._path)
+
+        self._logger.info('Recording to {}'.format(self._path))
+
+        try:
+            yield from input_processor(loop=loop, data_input_queue=self._data_input_queue, log_writer=log_writer, statistics=self._statistics)
+        finally:
+            log_writer.close()
+
+    def get_desired_content_types(self):
+        if self._content_types:
+            return list(self._content_types)
+
+        return(['ANY'])
@@ -1,13 +1,46 @@
+import asyncio
+from abc import ABCMeta, abstractmethod
 from multiprocessing import Process
 
+from data_hub.shared_memory_ring_buffer import SharedMemoryRingBufferReader
+from utils.statistics import Statistics
+
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
 
-class OutputModule(Process):
+@asyncio.coroutine
+def get_data_hub_items(loop, executor, data_input_queue, statistics=None):
+    """
+    Gets next batch of items from data input queue without blocking the event loop.
+
+    :param loop: Event loop
+    :param executor: Executor used for waiting on queues of other processes
+    :param data_input_queue: Data input queue (asyncio.Queue in asyncio runtime, otherwise inter-process queue or reader
+                             of shared memory ring buffer)
+    :param statistics: Statistics of module (gets number of records lost by ring buffer reader as 'lapped' gauge)
+    :return: List of data hub items or None (poison pill)
+    """
+
+    if isinstance(data_input_queue, asyncio.Queue):
+        data_hub_items = yield from data_input_queue.get()
+    else:
+        data_hub_items = yield from loop.run_in_executor(executor, data_input_queue.get)
+
+    # readers of shared memory ring buffer lose records if they fall behind (data hub worker cannot count them)
+    if statistics is not None and isinstance(data_input_queue, SharedMemoryRingBufferReader):
+        statistics.set_gauge('lapped', data_input_queue.get_lapped_count())
+
+    return data_hub_items
+
+
+class OutputModule(Process, metaclass=ABCMeta):
     """
     Generic output module class.
+
+    Modules implement their functionality in the run_async coroutine, so that they can either run in their own process
+    (run) or as asyncio task in a shared event loop.
     """
 
     def __init__(self):
@@ -17,10 +50,24 @@ class OutputModule(Process):
         # initialize data input queue
         self._data_input_queue = None
 
+        # initialize statistics
+        self._statistics = Statistics(type(self).__name__)
+
     def set_data_input_queue(self, data_input_queue):
         self._data_input_queue = data_input_queue
 
         self._logger.debug('Received data input queue')
 
+    def set_statistics_queue(self, statistics_queue):
+        self._statistics.set_statistics_queue(statistics_queue)
+
     def get_desired_content_types(self):
         return(['ANY'])
+
+    @abstractmethod
+    def run_async(self, loop):
+        """
+        Coroutine with functionality of module.
+
+        :param loop: Event loop
+        """
@@ -4,9 +4,10 @@ import logging
 import setproctitle
 import sys
 from threading import Lock
+import time
 
 from data_hub.data_hub_item import DataHubItem
-from output.output_module import OutputModule
+from output.output_module import OutputModule, get_data_hub_items
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
@@ -14,29 +15,52 @@ __email__ = "thorsten.biermann@gmail.com"
 
 
 @asyncio.coroutine
-def input_processor(loop, data_input_queue, clients, clients_lock):
+def input_processor(loop, data_input_queue, clients, clients_lock, statistics):
     logger = logging.getLogger('AirConnectOutput.InputProcessor')
 
-    while True:
-        # get executor that can run in the background (and is asyncio-enabled)
-        executor = ThreadPoolExecutor(max_workers=1)
+    # get executor that can run in the background (and is asyncio-enabled)
+    executor = ThreadPoolExecutor(max_workers=1)
 
-        # get new item from data hub
-        data_hub_item = yield from loop.run_in_executor(executor, data_input_queue.get)
+    while True:
+        # get new batch of items from data hub
+        data_hub_items = yield from get_data_hub_items(loop, executor, data_input_queue, statistics)
 
         # check if item is a poison pill
-        if data_hub_item is None:
+        if data_hub_items is None:
             logger.debug('Received poison pill')
 
             # exit loop
             break
 
-        if type(data_hub_item) is DataHubItem:
-            logger.debug('Received ' + str(data_hub_item))
+        start_time = time.time()
+
+        # trace stamps of items sent to clients (items generated from the same input item share their trace stamp)
+        trace_stamps = set()
+
+        for data_hub_item in data_hub_items:
+            if type(data_hub_item) is DataHubItem:
+                logger.debug('Received ' + str(data_hub_item))
+
+                with clients_lock:
+                    for client in clients:
+                        client.send_string_data(str(data_hub_item.get_content_data() + '\r\n'))
+
+                    # count sent items per content type (once per client)
+                    statistics.count('items_out', data_hub_item.get_content_type(), len(clients))
+
+                    if clients and data_hub_item.get_timestamp() is not None:
+                        trace_stamps.add((data_hub_item.get_source_type(), data_hub_item.get_timestamp()))
+
+        # trace stamp ends when data is written to clients (once per batch, independent of number of clients)
+        for source_type, timestamp in trace_stamps:
+            statistics.add_latency(source_type, timestamp)
 
-            with clients_lock:
-                for client in clients:
-                    client.send_string_data(str(data_hub_item.get_content_data() + '\r\n'))
+        # update statistics
+        statistics.count_items('items_in', data_hub_items)
+        with clients_lock:
+            statistics.set_gauge('clients', len(clients))
+        statistics.add_time('processing', time.time() - start_time)
+        statistics.publish_if_due()
 
 
 class AirConnectServerClientProtocol(asyncio.Protocol):
@@ -140,25 +164,14 @@ class OutputNetworkAirConnect(OutputModule):
         # get asyncio loop
         loop = asyncio.get_event_loop()
 
-        # create server coroutine
-        air_connect_server = loop.create_server(lambda: AirConnectServerClientProtocol(clients=self.clients, clients_lock=self.clients_lock, password=None), host='', port=2000)
-
-        # compile task list that will run in loop
-        tasks = asyncio.gather(
-            asyncio.async(input_processor(loop=loop, data_input_queue=self._data_input_queue, clients=self.clients, clients_lock=self.clients_lock)),
-            asyncio.async(air_connect_server)
-        )
-
         try:
             # start loop
-            loop.run_until_complete(tasks)
+            loop.run_until_complete(self.run_async(loop))
         except(KeyboardInterrupt, SystemExit):
             pass
         except:
             self._logger.exception(sys.exc_info()[0])
-            tasks.cancel()
         finally:
-            air_connect_server.close()
             loop.stop()
 
         # close data input queue
@@ -166,5 +179,15 @@ class OutputNetworkAirConnect(OutputModule):
 
         self._logger.info('Terminating')
 
+    @asyncio.coroutine
+    def run_async(self, loop):
+        # start server
+        air_connect_server = yield from loop.create_server(lambda: AirConnectServerClientProtocol(clients=self.clients, clients_lock=self.clients_lock, password=None), host='', port=2000)
+
+        try:
+            yield from input_processor(loop=loop, data_input_queue=self._data_input_queue, clients=self.clients, clients_lock=self.clients_lock, statistics=self._statistics)
+        finally:
+            air_connect_server.close()
+
     def get_desired_content_types(self):
         return(['nmea', 'flarm'])
@@ -1,56 +1,101 @@
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from geopy.distance import vincenty
 import logging
 import pynmea2
-import re
 import setproctitle
 import sys
 from threading import Lock
 import time
 
 from data_hub.data_hub_item import DataHubItem
+from output.output_module import get_data_hub_items
 from transformation.transformation_module import TransformationModule
 import utils.conversion, utils.calculation
+from utils.aircraft_table import AircraftTable
+from utils.geodesy import get_inverse_function
+from utils.nmea import parse_nmea_sentence
+from utils.ogn_parser import parse_ogn_beacon
+from utils.sbs1 import format_icao_id, SBS1_IDENTIFICATION, SBS1_SURFACE_POSITION, SBS1_AIRBORNE_POSITION, SBS1_AIRBORNE_VELOCITY
+
+# NumPy is optional (vectorized calculation of traffic positions)
+try:
+    import numpy
+    import utils.calculation_numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
+# time in seconds after last binary ownship fix until own position is taken from NMEA sentences again
+OWNSHIP_FIX_TIMEOUT = 2.0
+
+# maximum age in seconds of OGN beacon time (older or future times indicate unsynchronized clocks, receive time is used)
+OGN_MAX_BEACON_AGE = 30.0
+
+# time in seconds after last reception until aircraft are no longer tracked
+AIRCRAFT_MAX_AGE = 30.0
+
+# modes of traffic calculation (auto: vectorized if NumPy is available and enough aircraft are tracked)
+TRAFFIC_CALCULATION_MODES = ('auto', 'scalar', 'vectorized')
+
+# minimum number of aircraft for which vectorized calculation is used in auto mode (see
+# benchmark/benchmark_traffic_vectorized.py: the overhead of building arrays makes it slower for few aircraft, e.g.,
+# 0.4x at 10 aircraft; both calculations break even at 30 to 40 aircraft; from 50 aircraft on vectorized calculation
+# is reliably faster, 1.1x to 1.5x at 50, 1.5x to 1.7x at 100, 2.2x to 2.7x at 1000 aircraft)
+VECTORIZED_MIN_AIRCRAFT = 50
+
 
 @asyncio.coroutine
-def input_processor(loop, data_input_queue, aircraft, aircraft_lock, gnss_status, gnss_status_lock):
+def input_processor(loop, data_input_queue, aircraft, aircraft_lock, gnss_status, gnss_status_lock, statistics):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.InputProcessor')
 
-    while True:
-        # get executor that can run in the background (and is asyncio-enabled)
-        executor = ThreadPoolExecutor(max_workers=1)
+    # get executor that can run in the background (and is asyncio-enabled)
+    executor = ThreadPoolExecutor(max_workers=1)
 
-        # get new item from data hub
-        data_hub_item = yield from loop.run_in_executor(executor, data_input_queue.get)
+    while True:
+        # get new batch of items from data hub
+        data_hub_items = yield from get_data_hub_items(loop, executor, data_input_queue, statistics)
 
         # check if item is a poison pill
-        if data_hub_item is None:
+        if data_hub_items is None:
             logger.debug('Received poison pill')
 
             # exit loop
             break
 
-        if type(data_hub_item) is DataHubItem:
-            logger.debug('Received ' + str(data_hub_item))
+        start_time = time.time()
+
+        for data_hub_item in data_hub_items:
+            if type(data_hub_item) is DataHubItem:
+                logger.debug('Received ' + str(data_hub_item))
+
+                if data_hub_item.get_content_type() == 'nmea':
+                    yield from handle_nmea_data(data_hub_item.get_content_data(), gnss_status, gnss_status_lock)
 
-            if data_hub_item.get_content_type() == 'nmea':
-                yield from handle_nmea_data(data_hub_item.get_content_data(), gnss_status, gnss_status_lock)
+                if data_hub_item.get_content_type() == 'ownship_fix':
+                    yield from handle_ownship_fix(data_hub_item.get_content_data(), gnss_status, gnss_status_lock)
 
-            if data_hub_item.get_content_type() == 'sbs1':
-                yield from handle_sbs1_data(data_hub_item.get_content_data(), aircraft, aircraft_lock)
+                if data_hub_item.get_content_type() == 'sbs1':
+                    yield from handle_sbs1_data(data_hub_item.get_content_data(), aircraft, aircraft_lock, timestamp=data_hub_item.get_timestamp())
 
-            if data_hub_item.get_content_type() == 'ogn':
-                yield from handle_ogn_data(data_hub_item.get_content_data(), aircraft, aircraft_lock, gnss_status)
+                if data_hub_item.get_content_type() == 'sbs1_record':
+                    yield from handle_sbs1_record(data_hub_item.get_content_data(), aircraft, aircraft_lock, timestamp=data_hub_item.get_timestamp())
+
+                if data_hub_item.get_content_type() == 'ogn':
+                    yield from handle_ogn_data(data_hub_item.get_content_data(), aircraft, aircraft_lock, gnss_status, timestamp=data_hub_item.get_timestamp())
+
+        # update statistics
+        statistics.count_items('items_in', data_hub_items)
+        statistics.set_gauge('aircraft', len(aircraft))
+        statistics.add_time('processing', time.time() - start_time)
+        statistics.publish_if_due()
 
 
 @asyncio.coroutine
-def handle_sbs1_data(data, aircraft, aircraft_lock):
+def handle_sbs1_data(data, aircraft, aircraft_lock, timestamp=None):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.Sbs1Handler')
 
     try:
@@ -70,13 +115,8 @@ def handle_sbs1_data(data, aircraft, aircraft_lock):
             vertical_speed = fields[16]
 
             with aircraft_lock:
-                # initialize empty AircraftInfo object if required
-                if icao_id not in aircraft.keys():
-                    aircraft[icao_id] = AircraftInfo()
-                    aircraft[icao_id].identifier = icao_id
-
-                # save timestamp
-                aircraft[icao_id].last_seen = time.time()
+                # save timestamp (aircraft is added if required)
+                aircraft.touch(icao_id, time.time())
 
             # handle aircraft identification data
             if msg_type == '1':
@@ -99,6 +139,12 @@ def handle_sbs1_data(data, aircraft, aircraft_lock):
                     aircraft[icao_id].latitude = float(latitude)
                     aircraft[icao_id].longitude = float(longitude)
                     aircraft[icao_id].altitude = float(altitude)
+                    aircraft[icao_id].position_time = aircraft[icao_id].last_seen
+
+                    # save trace stamp of position (carried into generated FLARM messages)
+                    if timestamp is not None:
+                        aircraft[icao_id].trace_timestamp = timestamp
+                        aircraft[icao_id].trace_source_type = 'sbs1'
 
             # handle velocity data
             elif msg_type == '4':
@@ -115,7 +161,53 @@ def handle_sbs1_data(data, aircraft, aircraft_lock):
 
 
 @asyncio.coroutine
-def handle_ogn_data(data, aircraft, aircraft_lock, gnss_status):
+def handle_sbs1_record(sbs1_record, aircraft, aircraft_lock, timestamp=None):
+    logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.Sbs1RecordHandler')
+
+    try:
+        msg_type = sbs1_record.msg_type
+
+        # check if message is of interest
+        if msg_type in (SBS1_IDENTIFICATION, SBS1_SURFACE_POSITION, SBS1_AIRBORNE_POSITION, SBS1_AIRBORNE_VELOCITY):
+            icao_id = format_icao_id(sbs1_record.icao_id)
+
+            with aircraft_lock:
+                # save timestamp (aircraft is added if required)
+                current_aircraft = aircraft.touch(icao_id, time.time())
+
+                # handle aircraft identification data
+                if msg_type == SBS1_IDENTIFICATION:
+                    current_aircraft.callsign = sbs1_record.callsign
+
+                # handle ground and airborne position data
+                elif msg_type == SBS1_SURFACE_POSITION or msg_type == SBS1_AIRBORNE_POSITION:
+                    if sbs1_record.latitude is not None and sbs1_record.longitude is not None:
+                        current_aircraft.latitude = sbs1_record.latitude
+                        current_aircraft.longitude = sbs1_record.longitude
+                        current_aircraft.position_time = current_aircraft.last_seen
+
+                        # save trace stamp of position (carried into generated FLARM messages)
+                        if timestamp is not None:
+                            current_aircraft.trace_timestamp = timestamp
+                            current_aircraft.trace_source_type = 'sbs1'
+
+                    if sbs1_record.altitude is not None:
+                        current_aircraft.altitude = sbs1_record.altitude
+
+                # handle velocity data
+                elif msg_type == SBS1_AIRBORNE_VELOCITY:
+                    if sbs1_record.h_speed is not None:
+                        current_aircraft.h_speed = sbs1_record.h_speed
+                    if sbs1_record.v_speed is not None:
+                        current_aircraft.v_speed = sbs1_record.v_speed
+                    if sbs1_record.course is not None:
+                        current_aircraft.course = sbs1_record.course
+    except:
+        logger.exception(sys.exc_info()[0])
+
+
+@asyncio.coroutine
+def handle_ogn_data(data, aircraft, aircraft_lock, gnss_status, timestamp=None):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.OgnHandler')
 
     logger.debug('Processing OGN data: {}'.format(data))
@@ -124,198 +216,48 @@ def handle_ogn_data(data, aircraft, aircraft_lock, gnss_status):
     if gnss_status.longitude and gnss_status.latitude:
         try:
             # ICA3D1B5A>APRS,qAR:/133959h0107.07N/00146.75W'259/067/A=003083 !W57! id053D1B5A -039fpm +0.1rot 8.2dB 1e +4.8kHz gps3x3 s6.01 h32 rDD04AF
+            beacon = parse_ogn_beacon(data)
 
-            data_parts = data.split(' ')
-
-            # get first part
-            beacon_data = data_parts[0]
-
-            # get remaining parts
-            position_data = data_parts[1:len(data_parts)]
-
-            m = re.match(r"^(.+?)>APRS,(.+?):/(\d{6})+h(\d{4}\.\d{2})(N|S)(.)(\d{5}\.\d{2})(E|W)(.)((\d{3})/(\d{3}))?/A=(\d{6})", beacon_data)
-            if m:
-                identifier = m.group(1)
-                receiver_name = m.group(2)
-
-                timestamp = m.group(3)
-
-                latitude = utils.conversion.ogn_coord_to_degrees(float(m.group(4)))
-
-                if m.group(5) == "S":
-                    latitude = -1.0 * latitude
-
-                symbol_table = m.group(6)
-
-                longitude = utils.conversion.ogn_coord_to_degrees(float(m.group(7)))
-                if m.group(8) == "W":
-                    longitude = -1.0 * longitude
-
-                symbol_code = m.group(9)
-
-                track = 0
-                h_speed = 0
-                if m.group(10) is not None:
-                    track = int(m.group(11))
-                    h_speed = int(m.group(12))
-
-                altitude = int(m.group(13))
-
-                if not identifier == 'FlightBox':
-                    with aircraft_lock:
-                        # initialize empty AircraftInfo object if required
-                        if identifier not in aircraft.keys():
-                            aircraft[identifier] = AircraftInfo()
-                            aircraft[identifier].identifier = identifier
-
-                        # save data
-                        aircraft[identifier].last_seen = time.time()
-                        aircraft[identifier].latitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.latitude, latitude)
-                        aircraft[identifier].longitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.longitude, longitude)
-                        aircraft[identifier].altitude = altitude
-                        aircraft[identifier].h_speed = h_speed
-                        aircraft[identifier].course = track
-
-                    logger.debug('{}: lat={}, lon={}, alt={}, course={:d}, h_speed={:d}'.format(identifier, aircraft[identifier].latitude, aircraft[identifier].longitude, aircraft[identifier].altitude, aircraft[identifier].course, aircraft[identifier].h_speed))
-
-                else:
-                    logger.debug('Discarding receiver beacon')
-
-            else:
-                logger.warn('Problem parsing OGN beacon data: {}'.format(beacon_data))
-
-            # compile matching patterns: FLARM data
-            address_pattern = re.compile(r"id(\S{2})(\S{6})")
-            climb_rate_pattern = re.compile(r"([\+\-]\d+)fpm")
-            turn_rate_pattern = re.compile(r"([\+\-]\d+\.\d+)rot")
-            signal_strength_pattern = re.compile(r"(\d+\.\d+)dB")
-            error_count_pattern = re.compile(r"(\d+)e")
-            coordinates_extension_pattern = re.compile(r"\!W(.)(.)!")
-            hear_ID_pattern = re.compile(r"hear(\w{4})")
-            frequency_offset_pattern = re.compile(r"([\+\-]\d+\.\d+)kHz")
-            gps_status_pattern = re.compile(r"gps(\d+x\d+)")
-            software_version_pattern = re.compile(r"s(\d+\.\d+)")
-            hardware_version_pattern = re.compile(r"h(\d+)")
-            real_id_pattern = re.compile(r"r(\w{6})")
-            flightlevel_pattern = re.compile(r"FL(\d{3}\.\d{2})")
-
-            # compile matching patterns: receiver beacon data
-            ogn_decode_version_pattern = re.compile(r"v(\d\.\d\.\d\.\w+)")
-            load_pattern = re.compile(r"CPU:([\d\.]+)")
-            ram_pattern = re.compile(r"RAM:([\d\.]+)/([\d\.]+)(\w+)")
-            ntp_pattern = re.compile(r"NTP:([\d\.-]+)ms/([\d\.-]+)ppm")
-            temperature_pattern = re.compile(r"([\d\.+-]+)C")
-            rf_pattern = re.compile(r"RF:([\w\d\.+-/]+)")
-
-            for position_data_part in position_data:
-                address_match = address_pattern.match(position_data_part)
-                climb_rate_match = climb_rate_pattern.match(position_data_part)
-                turn_rate_match = turn_rate_pattern.match(position_data_part)
-                signal_strength_match = signal_strength_pattern.match(position_data_part)
-                error_count_match = error_count_pattern.match(position_data_part)
-                coordinates_extension_match = coordinates_extension_pattern.match(position_data_part)
-                hear_ID_match = hear_ID_pattern.match(position_data_part)
-                frequency_offset_match = frequency_offset_pattern.match(position_data_part)
-                gps_status_match = gps_status_pattern.match(position_data_part)
-                software_version_match = software_version_pattern.match(position_data_part)
-                hardware_version_match = hardware_version_pattern.match(position_data_part)
-                real_id_match = real_id_pattern.match(position_data_part)
-                flightlevel_match = flightlevel_pattern.match(position_data_part)
-
-                ogn_decode_version_match = ogn_decode_version_pattern.match(position_data_part)
-                load_match = load_pattern.match(position_data_part)
-                ram_match = ram_pattern.match(position_data_part)
-                ntp_match = ntp_pattern.match(position_data_part)
-                temperature_match = temperature_pattern.match(position_data_part)
-                rf_match = rf_pattern.match(position_data_part)
-
-                if address_match is not None:
-                    # Flarm ID type byte in APRS msg: PTTT TTII
-                    # P => stealth mode
-                    # TTTTT => aircraftType
-                    # II => IdType: 0=Random, 1=ICAO, 2=FLARM, 3=OGN
-                    # (see https://groups.google.com/forum/#!msg/openglidernetwork/lMzl5ZsaCVs/YirmlnkaJOYJ).
-                    address_type = int(address_match.group(1), 16) & 0b00000011
-                    aircraft_type = (int(address_match.group(1), 16) & 0b01111100) >> 2
-                    stealth = ((int(address_match.group(1), 16) & 0b10000000) >> 7 == 1)
-                    address = address_match.group(2)
-
-                elif climb_rate_match is not None:
-                    climb_rate = int(climb_rate_match.group(1))
-
-                    # save data
-                    aircraft[identifier].v_speed = climb_rate
-
-                elif turn_rate_match is not None:
-                    turn_rate = float(turn_rate_match.group(1))
-
-                elif signal_strength_match is not None:
-                    signal_strength = float(signal_strength_match.group(1))
-
-                elif error_count_match is not None:
-                    error_count = int(error_count_match.group(1))
-
-                elif coordinates_extension_match is not None:
-                    # position precision enhancement is third decimal digit of minute
-                    lat_delta_degrees = int(coordinates_extension_match.group(1)) / 1000.0 / 60.0
-                    lon_delta_degrees = int(coordinates_extension_match.group(2)) / 1000.0 / 60.0
-
-                    latitude += lat_delta_degrees
-                    longitude += lon_delta_degrees
-
-                    # save data
-                    aircraft[identifier].latitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.latitude, latitude)
-                    aircraft[identifier].longitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.longitude, longitude)
-
-                elif hear_ID_match is not None:
-                    pass
-                    # heared_aircraft_IDs.append(hear_ID_match.group(1))
-
-                elif frequency_offset_match is not None:
-                    frequency_offset = float(frequency_offset_match.group(1))
-
-                elif gps_status_match is not None:
-                    gps_status = gps_status_match.group(1)
-
-                elif software_version_match is not None:
-                    software_version = float(software_version_match.group(1))
-
-                elif hardware_version_match is not None:
-                    hardware_version = int(hardware_version_match.group(1))
-
-                elif real_id_match is not None:
-                    real_id = real_id_match.group(1)
-
-                elif flightlevel_match is not None:
-                    flightlevel = float(flightlevel_match.group(1))
-
-                elif ogn_decode_version_match is not None:
-                    ogn_decode_version = ogn_decode_version_match.group(1)
-
-                elif load_match is not None:
-                    load = float(load_match.group(1))
-
-                elif ram_match is not None:
-                    ram_used = float(ram_match.group(1))
-                    ram_total = float(ram_match.group(2))
-                    ram_unit = ram_match.group(3)
-
-                elif ntp_match is not None:
-                    ntp_offset_ms = float(ntp_match.group(1))
-                    ntp_update_rate_ppm = float(ntp_match.group(2))
-
-                elif temperature_match is not None:
-                    temperature_celsius = float(temperature_match.group(1))
-
-                elif rf_match is not None:
-                    rf_info = rf_match.group(1)
-
-                else:
-                    logger.warn('Problem parsing OGN position data ({}): {}'.format(position_data_part, position_data))
+            if beacon is None:
+                logger.warn('Problem parsing OGN beacon data: {}'.format(data))
+                return
 
-        except ValueError:
-            logger.warn('Problem during OGN data parsing')
-            logger.exception(sys.exc_info()[0])
+            if beacon.unknown_tokens is not None:
+                logger.warn('Problem parsing OGN position data ({}): {}'.format(' '.join(beacon.unknown_tokens), data))
+
+            if beacon.is_receiver_beacon():
+                logger.debug('Discarding receiver beacon')
+                return
+
+            identifier = beacon.identifier
+
+            # position is valid at time of beacon (may be several seconds before it is received)
+            receive_time = time.time()
+            position_time = utils.conversion.utc_time_of_day_to_timestamp(beacon.timestamp, receive_time)
+            if not receive_time - OGN_MAX_BEACON_AGE <= position_time <= receive_time + 1.0:
+                position_time = receive_time
+
+            with aircraft_lock:
+                # save timestamp (aircraft is added if required)
+                aircraft.touch(identifier, receive_time)
+
+                # save data (positions are relative FLARM coordinates)
+                aircraft[identifier].position_time = position_time
+                aircraft[identifier].latitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.latitude, beacon.latitude)
+                aircraft[identifier].longitude = utils.calculation.lon_abs_from_rel_flarm_coordinate(gnss_status.longitude, beacon.longitude)
+                aircraft[identifier].altitude = beacon.altitude
+                aircraft[identifier].h_speed = beacon.h_speed if beacon.h_speed is not None else 0
+                aircraft[identifier].course = beacon.track if beacon.track is not None else 0
+
+                if beacon.climb_rate is not None:
+                    aircraft[identifier].v_speed = beacon.climb_rate
+
+                # save trace stamp (carried into generated FLARM messages)
+                if timestamp is not None:
+                    aircraft[identifier].trace_timestamp = timestamp
+                    aircraft[identifier].trace_source_type = 'ogn'
+
+            logger.debug('{}: lat={}, lon={}, alt={}, course={:d}, h_speed={:d}'.format(identifier, aircraft[identifier].latitude, aircraft[identifier].longitude, aircraft[identifier].altitude, aircraft[identifier].course, aircraft[identifier].h_speed))
         except:
             logger.exception(sys.exc_info()[0])
 
@@ -325,72 +267,160 @@ def handle_nmea_data(data, gnss_status, gnss_status_lock):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.NmeaHandler')
 
     try:
-        # check if message is of interest
-        if data.startswith('$GPGGA'):
-            message = pynmea2.parse(data)
-
-            logger.debug('GPGGA: lat={} {}, lon={} {}, alt={} {}, qual={:d}, n_sat={}, h_dop={}, geoidal_sep={} {}'.format(message.lat, message.lat_dir, message.lon, message.lon_dir, message.altitude, message.altitude_units, message.gps_qual, message.num_sats, message.horizontal_dil, message.geo_sep, message.geo_sep_units))
-
-            with gnss_status_lock:
-                lat = utils.conversion.nmea_coord_to_degrees(float(message.lat))
-                if message.lat_dir == 'N':
-                    gnss_status.latitude = lat
-                elif message.lat_dir == 'S':
-                    gnss_status.latitude = -1.0 * lat
-
-                lon = utils.conversion.nmea_coord_to_degrees(float(message.lon))
-                if message.lon_dir == 'W':
-                    gnss_status.longitude = -1.0 * lon
-                elif message.lon_dir == 'E':
-                    gnss_status.longitude = lon
-
-                alt_m = float(message.altitude)
-                if message.altitude_units == 'M':
-                    gnss_status.altitude = utils.conversion.meters_to_feet(alt_m)
-
-        elif data.startswith('$GPGLL'):
-            message = pynmea2.parse(data)
-
-            logger.debug('GPGLL: lat={} {}, lon={} {}, status={}, pos_mode={}'.format(message.lat, message.lat_dir, message.lon, message.lon_dir, message.status, message.faa_mode))
-
-            with gnss_status_lock:
-                lat = utils.conversion.nmea_coord_to_degrees(float(message.lat))
-                if message.lat_dir == 'N':
-                    gnss_status.latitude = lat
-                elif message.lat_dir == 'S':
-                    gnss_status.latitude = -1.0 * lat
-
-                lon = utils.conversion.nmea_coord_to_degrees(float(message.lon))
-                if message.lon_dir == 'W':
-                    gnss_status.longitude = -1.0 * lon
-                elif message.lon_dir == 'E':
-                    gnss_status.longitude = lon
-
-        elif data.startswith('$GPVTG'):
-            fields = (data.split('*')[0]).split(',')
-
-            if len(fields) > 9:
-                cog_t = fields[1]
-                cog_m = fields[3]
-                h_speed_kt = fields[5]
-                h_speed_kph = fields[7]
-                pos_mode = fields[9]
-
-                logger.debug('GPVTG: cog_t={}, cog_m={}, h_speed_kt={}, h_speed_kph={}, pos_mode={}'.format(cog_t, cog_m, h_speed_kt, h_speed_kph, pos_mode))
-
-                with gnss_status_lock:
-                    # check if values are available before converting
-                    if h_speed_kt:
-                        gnss_status.h_speed = float(h_speed_kt)
-                    if cog_t:
-                        gnss_status.course = float(cog_t)
+        # check if message is of interest (GGA, GLL, RMC, VTG of any talker)
+        fix = parse_nmea_sentence(data)
+        if fix is None:
+            return
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('{}{}: lat={}, lon={}, alt={}, qual={}, n_sat={}, h_dop={}, status={}, h_speed={}, course={}'.format(fix.talker, fix.sentence_type, fix.latitude, fix.longitude, fix.altitude, fix.fix_quality, fix.satellite_count, fix.hdop, fix.status, fix.h_speed, fix.course))
+
+        # ignore sentences that are marked as invalid (no fix)
+        if fix.status == 'V':
+            return
+
+        # own position is taken from binary fixes (with higher rate) as long as they are received
+        if gnss_status.ownship_fix_time is not None and time.time() - gnss_status.ownship_fix_time < OWNSHIP_FIX_TIMEOUT:
+            return
+
+        with gnss_status_lock:
+            if fix.has_position():
+                gnss_status.latitude = fix.latitude
+                gnss_status.longitude = fix.longitude
+                gnss_status.position_time = time.time()
+
+                if fix.altitude is not None:
+                    gnss_status.altitude = utils.conversion.meters_to_feet(fix.altitude)
+
+            # check if values are available before using them
+            if fix.h_speed is not None:
+                gnss_status.h_speed = fix.h_speed
+            if fix.course is not None:
+                gnss_status.course = fix.course
     except ValueError:
         logger.warn('Problem during NMEA data parsing (no fix?)')
     except:
         logger.exception(sys.exc_info()[0])
 
 
-def generate_flarm_messages(gnss_status, aircraft):
+@asyncio.coroutine
+def handle_ownship_fix(ownship_fix, gnss_status, gnss_status_lock):
+    logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.OwnshipFixHandler')
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Ownship fix: {}'.format(ownship_fix))
+
+    # ignore fixes without valid position (no fix or time only)
+    if not 2 <= ownship_fix.fix_quality <= 4:
+        return
+
+    with gnss_status_lock:
+        gnss_status.latitude = ownship_fix.latitude
+        gnss_status.longitude = ownship_fix.longitude
+        gnss_status.altitude = ownship_fix.altitude
+        gnss_status.h_speed = ownship_fix.h_speed
+        gnss_status.course = ownship_fix.course
+        gnss_status.ownship_fix_time = time.time()
+        gnss_status.position_time = gnss_status.ownship_fix_time
+
+
+def extrapolate_to_emission_time(latitude, longitude, course, h_speed, position_time, emission_time, max_extrapolation_time):
+    """
+    :param position_time: Time in seconds since epoch at which position was valid (None if unknown)
+    :param emission_time: Time in seconds since epoch for which position is needed
+    :param max_extrapolation_time: Maximum time in seconds positions are dead-reckoned (0 disables extrapolation)
+    :return: (latitude, longitude) tuple of position dead-reckoned to emission time
+    """
+
+    if max_extrapolation_time <= 0.0 or position_time is None or course is None or not h_speed:
+        return latitude, longitude
+
+    duration = min(max(emission_time - position_time, 0.0), max_extrapolation_time)
+
+    return utils.calculation.extrapolate_position(latitude, longitude, course, h_speed, duration)
+
+
+def calculate_traffic_geometry(gnss_status, aircraft, emission_time, max_extrapolation_time, geodesy='vincenty'):
+    """
+    :param geodesy: Name of geodesy backend (see utils.geodesy.GEODESY_BACKENDS)
+    :return: (distance, initial bearing, final bearing, north, east, vertical) tuple of aircraft relative to own
+             position (distances in meters, bearings in degrees, vertical None if an altitude is unknown)
+    """
+
+    # compensate age of positions (up to several seconds for OGN beacons)
+    own_latitude, own_longitude = extrapolate_to_emission_time(gnss_status.latitude, gnss_status.longitude, gnss_status.course, gnss_status.h_speed, gnss_status.position_time, emission_time, max_extrapolation_time)
+    aircraft_latitude, aircraft_longitude = extrapolate_to_emission_time(aircraft.latitude, aircraft.longitude, aircraft.course, aircraft.h_speed, aircraft.position_time, emission_time, max_extrapolation_time)
+
+    aircraft_altitude = aircraft.altitude
+    if aircraft_altitude and aircraft.v_speed and aircraft.position_time is not None and max_extrapolation_time > 0.0:
+        aircraft_altitude = utils.calculation.extrapolate_altitude(aircraft_altitude, aircraft.v_speed, min(max(emission_time - aircraft.position_time, 0.0), max_extrapolation_time))
+
+    # calculate distance and bearing
+    distance_m, initial_bearing, final_bearing = get_inverse_function(geodesy)(own_latitude, own_longitude, aircraft_latitude, aircraft_longitude)
+
+    # calculate relative distance (north, east)
+    distance_north_m = utils.calculation.distance_north(initial_bearing, distance_m)
+    distance_east_m = utils.calculation.distance_east(initial_bearing, distance_m)
+
+    vertical_m = None
+    if gnss_status.altitude and aircraft_altitude:
+        vertical_m = utils.conversion.feet_to_meters(aircraft_altitude - gnss_status.altitude)
+
+    return distance_m, initial_bearing, final_bearing, distance_north_m, distance_east_m, vertical_m
+
+
+def calculate_traffic_geometries(gnss_status, aircraft_list, emission_time, max_extrapolation_time, geodesy='vincenty'):
+    """
+    Vectorized version of calculate_traffic_geometry that calculates all aircraft in one pass (requires NumPy and a
+    geodesy backend with vectorized implementation, see utils.calculation_numpy.GEODESY_BACKENDS).
+
+    :return: List of geometry tuples in order of aircraft_list (None for aircraft without position)
+    """
+
+    geometries = [None] * len(aircraft_list)
+
+    indices = [index for index, aircraft in enumerate(aircraft_list) if aircraft.latitude and aircraft.longitude]
+    if not indices:
+        return geometries
+
+    positioned_aircraft = [aircraft_list[index] for index in indices]
+
+    latitudes = numpy.array([aircraft.latitude for aircraft in positioned_aircraft])
+    longitudes = numpy.array([aircraft.longitude for aircraft in positioned_aircraft])
+    altitudes = numpy.array([aircraft.altitude if aircraft.altitude else numpy.nan for aircraft in positioned_aircraft])
+
+    own_latitude, own_longitude = extrapolate_to_emission_time(gnss_status.latitude, gnss_status.longitude, gnss_status.course, gnss_status.h_speed, gnss_status.position_time, emission_time, max_extrapolation_time)
+
+    if max_extrapolation_time > 0.0:
+        # aircraft without track, speed, or time of position are not moved (speed 0, duration 0)
+        courses = numpy.array([aircraft.course if aircraft.course is not None else 0.0 for aircraft in positioned_aircraft])
+        h_speeds = numpy.array([aircraft.h_speed if aircraft.course is not None and aircraft.h_speed else 0.0 for aircraft in positioned_aircraft])
+        v_speeds = numpy.array([aircraft.v_speed if aircraft.v_speed else 0.0 for aircraft in positioned_aircraft])
+        position_times = numpy.array([aircraft.position_time if aircraft.position_time is not None else emission_time for aircraft in positioned_aircraft])
+
+        durations = numpy.clip(emission_time - position_times, 0.0, max_extrapolation_time)
+
+        latitudes, longitudes = utils.calculation_numpy.extrapolate_position(latitudes, longitudes, courses, h_speeds, durations)
+        altitudes = altitudes + v_speeds * durations / 60.0
+
+    distances, initial_bearings, final_bearings, distances_north, distances_east, verticals = utils.calculation_numpy.calculate_traffic(own_latitude, own_longitude, gnss_status.altitude or None, latitudes, longitudes, altitudes, geodesy)
+
+    for index, distance_m, initial_bearing, final_bearing, distance_north_m, distance_east_m, vertical_m in zip(indices, distances.tolist(), initial_bearings.tolist(), final_bearings.tolist(), distances_north.tolist(), distances_east.tolist(), verticals.tolist()):
+        geometries[index] = (distance_m, initial_bearing, final_bearing, distance_north_m, distance_east_m, vertical_m if vertical_m == vertical_m else None)
+
+    return geometries
+
+
+def generate_flarm_messages(gnss_status, aircraft, emission_time=None, max_extrapolation_time=0.0, geometry=None, geodesy='vincenty'):
+    """
+    :param emission_time: Time in seconds since epoch at which messages are emitted (positions of own aircraft and
+                          target are dead-reckoned to this time)
+    :param max_extrapolation_time: Maximum time in seconds positions are dead-reckoned (0 disables extrapolation)
+    :param geometry: Geometry tuple of aircraft that has already been calculated (see calculate_traffic_geometries),
+                     None calculates it
+    :param geodesy: Name of geodesy backend (see utils.geodesy.GEODESY_BACKENDS)
+    """
+
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.FlarmGenerator')
 
     # define parameter limits (given by FLARM protocol)
@@ -407,16 +437,14 @@ def generate_flarm_messages(gnss_status, aircraft):
 
         alarm_level = '0'
 
-        # calculate distance and bearing
-        gnss_coordinates = (gnss_status.latitude, gnss_status.longitude)
-        aircraft_coordinates = (aircraft.latitude, aircraft.longitude)
-        distance_m = vincenty(gnss_coordinates, aircraft_coordinates).meters
-        initial_bearing = utils.calculation.initial_bearing(gnss_status.latitude, gnss_status.longitude, aircraft.latitude, aircraft.longitude)
-        final_bearing = utils.calculation.final_bearing(gnss_status.latitude, gnss_status.longitude, aircraft.latitude, aircraft.longitude)
+        # calculate distance and bearing (unless it has been calculated for all aircraft at once)
+        if geometry is None:
+            if emission_time is None:
+                emission_time = time.time()
+
+            geometry = calculate_traffic_geometry(gnss_status, aircraft, emission_time, max_extrapolation_time, geodesy)
 
-        # calculate relative distance (north, east)
-        distance_north_m = utils.calculation.distance_north(initial_bearing, distance_m)
-        distance_east_m = utils.calculation.distance_east(initial_bearing, distance_m)
+        distance_m, initial_bearing, final_bearing, distance_north_m, distance_east_m, vertical_m = geometry
 
         # skip aircraft if distance is out of limits
         if not (distance_north_m >= DISTANCE_M_MIN and distance_north_m <= DISTANCE_M_MAX):
@@ -431,8 +459,8 @@ def generate_flarm_messages(gnss_status, aircraft):
         logger.debug('{}: dist={:.0f} m, initial_bearing={:.0f} deg, final_bearing={:.0f} deg, dist_n={:.0f} m, dist_e={:.0f} m'.format(aircraft.identifier, distance_m, initial_bearing, final_bearing, distance_north_m, distance_east_m))
 
         relative_vertical = ''
-        if gnss_status.altitude and aircraft.altitude:
-            relative_vertical = '{:.0f}'.format(min(max(utils.conversion.feet_to_meters(aircraft.altitude - gnss_status.altitude), DISTANCE_M_MIN), DISTANCE_M_MAX))
+        if vertical_m is not None:
+            relative_vertical = '{:.0f}'.format(min(max(vertical_m, DISTANCE_M_MIN), DISTANCE_M_MAX))
 
         # indicate ICAO identifier
         identifier_type = '1'
@@ -511,7 +539,7 @@ def generate_flarm_messages(gnss_status, aircraft):
     return None
 
 @asyncio.coroutine
-def data_processor(loop, data_hub, aircraft, aircraft_lock, gnss_status, gnss_status_lock):
+def data_processor(loop, data_hub, aircraft, aircraft_lock, gnss_status, gnss_status_lock, statistics, max_extrapolation_time=0.0, traffic_calculation='scalar', geodesy='vincenty'):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.DataProcessor')
 
     while True:
@@ -520,39 +548,46 @@ def data_processor(loop, data_hub, aircraft, aircraft_lock, gnss_status, gnss_st
         with gnss_status_lock:
             logger.debug('GNSS: lat={}, lon={}, alt={}, h_s={}, h={}'.format(gnss_status.latitude, gnss_status.longitude, gnss_status.altitude, gnss_status.h_speed, gnss_status.course))
 
+        # collect FLARM messages of all aircraft in one batch
+        data_hub_items = []
+
+        # positions are dead-reckoned to time of emission
+        emission_time = time.time()
+
         with aircraft_lock:
-            for icao_id in sorted(aircraft.keys()):
-                current_aircraft = aircraft[icao_id]
+            # delete entries of aircraft that have not been seen for a while
+            aircraft.remove_stale(emission_time)
+
+            aircraft_list = list(aircraft)
 
-                age_in_seconds = time.time() - current_aircraft.last_seen
+            # calculate positions of all aircraft relative to own position in one pass
+            geometries = [None] * len(aircraft_list)
+            if gnss_status.latitude and gnss_status.longitude:
+                if traffic_calculation == 'vectorized' or (traffic_calculation == 'auto' and len(aircraft_list) >= VECTORIZED_MIN_AIRCRAFT):
+                    geometries = calculate_traffic_geometries(gnss_status, aircraft_list, emission_time, max_extrapolation_time, geodesy)
 
-                logger.debug('{}: cs={}, lat={}, lon={}, alt={}, h_s={}, v_s={}, h={}, a={:.0f}'.format(icao_id, current_aircraft.callsign, current_aircraft.latitude, current_aircraft.longitude, current_aircraft.altitude, current_aircraft.h_speed, current_aircraft.v_speed, current_aircraft.course, age_in_seconds))
+            for current_aircraft, geometry in zip(aircraft_list, geometries):
+                if logger.isEnabledFor(logging.DEBUG):
+                    age_in_seconds = emission_time - current_aircraft.last_seen
+                    logger.debug('{}: cs={}, lat={}, lon={}, alt={}, h_s={}, v_s={}, h={}, a={:.0f}'.format(current_aircraft.identifier, current_aircraft.callsign, current_aircraft.latitude, current_aircraft.longitude, current_aircraft.altitude, current_aircraft.h_speed, current_aircraft.v_speed, current_aircraft.course, age_in_seconds))
 
                 # generate FLARM messages
-                flarm_messages = generate_flarm_messages(gnss_status=gnss_status, aircraft=current_aircraft)
+                flarm_messages = generate_flarm_messages(gnss_status=gnss_status, aircraft=current_aircraft, emission_time=emission_time, max_extrapolation_time=max_extrapolation_time, geometry=geometry, geodesy=geodesy)
                 if flarm_messages:
                     for flarm_message in flarm_messages:
-                        data_hub_item = DataHubItem('flarm', flarm_message)
-                        data_hub.put(data_hub_item)
+                        data_hub_items.append(DataHubItem('flarm', flarm_message, timestamp=current_aircraft.trace_timestamp, source_type=current_aircraft.trace_source_type))
 
-                # delete entries of aircraft that have not been seen for a while
-                if age_in_seconds > 30.0:
-                    del aircraft[icao_id]
+                    # trace stamp ends with first FLARM messages generated from traced data
+                    current_aircraft.trace_timestamp = None
 
-        yield from asyncio.sleep(1)
+            statistics.set_gauge('aircraft', len(aircraft))
+            statistics.set_gauge('aircraft_evicted', aircraft.eviction_count)
 
+        # hand over batch to data hub
+        if data_hub_items:
+            data_hub.put(data_hub_items)
 
-class AircraftInfo(object):
-    def __init__(self):
-        self.identifier = None
-        self.callsign = None
-        self.latitude = None
-        self.longitude = None
-        self.altitude = None
-        self.h_speed = None
-        self.v_speed = None
-        self.course = None
-        self.last_seen = None
+        yield from asyncio.sleep(1)
 
 
 class GnssStatus(object):
@@ -563,10 +598,24 @@ class GnssStatus(object):
         self.h_speed = None
         self.course = None
         self.last_update = None
+        self.position_time = None
+        self.ownship_fix_time = None
 
 
 class Sbs1OgnNmeaToFlarmTransformation(TransformationModule):
-    def __init__(self, data_hub):
+    def __init__(self, data_hub, max_extrapolation_time=5.0, traffic_calculation='auto', geodesy='vincenty', max_aircraft=1000):
+        """
+        :param max_extrapolation_time: Maximum time in seconds positions of own aircraft and targets are dead-reckoned
+                                       to time of emission (0 disables extrapolation)
+        :param traffic_calculation: Calculation of traffic positions ('scalar': per aircraft, 'vectorized': all
+                                    aircraft at once with NumPy, 'auto': vectorized if NumPy is available and enough
+                                    aircraft are tracked)
+        :param geodesy: Calculation of distances and bearings ('vincenty' or 'karney': WGS-84 ellipsoid, 'spherical':
+                        sphere, 'flat': local tangent plane, see utils.geodesy)
+        :param max_aircraft: Maximum number of tracked aircraft, least recently seen aircraft are dropped first (0 for
+                             no limit)
+        """
+
         # call parent constructor
         super().__init__(data_hub=data_hub)
 
@@ -575,13 +624,30 @@ class Sbs1OgnNmeaToFlarmTransformation(TransformationModule):
         self._logger.info('Initializing')
 
         # initialize aircraft data structure
-        self._aircraft = {}
+        self._aircraft = AircraftTable(max_age=AIRCRAFT_MAX_AGE, max_size=max_aircraft)
         self._aircraft_lock = Lock()
 
         # initialize gnss data structure
         self._gnss_status = GnssStatus()
         self._gnss_status_lock = Lock()
 
+        # store parameters in object variables
+        self._max_extrapolation_time = max_extrapolation_time
+        self._traffic_calculation = traffic_calculation
+        self._geodesy = geodesy
+
+        # fail early if backend is not available
+        get_inverse_function(geodesy)
+
+        if traffic_calculation != 'scalar' and not NUMPY_AVAILABLE:
+            if traffic_calculation == 'vectorized':
+                self._logger.warning('NumPy is not available, traffic is calculated per aircraft')
+            self._traffic_calculation = 'scalar'
+        elif traffic_calculation != 'scalar' and geodesy not in utils.calculation_numpy.GEODESY_BACKENDS:
+            if traffic_calculation == 'vectorized':
+                self._logger.warning('Geodesy backend {} is not vectorized, traffic is calculated per aircraft'.format(geodesy))
+            self._traffic_calculation = 'scalar'
+
     def run(self):
         setproctitle.setproctitle("flightbox_transformation_sbs1ognnmea_flarm")
 
@@ -590,20 +656,13 @@ class Sbs1OgnNmeaToFlarmTransformation(TransformationModule):
         # get asyncio loop
         loop = asyncio.get_event_loop()
 
-        # compile task list that will run in loop
-        tasks = asyncio.gather(
-            asyncio.async(input_processor(loop=loop, data_input_queue=self._data_input_queue, aircraft=self._aircraft, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock)),
-            asyncio.async(data_processor(loop=loop, data_hub=self._data_hub, aircraft=self._aircraft, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock))
-        )
-
         try:
             # start loop
-            loop.run_until_complete(tasks)
+            loop.run_until_complete(self.run_async(loop))
         except(KeyboardInterrupt, SystemExit):
             pass
         except:
             self._logger.exception(sys.exc_info()[0])
-            tasks.cancel()
         finally:
             loop.stop()
 
@@ -612,5 +671,13 @@ class Sbs1OgnNmeaToFlarmTransformation(TransformationModule):
 
         self._logger.info('Terminating')
 
+    @asyncio.coroutine
+    def run_async(self, loop):
+        # compile task list that will run in loop
+        yield from asyncio.gather(
+            input_processor(loop=loop, data_input_queue=self._data_input_queue, aircraft=self._aircraft, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock, statistics=self._statistics),
+            data_processor(loop=loop, data_hub=self._data_hub, aircraft=self._aircraft, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock, statistics=self._statistics, max_extrapolation_time=self._max_extrapolation_time, traffic_calculation=self._traffic_calculation, geodesy=self._geodesy)
+        )
+
     def get_desired_content_types(self):
-        return(['sbs1', 'ogn', 'nmea'])
+        return(['sbs1', 'sbs1_record', 'ogn', 'nmea', 'ownship_fix'])
@@ -0,0 +1,111 @@
+"""aircraft_table: State of all tracked aircraft, ordered by time of last reception, with expiry of aircraft that have
+not been seen for a while and a limit of the number of tracked aircraft."""
+
+from collections import OrderedDict
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class AircraftInfo(object):
+    __slots__ = ('identifier', 'callsign', 'latitude', 'longitude', 'altitude', 'h_speed', 'v_speed', 'course', 'last_seen', 'position_time', 'trace_timestamp', 'trace_source_type')
+
+    def __init__(self):
+        self.identifier = None
+        self.callsign = None
+        self.latitude = None
+        self.longitude = None
+        self.altitude = None
+        self.h_speed = None
+        self.v_speed = None
+        self.course = None
+        self.last_seen = None
+        self.position_time = None
+        self.trace_timestamp = None
+        self.trace_source_type = None
+
+
+class AircraftTable(object):
+    """
+    Aircraft by identifier, kept in order of last reception (least recently seen first). As receive times only
+    increase, stale aircraft are always at the front: expiry stops at the first aircraft that is still current, and
+    the least recently seen aircraft is evicted when the table is full, both without scanning the whole table.
+    """
+
+    def __init__(self, max_age=30.0, max_size=0):
+        """
+        :param max_age: Time in seconds after last reception until aircraft are removed
+        :param max_size: Maximum number of tracked aircraft (0 for no limit)
+        """
+
+        # store arguments in object variables
+        self._max_age = max_age
+        self._max_size = max_size
+
+        self._aircraft = OrderedDict()
+
+        # number of aircraft removed because table was full
+        self.eviction_count = 0
+
+    def touch(self, identifier, last_seen):
+        """
+        Marks aircraft as received (creates it if it is not tracked yet).
+
+        :param last_seen: Time of reception in seconds since epoch
+        :return: AircraftInfo of aircraft
+        """
+
+        aircraft = self._aircraft.get(identifier)
+
+        if aircraft is None:
+            aircraft = self._aircraft[identifier] = AircraftInfo()
+            aircraft.identifier = identifier
+
+            # evict least recently seen aircraft
+            if self._max_size and len(self._aircraft) > self._max_size:
+                self._aircraft.popitem(last=False)
+                self.eviction_count += 1
+        else:
+            self._aircraft.move_to_end(identifier)
+
+        aircraft.last_seen = last_seen
+
+        return aircraft
+
+    def remove_stale(self, current_time):
+        """
+        Removes aircraft that have not been seen for max_age seconds.
+
+        :return: Number of removed aircraft
+        """
+
+        removed_count = 0
+
+        while self._aircraft:
+            identifier, aircraft = next(iter(self._aircraft.items()))
+            if current_time - aircraft.last_seen <= self._max_age:
+                break
+
+            del self._aircraft[identifier]
+            removed_count += 1
+
+        return removed_count
+
+    def get(self, identifier):
+        return self._aircraft.get(identifier)
+
+    def __getitem__(self, identifier):
+        return self._aircraft[identifier]
+
+    def __contains__(self, identifier):
+        return identifier in self._aircraft
+
+    def __len__(self):
+        return len(self._aircraft)
+
+    def __iter__(self):
+        """
+        :return: Iterator over AircraftInfo of all aircraft (least recently seen first)
+        """
+        return iter(self._aircraft.values())
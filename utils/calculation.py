@@ -2,10 +2,15 @@
 
 import math
 
+import utils.conversion
+
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
+# mean earth radius in meters
+EARTH_RADIUS_M = 6371000.0
+
 
 def initial_bearing(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
     """
@@ -149,3 +154,36 @@ def abs_from_rel_flarm_coordinate(abs_location_coordinate, rel_flarm_coordinate,
     abs_flarm_coordinate = abs_flarm_coordinate_int / INT_CONVERSION_FACTOR
 
     return abs_flarm_coordinate
+
+
+def extrapolate_position(latitude, longitude, course, h_speed, duration):
+    """
+    Dead reckoning along a straight track (locally flat earth, accurate for the distances covered within a few
+    seconds).
+
+    :param latitude: Latitude of last known position in degrees
+    :param longitude: Longitude of last known position in degrees
+    :param course: Track in degrees
+    :param h_speed: Ground speed in knots
+    :param duration: Time in seconds since last known position
+    :return: (latitude, longitude) tuple of extrapolated position in degrees
+    """
+
+    distance_m = utils.conversion.knots_to_mps(h_speed) * duration
+    course_rad = math.radians(course)
+
+    extrapolated_latitude = latitude + math.degrees(distance_m * math.cos(course_rad) / EARTH_RADIUS_M)
+    extrapolated_longitude = longitude + math.degrees(distance_m * math.sin(course_rad) / (EARTH_RADIUS_M * math.cos(math.radians(latitude))))
+
+    return extrapolated_latitude, extrapolated_longitude
+
+
+def extrapolate_altitude(altitude, v_speed, duration):
+    """
+    :param altitude: Last known altitude in feet
+    :param v_speed: Vertical speed in feet per minute
+    :param duration: Time in seconds since last known altitude
+    :return: Extrapolated altitude in feet
+    """
+
+    return altitude + v_speed * duration / 60.0
@@ -0,0 +1,204 @@
+"""calculation_numpy: Array versions (NumPy) of the helper functions in calculation and conversion, and a vectorized
+calculation of relative traffic positions for all aircraft in one pass. Requires NumPy (optional dependency)."""
+
+import numpy
+
+import utils.calculation
+import utils.conversion
+from utils.geodesy import WGS84_A, WGS84_B, WGS84_E2, WGS84_F
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+def feet_to_meters(feet):
+    return numpy.asarray(feet) * utils.conversion.METERS_PER_FEET
+
+
+def meters_to_feet(meters):
+    return numpy.asarray(meters) / utils.conversion.METERS_PER_FEET
+
+
+def knots_to_mps(knots):
+    return numpy.asarray(knots) / utils.conversion.KNOTS_PER_MPS
+
+
+def mps_to_knots(mps):
+    return numpy.asarray(mps) * utils.conversion.KNOTS_PER_MPS
+
+
+def initial_bearing(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
+    """
+    :return: Initial bearings in degrees (0 to 360) from first to second locations (see calculation.initial_bearing)
+    """
+
+    lat1_rad = numpy.radians(lat1_deg)
+    lat2_rad = numpy.radians(lat2_deg)
+    diff_lon_rad = numpy.radians(numpy.asarray(lon2_deg) - lon1_deg)
+
+    bearing_rad = numpy.arctan2(numpy.sin(diff_lon_rad) * numpy.cos(lat2_rad), numpy.cos(lat1_rad) * numpy.sin(lat2_rad) - numpy.sin(lat1_rad) * numpy.cos(lat2_rad) * numpy.cos(diff_lon_rad))
+
+    return (numpy.degrees(bearing_rad) + 360.0) % 360.0
+
+
+def final_bearing(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
+    """
+    :return: Final bearings in degrees from first to second locations (see calculation.final_bearing)
+    """
+
+    return (initial_bearing(lat2_deg, lon2_deg, lat1_deg, lon1_deg) + 180.0) % 360.0
+
+
+def distance_north(bearing_deg, distance):
+    return numpy.sin(numpy.radians(90.0 - numpy.asarray(bearing_deg))) * distance
+
+
+def distance_east(bearing_deg, distance):
+    return numpy.cos(numpy.radians(90.0 - numpy.asarray(bearing_deg))) * distance
+
+
+def relative_bearing(absolute_bearing, course):
+    """
+    :return: Relative bearings in degrees (-180 to 180) (see calculation.relative_bearing)
+    """
+
+    relative_bearing_360 = numpy.asarray(absolute_bearing) - course
+
+    return numpy.where(relative_bearing_360 > 180.0, relative_bearing_360 - 360.0, numpy.where(relative_bearing_360 < -180.0, relative_bearing_360 + 360.0, relative_bearing_360))
+
+
+def extrapolate_position(latitude, longitude, course, h_speed, duration):
+    """
+    :return: (latitudes, longitudes) tuple of dead-reckoned positions (see calculation.extrapolate_position)
+    """
+
+    distance_m = knots_to_mps(h_speed) * duration
+    course_rad = numpy.radians(course)
+
+    extrapolated_latitude = latitude + numpy.degrees(distance_m * numpy.cos(course_rad) / utils.calculation.EARTH_RADIUS_M)
+    extrapolated_longitude = longitude + numpy.degrees(distance_m * numpy.sin(course_rad) / (utils.calculation.EARTH_RADIUS_M * numpy.cos(numpy.radians(latitude))))
+
+    return extrapolated_latitude, extrapolated_longitude
+
+
+def vincenty_inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg, max_iterations=20, tolerance=1e-12):
+    """
+    Inverse solution of Vincenty on the WGS-84 ellipsoid for all pairs of locations at once (iterates until all pairs
+    have converged, see geodesy.vincenty_inverse).
+
+    :return: (distances in meters, initial bearings in degrees, final bearings in degrees) tuple
+    """
+
+    reduced_lat1 = numpy.arctan((1.0 - WGS84_F) * numpy.tan(numpy.radians(lat1_deg)))
+    reduced_lat2 = numpy.arctan((1.0 - WGS84_F) * numpy.tan(numpy.radians(lat2_deg)))
+    sin_u1, cos_u1 = numpy.sin(reduced_lat1), numpy.cos(reduced_lat1)
+    sin_u2, cos_u2 = numpy.sin(reduced_lat2), numpy.cos(reduced_lat2)
+
+    diff_lon_rad = numpy.radians(numpy.asarray(lon2_deg, dtype=float) - lon1_deg)
+    lambda_rad = diff_lon_rad
+
+    for _ in range(max_iterations):
+        sin_lambda, cos_lambda = numpy.sin(lambda_rad), numpy.cos(lambda_rad)
+
+        sin_sigma = numpy.sqrt((cos_u2 * sin_lambda) ** 2 + (cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lambda) ** 2)
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lambda
+        sigma = numpy.arctan2(sin_sigma, cos_sigma)
+
+        # coincident points have sin(sigma) = 0
+        sin_alpha = numpy.divide(cos_u1 * cos_u2 * sin_lambda, sin_sigma, out=numpy.zeros_like(sin_sigma), where=sin_sigma != 0.0)
+        cos_sq_alpha = 1.0 - sin_alpha ** 2
+
+        # equatorial lines have cos^2(alpha) = 0
+        cos_2_sigma_m = numpy.where(cos_sq_alpha != 0.0, cos_sigma - numpy.divide(2.0 * sin_u1 * sin_u2, cos_sq_alpha, out=numpy.zeros_like(cos_sq_alpha), where=cos_sq_alpha != 0.0), 0.0)
+
+        c = WGS84_F / 16.0 * cos_sq_alpha * (4.0 + WGS84_F * (4.0 - 3.0 * cos_sq_alpha))
+
+        previous_lambda_rad = lambda_rad
+        lambda_rad = diff_lon_rad + (1.0 - c) * WGS84_F * sin_alpha * (sigma + c * sin_sigma * (cos_2_sigma_m + c * cos_sigma * (-1.0 + 2.0 * cos_2_sigma_m ** 2)))
+
+        if numpy.all(numpy.abs(lambda_rad - previous_lambda_rad) < tolerance):
+            break
+
+    u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    a = 1.0 + u_sq / 16384.0 * (4096.0 + u_sq * (-768.0 + u_sq * (320.0 - 175.0 * u_sq)))
+    b = u_sq / 1024.0 * (256.0 + u_sq * (-128.0 + u_sq * (74.0 - 47.0 * u_sq)))
+    delta_sigma = b * sin_sigma * (cos_2_sigma_m + b / 4.0 * (cos_sigma * (-1.0 + 2.0 * cos_2_sigma_m ** 2) - b / 6.0 * cos_2_sigma_m * (-3.0 + 4.0 * sin_sigma ** 2) * (-3.0 + 4.0 * cos_2_sigma_m ** 2)))
+
+    distance_m = WGS84_B * a * (sigma - delta_sigma)
+
+    sin_lambda, cos_lambda = numpy.sin(lambda_rad), numpy.cos(lambda_rad)
+    initial_bearing_rad = numpy.arctan2(cos_u2 * sin_lambda, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lambda)
+    final_bearing_rad = numpy.arctan2(cos_u1 * sin_lambda, -sin_u1 * cos_u2 + cos_u1 * sin_u2 * cos_lambda)
+
+    return distance_m, numpy.degrees(initial_bearing_rad) % 360.0, numpy.degrees(final_bearing_rad) % 360.0
+
+
+def spherical_inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
+    """
+    :return: (distances in meters, initial bearings in degrees, final bearings in degrees) tuple (see
+             geodesy.spherical_inverse)
+    """
+
+    lat1_rad = numpy.radians(lat1_deg)
+    lat2_rad = numpy.radians(lat2_deg)
+
+    haversine = numpy.sin((lat2_rad - lat1_rad) / 2.0) ** 2 + numpy.cos(lat1_rad) * numpy.cos(lat2_rad) * numpy.sin(numpy.radians(numpy.asarray(lon2_deg) - lon1_deg) / 2.0) ** 2
+    distance_m = 2.0 * utils.calculation.EARTH_RADIUS_M * numpy.arcsin(numpy.minimum(numpy.sqrt(haversine), 1.0))
+
+    return distance_m, initial_bearing(lat1_deg, lon1_deg, lat2_deg, lon2_deg), final_bearing(lat1_deg, lon1_deg, lat2_deg, lon2_deg)
+
+
+def flat_inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
+    """
+    :return: (distances in meters, initial bearings in degrees, final bearings in degrees) tuple (see
+             geodesy.flat_inverse)
+    """
+
+    mean_lat_rad = numpy.radians((numpy.asarray(lat2_deg) + lat1_deg) / 2.0)
+    sin_mean_lat = numpy.sin(mean_lat_rad)
+
+    w_sq = 1.0 - WGS84_E2 * sin_mean_lat ** 2
+    prime_vertical_radius_m = WGS84_A / numpy.sqrt(w_sq)
+    meridian_radius_m = prime_vertical_radius_m * (1.0 - WGS84_E2) / w_sq
+
+    diff_lon_rad = numpy.radians((numpy.asarray(lon2_deg) - lon1_deg + 180.0) % 360.0 - 180.0)
+
+    north_m = numpy.radians(numpy.asarray(lat2_deg) - lat1_deg) * meridian_radius_m
+    east_m = diff_lon_rad * prime_vertical_radius_m * numpy.cos(mean_lat_rad)
+
+    mean_bearing_deg = numpy.degrees(numpy.arctan2(east_m, north_m))
+    convergence_deg = numpy.degrees(diff_lon_rad * sin_mean_lat) / 2.0
+
+    return numpy.hypot(north_m, east_m), (mean_bearing_deg - convergence_deg) % 360.0, (mean_bearing_deg + convergence_deg) % 360.0
+
+
+# geodesy backends with vectorized implementation (name: inverse function, see geodesy.GEODESY_BACKENDS)
+GEODESY_BACKENDS = {
+    'vincenty': vincenty_inverse,
+    'spherical': spherical_inverse,
+    'flat': flat_inverse,
+}
+
+
+def calculate_traffic(own_latitude, own_longitude, own_altitude, latitudes, longitudes, altitudes, geodesy='vincenty'):
+    """
+    Relative positions of all aircraft to own position in one vectorized pass.
+
+    :param own_altitude: Own altitude in feet (None if unknown)
+    :param altitudes: Altitudes of aircraft in feet (NaN if unknown)
+    :param geodesy: Name of geodesy backend (see GEODESY_BACKENDS)
+    :return: (distance, initial bearing, final bearing, north, east, vertical) tuple of arrays (distances in meters,
+             bearings in degrees, vertical NaN if unknown; FLARM limits are checked in generate_flarm_messages)
+    """
+
+    distance_m, initial_bearing_deg, final_bearing_deg = GEODESY_BACKENDS[geodesy](own_latitude, own_longitude, latitudes, longitudes)
+
+    distance_north_m = distance_north(initial_bearing_deg, distance_m)
+    distance_east_m = distance_east(initial_bearing_deg, distance_m)
+
+    if own_altitude is None:
+        vertical_m = numpy.full_like(distance_m, numpy.nan)
+    else:
+        vertical_m = feet_to_meters(numpy.asarray(altitudes, dtype=float) - own_altitude)
+
+    return distance_m, initial_bearing_deg, final_bearing_deg, distance_north_m, distance_east_m, vertical_m
@@ -88,3 +88,24 @@ def ogn_coord_to_degrees(coordinate):
 
     # format is identical to NMEA
     return nmea_coord_to_degrees(coordinate)
+
+
+def utc_time_of_day_to_timestamp(time_of_day, reference_time):
+    """
+    :param time_of_day: UTC time of day in format HHMMSS (like in OGN beacons and NMEA sentences, optionally with
+                        fractional seconds)
+    :param reference_time: Time in seconds since epoch close to time of day (e.g., current time)
+    :return: Time in seconds since epoch of time of day on the day within +/- 12 hours of reference time
+    """
+
+    seconds_of_day = int(time_of_day[0:2]) * 3600 + int(time_of_day[2:4]) * 60 + float(time_of_day[4:])
+
+    timestamp = reference_time - reference_time % 86400.0 + seconds_of_day
+
+    # handle time of day before or after midnight of reference time
+    if timestamp - reference_time > 43200.0:
+        timestamp -= 86400.0
+    elif reference_time - timestamp > 43200.0:
+        timestamp += 86400.0
+
+    return timestamp
@@ -0,0 +1,169 @@
+"""geodesy: Selectable backends for the inverse geodesic problem (distance and bearings between two locations).
+
+All backends have the same interface: (lat1_deg, lon1_deg, lat2_deg, lon2_deg) -> (distance in meters, initial bearing
+in degrees, final bearing in degrees). 'vincenty' and 'karney' are accurate on the WGS-84 ellipsoid (reference),
+'spherical' uses a sphere with mean earth radius, and 'flat' projects onto the local tangent plane, which is cheapest
+and sufficiently accurate within the FLARM range of +/- 32 km."""
+
+import math
+
+import utils.calculation
+
+# geographiclib is optional (required by 'karney' backend only, installed with geopy 1.13 or later)
+try:
+    from geographiclib.geodesic import Geodesic
+    GEOGRAPHICLIB_AVAILABLE = True
+except ImportError:
+    GEOGRAPHICLIB_AVAILABLE = False
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+WGS84_B = (1.0 - WGS84_F) * WGS84_A
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+
+
+def vincenty_inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg, max_iterations=20, tolerance=1e-12):
+    """
+    Inverse solution of Vincenty on the WGS-84 ellipsoid (accurate to less than a millimeter, fails to converge for
+    nearly antipodal locations).
+
+    :return: (distance in meters, initial bearing in degrees, final bearing in degrees) tuple
+    """
+
+    reduced_lat1 = math.atan((1.0 - WGS84_F) * math.tan(math.radians(lat1_deg)))
+    reduced_lat2 = math.atan((1.0 - WGS84_F) * math.tan(math.radians(lat2_deg)))
+    sin_u1, cos_u1 = math.sin(reduced_lat1), math.cos(reduced_lat1)
+    sin_u2, cos_u2 = math.sin(reduced_lat2), math.cos(reduced_lat2)
+
+    diff_lon_rad = math.radians(lon2_deg - lon1_deg)
+    lambda_rad = diff_lon_rad
+
+    for _ in range(max_iterations):
+        sin_lambda, cos_lambda = math.sin(lambda_rad), math.cos(lambda_rad)
+
+        sin_sigma = math.sqrt((cos_u2 * sin_lambda) ** 2 + (cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lambda) ** 2)
+        if sin_sigma == 0.0:
+            # coincident locations
+            return 0.0, 0.0, 0.0
+
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lambda
+        sigma = math.atan2(sin_sigma, cos_sigma)
+
+        sin_alpha = cos_u1 * cos_u2 * sin_lambda / sin_sigma
+        cos_sq_alpha = 1.0 - sin_alpha ** 2
+
+        # equatorial lines have cos^2(alpha) = 0
+        cos_2_sigma_m = cos_sigma - 2.0 * sin_u1 * sin_u2 / cos_sq_alpha if cos_sq_alpha != 0.0 else 0.0
+
+        c = WGS84_F / 16.0 * cos_sq_alpha * (4.0 + WGS84_F * (4.0 - 3.0 * cos_sq_alpha))
+
+        previous_lambda_rad = lambda_rad
+        lambda_rad = diff_lon_rad + (1.0 - c) * WGS84_F * sin_alpha * (sigma + c * sin_sigma * (cos_2_sigma_m + c * cos_sigma * (-1.0 + 2.0 * cos_2_sigma_m ** 2)))
+
+        if abs(lambda_rad - previous_lambda_rad) < tolerance:
+            break
+    else:
+        raise ValueError('Vincenty formula failed to converge')
+
+    u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    a = 1.0 + u_sq / 16384.0 * (4096.0 + u_sq * (-768.0 + u_sq * (320.0 - 175.0 * u_sq)))
+    b = u_sq / 1024.0 * (256.0 + u_sq * (-128.0 + u_sq * (74.0 - 47.0 * u_sq)))
+    delta_sigma = b * sin_sigma * (cos_2_sigma_m + b / 4.0 * (cos_sigma * (-1.0 + 2.0 * cos_2_sigma_m ** 2) - b / 6.0 * cos_2_sigma_m * (-3.0 + 4.0 * sin_sigma ** 2) * (-3.0 + 4.0 * cos_2_sigma_m ** 2)))
+
+    distance_m = WGS84_B * a * (sigma - delta_sigma)
+
+    sin_lambda, cos_lambda = math.sin(lambda_rad), math.cos(lambda_rad)
+    initial_bearing_rad = math.atan2(cos_u2 * sin_lambda, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lambda)
+    final_bearing_rad = math.atan2(cos_u1 * sin_lambda, -sin_u1 * cos_u2 + cos_u1 * sin_u2 * cos_lambda)
+
+    return distance_m, math.degrees(initial_bearing_rad) % 360.0, math.degrees(final_bearing_rad) % 360.0
+
+
+def karney_inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
+    """
+    Inverse solution of Karney on the WGS-84 ellipsoid (accurate to a few nanometers for all locations, requires
+    geographiclib).
+
+    :return: (distance in meters, initial bearing in degrees, final bearing in degrees) tuple
+    """
+
+    result = Geodesic.WGS84.Inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg, Geodesic.DISTANCE | Geodesic.AZIMUTH)
+
+    return result['s12'], result['azi1'] % 360.0, result['azi2'] % 360.0
+
+
+def spherical_inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
+    """
+    Great circle on a sphere with mean earth radius (position errors up to 168 m within FLARM range, about 0.6 % of the
+    distance, see benchmark_geodesy).
+
+    :return: (distance in meters, initial bearing in degrees, final bearing in degrees) tuple
+    """
+
+    lat1_rad = math.radians(lat1_deg)
+    lat2_rad = math.radians(lat2_deg)
+
+    # haversine formula
+    haversine = math.sin((lat2_rad - lat1_rad) / 2.0) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(math.radians(lon2_deg - lon1_deg) / 2.0) ** 2
+    distance_m = 2.0 * utils.calculation.EARTH_RADIUS_M * math.asin(min(math.sqrt(haversine), 1.0))
+
+    return distance_m, utils.calculation.initial_bearing(lat1_deg, lon1_deg, lat2_deg, lon2_deg), utils.calculation.final_bearing(lat1_deg, lon1_deg, lat2_deg, lon2_deg)
+
+
+def flat_inverse(lat1_deg, lon1_deg, lat2_deg, lon2_deg):
+    """
+    Projection onto the local tangent plane at the mean latitude, with radii of curvature of the WGS-84 ellipsoid
+    (position errors up to 0.44 m within FLARM range and 7.4 m beyond it, see benchmark_geodesy; not suitable near the
+    poles).
+
+    :return: (distance in meters, initial bearing in degrees, final bearing in degrees) tuple
+    """
+
+    mean_lat_rad = math.radians((lat1_deg + lat2_deg) / 2.0)
+    sin_mean_lat = math.sin(mean_lat_rad)
+
+    # radii of curvature in meridian and prime vertical
+    w_sq = 1.0 - WGS84_E2 * sin_mean_lat ** 2
+    prime_vertical_radius_m = WGS84_A / math.sqrt(w_sq)
+    meridian_radius_m = prime_vertical_radius_m * (1.0 - WGS84_E2) / w_sq
+
+    # longitude difference on shortest way (across antimeridian)
+    diff_lon_rad = math.radians((lon2_deg - lon1_deg + 180.0) % 360.0 - 180.0)
+
+    north_m = math.radians(lat2_deg - lat1_deg) * meridian_radius_m
+    east_m = diff_lon_rad * prime_vertical_radius_m * math.cos(mean_lat_rad)
+
+    # bearing at mean latitude, meridians converge by half the longitude difference towards each location
+    mean_bearing_deg = math.degrees(math.atan2(east_m, north_m))
+    convergence_deg = math.degrees(diff_lon_rad * sin_mean_lat) / 2.0
+
+    return math.hypot(north_m, east_m), (mean_bearing_deg - convergence_deg) % 360.0, (mean_bearing_deg + convergence_deg) % 360.0
+
+
+# available backends (name: inverse function)
+GEODESY_BACKENDS = {
+    'vincenty': vincenty_inverse,
+    'karney': karney_inverse,
+    'spherical': spherical_inverse,
+    'flat': flat_inverse,
+}
+
+
+def get_inverse_function(geodesy):
+    """
+    :param geodesy: Name of backend (see GEODESY_BACKENDS)
+    :return: Inverse function of backend
+    """
+
+    if geodesy not in GEODESY_BACKENDS:
+        raise ValueError('Unknown geodesy backend {}'.format(geodesy))
+
+    if geodesy == 'karney' and not GEOGRAPHICLIB_AVAILABLE:
+        raise ValueError('Geodesy backend karney requires geographiclib')
+
+    return GEODESY_BACKENDS[geodesy]
@@ -0,0 +1,109 @@
+"""latency_tracing: Sampled trace stamps and latency histograms for measuring the age of data on its way through FlightBox."""
+
+import bisect
+import time
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# upper bounds (in seconds) of logarithmic histogram buckets: 0.1 ms ... ~105 s, four buckets per factor of two
+LATENCY_BUCKET_BOUNDS = tuple(0.0001 * 2.0 ** (i / 4.0) for i in range(81))
+
+
+class TraceSampler(object):
+    """
+    Decides at ingress which data hub items carry a trace stamp. Only every sample_interval-th item is stamped with the
+    current time, so tracing adds almost no overhead to the other items (sample_interval 0 disables tracing).
+    """
+
+    def __init__(self, sample_interval=0):
+        self._sample_interval = sample_interval
+        self._counter = 0
+
+    def set_sample_interval(self, sample_interval):
+        self._sample_interval = sample_interval
+        self._counter = 0
+
+    def stamp(self):
+        """
+        :return: Current time (as returned by time.time()) if item is sampled, None otherwise
+        """
+
+        if not self._sample_interval:
+            return None
+
+        self._counter += 1
+        if self._counter < self._sample_interval:
+            return None
+
+        self._counter = 0
+
+        return time.time()
+
+
+class LatencyHistogram(object):
+    """
+    Histogram of latencies with logarithmic buckets (see LATENCY_BUCKET_BOUNDS). Percentiles are estimated by the upper
+    bound of the bucket in which they fall, i.e., with a relative error of less than 19 %.
+    """
+
+    def __init__(self):
+        self._bucket_counts = [0] * (len(LATENCY_BUCKET_BOUNDS) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+
+    def add(self, latency):
+        """
+        :param latency: Latency in seconds
+        """
+
+        self._bucket_counts[bisect.bisect_left(LATENCY_BUCKET_BOUNDS, latency)] += 1
+        self._count += 1
+        self._sum += latency
+        if latency > self._max:
+            self._max = latency
+
+    def get_percentile(self, percentile):
+        """
+        :param percentile: Percentile between 0 and 100
+        :return: Estimated latency in seconds, or None if histogram is empty
+        """
+
+        if self._count == 0:
+            return None
+
+        threshold = percentile / 100.0 * self._count
+
+        cumulative_count = 0
+        for bucket_index, bucket_count in enumerate(self._bucket_counts):
+            cumulative_count += bucket_count
+            if cumulative_count >= threshold and bucket_count > 0:
+                if bucket_index < len(LATENCY_BUCKET_BOUNDS):
+                    return min(LATENCY_BUCKET_BOUNDS[bucket_index], self._max)
+                break
+
+        return self._max
+
+    def get_snapshot(self):
+        snapshot = {
+            'count': self._count,
+            'mean_seconds': self._sum / self._count if self._count else None,
+            'max_seconds': self._max if self._count else None,
+            'p50_seconds': self.get_percentile(50),
+            'p90_seconds': self.get_percentile(90),
+            'p99_seconds': self.get_percentile(99),
+        }
+
+        # only report non-empty buckets (by upper bound in milliseconds)
+        buckets = {}
+        for bucket_index, bucket_count in enumerate(self._bucket_counts):
+            if bucket_count:
+                if bucket_index < len(LATENCY_BUCKET_BOUNDS):
+                    buckets['{:.3f}'.format(LATENCY_BUCKET_BOUNDS[bucket_index] * 1000.0)] = bucket_count
+                else:
+                    buckets['inf'] = bucket_count
+        snapshot['buckets_ms'] = buckets
+
+        return snapshot
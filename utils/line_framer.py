@@ -0,0 +1,87 @@
+"""line_framer: Incremental framing of line-based byte streams (like SBS1 or APRS) that arrive in arbitrary chunks."""
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class LineFramer(object):
+    """
+    Splits a byte stream into lines. The incomplete last line of each chunk is kept and completed with the next chunk,
+    so that lines split across TCP segments are neither corrupted nor dropped. Lines are returned as bytes without line
+    terminator (both '\\n' and '\\r\\n' are accepted), so that callers can filter lines before decoding them.
+    """
+
+    def __init__(self, max_line_length=4096):
+        """
+        :param max_line_length: Partial lines longer than this are discarded up to the next line terminator (protects
+                                against streams without line terminators)
+        """
+
+        self._max_line_length = max_line_length
+        self._buffer = b''
+        self._discarded_count = 0
+
+        # set while the rest of a discarded line is skipped
+        self._is_discarding = False
+
+    def feed(self, data):
+        """
+        :param data: Next chunk of byte stream
+        :return: List of complete, non-empty lines (bytes)
+        """
+
+        # skip rest of discarded line (it must not be returned as a line of its own)
+        if self._is_discarding:
+            line_end = data.find(b'\n')
+            if line_end < 0:
+                return []
+
+            data = data[line_end + 1:]
+            self._is_discarding = False
+
+        if self._buffer:
+            data = self._buffer + data
+
+        lines = data.split(b'\n')
+
+        # keep incomplete last line for next chunk
+        self._buffer = lines.pop()
+        if len(self._buffer) > self._max_line_length:
+            self._buffer = b''
+            self._discarded_count += 1
+            self._is_discarding = True
+
+        lines = [line.rstrip(b'\r') for line in lines]
+
+        return [line for line in lines if line]
+
+    def get_discarded_count(self):
+        """
+        :return: Number of partial lines that have been discarded because they exceeded the maximum line length
+        """
+        return self._discarded_count
+
+    def reset(self):
+        """
+        Discards partial line (e.g., after connection has been re-established).
+        """
+        self._buffer = b''
+        self._is_discarding = False
+
+
+def get_field(line, field_index):
+    """
+    Extracts a single field of a comma-separated line without splitting the whole line (only the fields up to the
+    requested one are split off).
+
+    :param line: Line (bytes)
+    :param field_index: Index of field
+    :return: Field (bytes) or None if line has fewer fields
+    """
+
+    fields = line.split(b',', field_index + 1)
+    if len(fields) <= field_index:
+        return None
+
+    return fields[field_index]
@@ -0,0 +1,513 @@
+"""mode_s: Framing of Beast binary streams (like dump1090's port 30005) and decoding of Mode-S extended squitter
+(DF17/18) messages into SBS1 records."""
+
+import math
+
+from utils.sbs1 import Sbs1Record, SBS1_IDENTIFICATION, SBS1_SURFACE_POSITION, SBS1_AIRBORNE_POSITION, SBS1_AIRBORNE_VELOCITY
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# Beast frame types (escape character followed by type and 6 bytes timestamp, 1 byte signal level, message)
+BEAST_ESCAPE = 0x1a
+BEAST_MODE_AC = 0x31
+BEAST_MODE_S_SHORT = 0x32
+BEAST_MODE_S_LONG = 0x33
+BEAST_STATUS = 0x34
+
+# length of frame content (timestamp, signal level, and message) per frame type
+BEAST_FRAME_LENGTHS = {
+    BEAST_MODE_AC: 6 + 1 + 2,
+    BEAST_MODE_S_SHORT: 6 + 1 + 7,
+    BEAST_MODE_S_LONG: 6 + 1 + 14,
+    BEAST_STATUS: 6 + 1 + 14,
+}
+
+# frequency of Beast timestamps (counter of receiver)
+BEAST_TIMESTAMP_FREQUENCY = 12000000.0
+
+# CRC-24 generator polynomial of Mode-S
+MODE_S_CRC_GENERATOR = 0xfff409
+
+# characters of aircraft identification (6 bit per character)
+MODE_S_CHARSET = '#ABCDEFGHIJKLMNOPQRSTUVWXYZ##### ###############0123456789######'
+
+# CPR decoding parameters (number of latitude zones, resolution of encoded latitude/longitude)
+CPR_NZ = 15
+CPR_MAX = 131072.0
+
+# maximum time in seconds between even and odd message for global CPR decoding
+CPR_MAX_PAIR_AGE = 10.0
+
+# maximum age in seconds of own previous position of aircraft for local CPR decoding
+CPR_MAX_REFERENCE_AGE = 30.0
+
+
+def _init_crc_table():
+    crc_table = []
+
+    for i in range(256):
+        crc = i << 16
+        for _ in range(8):
+            if crc & 0x800000:
+                crc = ((crc << 1) ^ MODE_S_CRC_GENERATOR) & 0xffffff
+            else:
+                crc = (crc << 1) & 0xffffff
+        crc_table.append(crc)
+
+    return crc_table
+
+MODE_S_CRC_TABLE = _init_crc_table()
+
+
+def mode_s_crc(data):
+    """
+    :param data: Message without parity field (bytes)
+    :return: CRC-24 of data (int)
+    """
+
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xffffff) ^ MODE_S_CRC_TABLE[((crc >> 16) ^ byte) & 0xff]
+
+    return crc
+
+
+def _init_nl_table():
+    # latitudes at which number of longitude zones changes (from 59 zones at equator down to 2 zones)
+    nl_table = []
+
+    a = 1.0 - math.cos(math.pi / (2.0 * CPR_NZ))
+    for nl in range(59, 1, -1):
+        nl_table.append((math.degrees(math.acos(math.sqrt(a / (1.0 - math.cos(2.0 * math.pi / nl))))), nl))
+
+    return nl_table
+
+CPR_NL_TABLE = _init_nl_table()
+
+
+def cpr_nl(latitude):
+    """
+    :param latitude: Latitude in degrees
+    :return: Number of longitude zones at latitude
+    """
+
+    latitude = abs(latitude)
+
+    for transition_latitude, nl in CPR_NL_TABLE:
+        if latitude < transition_latitude:
+            return nl
+
+    return 1
+
+
+def cpr_decode_global(even_lat_cpr, even_lon_cpr, odd_lat_cpr, odd_lon_cpr, odd_is_newest, surface=False, reference_position=None):
+    """
+    Decodes position from a pair of even and odd CPR encoded positions.
+
+    :param odd_is_newest: Decode position of odd (True) or even (False) message
+    :param surface: Positions are surface positions (then reference_position is required to select quadrant)
+    :param reference_position: (latitude, longitude) tuple of a position within 45 degrees of the aircraft
+    :return: (latitude, longitude) tuple or None if positions are in different longitude zones
+    """
+
+    angle = 90.0 if surface else 360.0
+
+    even_lat_cpr /= CPR_MAX
+    even_lon_cpr /= CPR_MAX
+    odd_lat_cpr /= CPR_MAX
+    odd_lon_cpr /= CPR_MAX
+
+    # latitude index
+    j = math.floor(59.0 * even_lat_cpr - 60.0 * odd_lat_cpr + 0.5)
+
+    even_latitude = angle / 60.0 * (j % 60 + even_lat_cpr)
+    odd_latitude = angle / 59.0 * (j % 59 + odd_lat_cpr)
+
+    if surface:
+        # select hemisphere closest to reference position
+        if reference_position[0] < 0.0:
+            even_latitude -= 90.0
+            odd_latitude -= 90.0
+    else:
+        if even_latitude >= 270.0:
+            even_latitude -= 360.0
+        if odd_latitude >= 270.0:
+            odd_latitude -= 360.0
+
+    # both positions have to be in same longitude zone
+    nl = cpr_nl(even_latitude)
+    if nl != cpr_nl(odd_latitude):
+        return None
+
+    if odd_is_newest:
+        latitude = odd_latitude
+        ni = max(nl - 1, 1)
+        lon_cpr = odd_lon_cpr
+    else:
+        latitude = even_latitude
+        ni = max(nl, 1)
+        lon_cpr = even_lon_cpr
+
+    # longitude index
+    m = math.floor(even_lon_cpr * (nl - 1) - odd_lon_cpr * nl + 0.5)
+
+    longitude = angle / ni * (m % ni + lon_cpr)
+
+    if surface:
+        # select quadrant closest to reference position
+        longitude += math.floor((reference_position[1] - longitude + 45.0) / 90.0) * 90.0
+
+    if longitude >= 180.0:
+        longitude -= 360.0
+
+    return latitude, longitude
+
+
+def cpr_decode_local(lat_cpr, lon_cpr, is_odd, reference_position, surface=False):
+    """
+    Decodes position from a single CPR encoded position and a reference position (less than 180 NM, or 45 NM for
+    surface positions, away from the aircraft).
+
+    :return: (latitude, longitude) tuple
+    """
+
+    angle = 90.0 if surface else 360.0
+    reference_latitude, reference_longitude = reference_position
+
+    lat_cpr /= CPR_MAX
+    lon_cpr /= CPR_MAX
+
+    d_lat = angle / (59.0 if is_odd else 60.0)
+    j = math.floor(reference_latitude / d_lat) + math.floor(0.5 + (reference_latitude % d_lat) / d_lat - lat_cpr)
+    latitude = d_lat * (j + lat_cpr)
+
+    ni = max(cpr_nl(latitude) - (1 if is_odd else 0), 1)
+    d_lon = angle / ni
+    m = math.floor(reference_longitude / d_lon) + math.floor(0.5 + (reference_longitude % d_lon) / d_lon - lon_cpr)
+    longitude = d_lon * (m + lon_cpr)
+
+    return latitude, longitude
+
+
+def _decode_movement(movement):
+    # ground speed in knots of surface position messages (non-linear encoding)
+    if movement == 1:
+        return 0.0
+    elif 2 <= movement <= 8:
+        return 0.125 + (movement - 2) * 0.125
+    elif 9 <= movement <= 12:
+        return 1.0 + (movement - 9) * 0.25
+    elif 13 <= movement <= 38:
+        return 2.0 + (movement - 13) * 0.5
+    elif 39 <= movement <= 93:
+        return 15.0 + (movement - 39)
+    elif 94 <= movement <= 108:
+        return 70.0 + (movement - 94) * 2.0
+    elif 109 <= movement <= 123:
+        return 100.0 + (movement - 109) * 5.0
+    elif movement == 124:
+        return 175.0
+
+    return None
+
+
+class BeastFramer(object):
+    """
+    Splits a Beast binary stream into frames. Escape characters within frames are doubled in the stream; incomplete
+    frames at the end of a chunk are completed with the next chunk, and corrupted frames are skipped by
+    resynchronizing on the next frame start.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._discarded_count = 0
+
+    def feed(self, data):
+        """
+        :param data: Next chunk of byte stream
+        :return: List of (frame type, timestamp, signal level, message) tuples (timestamp is the 12 MHz counter of the
+                 receiver)
+        """
+
+        if self._buffer:
+            data = self._buffer + data
+
+        frames = []
+
+        data_length = len(data)
+        position = data.find(BEAST_ESCAPE)
+
+        while 0 <= position < data_length - 1:
+            frame_type = data[position + 1]
+            frame_length = BEAST_FRAME_LENGTHS.get(frame_type)
+
+            if frame_length is None:
+                # no frame start (e.g., stream joined within frame), search next escape character
+                self._discarded_count += 1
+                position = data.find(BEAST_ESCAPE, position + 1)
+                continue
+
+            start = position + 2
+            end = start + frame_length
+            frame = data[start:end]
+
+            if BEAST_ESCAPE in frame:
+                # remove doubled escape characters (slow path, only some frames contain escape characters)
+                frame, end = self._unescape(data, start, frame_length)
+
+                if frame is None:
+                    if end is None:
+                        # frame is incomplete
+                        break
+
+                    # frame is corrupted, resynchronize on single escape character
+                    self._discarded_count += 1
+                    position = end
+                    continue
+
+            if len(frame) < frame_length:
+                # frame is incomplete
+                break
+
+            frames.append((frame_type, int.from_bytes(frame[:6], 'big'), frame[6], frame[7:]))
+
+            position = data.find(BEAST_ESCAPE, end)
+
+        # keep incomplete frame for next chunk
+        if 0 <= position < data_length:
+            self._buffer = data[position:]
+        else:
+            self._buffer = b''
+
+        return frames
+
+    @staticmethod
+    def _unescape(data, start, frame_length):
+        # returns (frame, end), (None, position of next frame start) for corrupted frames, or (None, None) for
+        # incomplete frames
+        frame = bytearray()
+        data_length = len(data)
+        index = start
+
+        while len(frame) < frame_length:
+            if index >= data_length:
+                return None, None
+
+            byte = data[index]
+
+            if byte == BEAST_ESCAPE:
+                if index + 1 >= data_length:
+                    return None, None
+
+                if data[index + 1] != BEAST_ESCAPE:
+                    return None, index
+
+                index += 1
+
+            frame.append(byte)
+            index += 1
+
+        return bytes(frame), index
+
+    def get_discarded_count(self):
+        """
+        :return: Number of skipped corrupted or unknown frames
+        """
+        return self._discarded_count
+
+    def reset(self):
+        """
+        Discards partial frame (e.g., after connection has been re-established).
+        """
+        self._buffer = b''
+
+
+class _CprState(object):
+    """
+    Latest even and odd CPR encoded positions and latest decoded position of one aircraft.
+    """
+
+    __slots__ = ('even', 'odd', 'position', 'position_time', 'last_seen')
+
+    def __init__(self):
+        # (latitude CPR, longitude CPR, surface flag, receive time) tuples
+        self.even = None
+        self.odd = None
+
+        self.position = None
+        self.position_time = None
+        self.last_seen = None
+
+
+class ModeSDecoder(object):
+    """
+    Decodes Mode-S extended squitter messages (DF17, and DF18 with ADS-B control field) into SBS1 records
+    (identification, surface position, airborne position, airborne velocity). Positions are decoded globally from
+    even/odd message pairs, and locally relative to the previous position of the aircraft afterwards.
+    """
+
+    def __init__(self, reference_position=None):
+        """
+        :param reference_position: (latitude, longitude) tuple of receiver (required for decoding surface positions of
+                                   aircraft without previous airborne position)
+        """
+
+        self._reference_position = reference_position
+        self._cpr_states = {}
+
+        # counters of rejected messages
+        self.crc_error_count = 0
+        self.unsupported_count = 0
+
+    def set_reference_position(self, reference_position):
+        self._reference_position = reference_position
+
+    def decode(self, message, receive_time):
+        """
+        :param message: Mode-S message (bytes, 7 or 14 bytes)
+        :param receive_time: Time of reception in seconds (used to match even/odd position pairs)
+        :return: Sbs1Record or None if message is no supported extended squitter or no position could be decoded yet
+        """
+
+        if len(message) != 14:
+            self.unsupported_count += 1
+            return None
+
+        downlink_format = message[0] >> 3
+        if downlink_format != 17 and not (downlink_format == 18 and message[0] & 0x07 in (0, 1)):
+            self.unsupported_count += 1
+            return None
+
+        if mode_s_crc(message[:11]) != int.from_bytes(message[11:], 'big'):
+            self.crc_error_count += 1
+            return None
+
+        icao_id = int.from_bytes(message[1:4], 'big')
+        me = int.from_bytes(message[4:11], 'big')
+        type_code = me >> 51
+
+        if 1 <= type_code <= 4:
+            return self._decode_identification(icao_id, me)
+        elif 5 <= type_code <= 8:
+            return self._decode_position(icao_id, me, receive_time, True)
+        elif 9 <= type_code <= 18 or 20 <= type_code <= 22:
+            return self._decode_position(icao_id, me, receive_time, False)
+        elif type_code == 19:
+            return self._decode_velocity(icao_id, me)
+
+        self.unsupported_count += 1
+        return None
+
+    def remove_stale(self, current_time, max_age=60.0):
+        """
+        Removes position state of aircraft that have not been seen for max_age seconds.
+        """
+
+        for icao_id in [icao_id for icao_id, cpr_state in self._cpr_states.items() if current_time - cpr_state.last_seen > max_age]:
+            del self._cpr_states[icao_id]
+
+    @staticmethod
+    def _decode_identification(icao_id, me):
+        callsign = ''.join(MODE_S_CHARSET[(me >> (42 - 6 * i)) & 0x3f] for i in range(8)).strip()
+
+        return Sbs1Record(icao_id, SBS1_IDENTIFICATION, callsign or None, None, None, None, None, None, None)
+
+    def _decode_position(self, icao_id, me, receive_time, surface):
+        is_odd = (me >> 34) & 0x1
+        lat_cpr = (me >> 17) & 0x1ffff
+        lon_cpr = me & 0x1ffff
+
+        altitude = None
+        h_speed = None
+        course = None
+
+        if surface:
+            h_speed = _decode_movement((me >> 44) & 0x7f)
+            if (me >> 43) & 0x1:
+                course = ((me >> 36) & 0x7f) * 360.0 / 128.0
+        elif me >> 51 <= 18:
+            # barometric altitude (only 25 ft encoding, Gillham encoded altitudes are ignored)
+            altitude_code = (me >> 36) & 0xfff
+            if altitude_code & 0x10:
+                altitude = float((((altitude_code & 0xfe0) >> 1) | (altitude_code & 0x0f)) * 25 - 1000)
+
+        cpr_state = self._cpr_states.get(icao_id)
+        if cpr_state is None:
+            cpr_state = self._cpr_states[icao_id] = _CprState()
+
+        cpr_state.last_seen = receive_time
+
+        if is_odd:
+            cpr_state.odd = (lat_cpr, lon_cpr, surface, receive_time)
+        else:
+            cpr_state.even = (lat_cpr, lon_cpr, surface, receive_time)
+
+        position = None
+
+        if cpr_state.position is not None and receive_time - cpr_state.position_time <= CPR_MAX_REFERENCE_AGE:
+            # local decoding relative to previous position of aircraft
+            position = cpr_decode_local(lat_cpr, lon_cpr, is_odd, cpr_state.position, surface)
+        elif cpr_state.even is not None and cpr_state.odd is not None \
+                and cpr_state.even[2] == cpr_state.odd[2] \
+                and abs(cpr_state.even[3] - cpr_state.odd[3]) <= CPR_MAX_PAIR_AGE:
+            # global decoding from even/odd pair (surface positions also require reference position)
+            reference_position = cpr_state.position or self._reference_position
+            if not surface or reference_position is not None:
+                position = cpr_decode_global(cpr_state.even[0], cpr_state.even[1], cpr_state.odd[0], cpr_state.odd[1], is_odd, surface, reference_position)
+
+        if position is not None:
+            cpr_state.position = position
+            cpr_state.position_time = receive_time
+
+            latitude, longitude = position
+        else:
+            latitude = longitude = None
+
+        return Sbs1Record(icao_id, SBS1_SURFACE_POSITION if surface else SBS1_AIRBORNE_POSITION, None, altitude, h_speed, course, latitude, longitude, None)
+
+    def _decode_velocity(self, icao_id, me):
+        subtype = (me >> 48) & 0x7
+
+        h_speed = None
+        course = None
+        v_speed = None
+
+        if subtype == 1 or subtype == 2:
+            # ground speed (east-west and north-south components)
+            ew_velocity = (me >> 32) & 0x3ff
+            ns_velocity = (me >> 21) & 0x3ff
+
+            if ew_velocity and ns_velocity:
+                factor = 4 if subtype == 2 else 1
+
+                ew_velocity = (ew_velocity - 1) * factor
+                if (me >> 42) & 0x1:
+                    ew_velocity = -ew_velocity
+
+                ns_velocity = (ns_velocity - 1) * factor
+                if (me >> 31) & 0x1:
+                    ns_velocity = -ns_velocity
+
+                h_speed = math.hypot(ew_velocity, ns_velocity)
+                course = math.degrees(math.atan2(ew_velocity, ns_velocity)) % 360.0
+        elif subtype == 3 or subtype == 4:
+            # air speed and heading (used as approximation of ground speed and track)
+            if (me >> 42) & 0x1:
+                course = ((me >> 32) & 0x3ff) * 360.0 / 1024.0
+
+            air_speed = (me >> 21) & 0x3ff
+            if air_speed:
+                h_speed = float((air_speed - 1) * (4 if subtype == 4 else 1))
+        else:
+            self.unsupported_count += 1
+            return None
+
+        vertical_rate = (me >> 10) & 0x1ff
+        if vertical_rate:
+            v_speed = float((vertical_rate - 1) * 64)
+            if (me >> 19) & 0x1:
+                v_speed = -v_speed
+
+        return Sbs1Record(icao_id, SBS1_AIRBORNE_VELOCITY, None, None, h_speed, course, None, None, v_speed)
@@ -0,0 +1,229 @@
+"""nmea: Validation and classification of raw NMEA 0183 sentences (as bytes, before they are decoded), and parsing of
+the position sentences GGA, GLL, RMC, and VTG (as str) into fix records."""
+
+import utils.conversion
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+def nmea_checksum(data):
+    """
+    :param data: Sentence content between '$' and '*' (bytes)
+    :return: XOR of all bytes
+    """
+
+    checksum = 0
+    for byte in data:
+        checksum ^= byte
+
+    return checksum
+
+
+def is_valid_nmea_sentence(sentence):
+    """
+    :param sentence: Complete sentence without line terminator, like b'$GPGGA,...*68'
+    :return: True if sentence is framed correctly and its checksum matches (sentences without checksum are invalid)
+    """
+
+    if len(sentence) < 9 or sentence[0] not in b'$!' or sentence[-3] != ord('*'):
+        return False
+
+    try:
+        expected_checksum = int(sentence[-2:], 16)
+    except ValueError:
+        return False
+
+    return nmea_checksum(sentence[1:-3]) == expected_checksum
+
+
+def get_sentence_address(sentence):
+    """
+    :param sentence: Complete sentence, like b'$GPGGA,...*68'
+    :return: Address field (talker and sentence type, like b'GPGGA', or proprietary address, like b'PUBX')
+    """
+
+    end = sentence.find(b',')
+    if end < 0:
+        end = len(sentence) - 3
+
+    return sentence[1:end]
+
+
+class NmeaSentenceFilter(object):
+    """
+    Allow-list of sentence types. Entries with three characters (like 'GGA') accept the sentence type from any talker
+    (GP, GN, GL, ...), longer entries (like 'GPGGA' or 'PUBX') accept only exactly this address.
+    """
+
+    def __init__(self, allowed_sentences=None):
+        """
+        :param allowed_sentences: Iterable of sentence types or addresses (None accepts all sentences)
+        """
+
+        self._accept_all = allowed_sentences is None
+        self._sentence_types = set()
+        self._addresses = set()
+
+        if allowed_sentences is not None:
+            for entry in allowed_sentences:
+                entry = entry.strip().upper().encode()
+                if len(entry) == 3:
+                    self._sentence_types.add(entry)
+                elif entry:
+                    self._addresses.add(entry)
+
+    def is_allowed(self, sentence):
+        """
+        :param sentence: Complete sentence, like b'$GPGGA,...*68'
+        :return: True if sentence passes allow-list
+        """
+
+        if self._accept_all:
+            return True
+
+        address = get_sentence_address(sentence)
+
+        # standard addresses consist of two talker characters and three sentence type characters
+        return address in self._addresses or (len(address) == 5 and address[2:] in self._sentence_types)
+
+
+class NmeaFix(object):
+    """
+    Content of a position sentence (GGA, GLL, RMC, or VTG of any talker). Coordinates are given in degrees (negative
+    for south and west), fields not contained in sentence or left empty by receiver are None.
+    """
+
+    __slots__ = (
+        'talker', 'sentence_type', 'time', 'date', 'latitude', 'longitude', 'altitude', 'geoid_separation',
+        'fix_quality', 'satellite_count', 'hdop', 'status', 'mode', 'h_speed', 'course',
+    )
+
+    def __init__(self, talker, sentence_type):
+        self.talker = talker
+        self.sentence_type = sentence_type
+        self.time = None
+        self.date = None
+        self.latitude = None
+        self.longitude = None
+        self.altitude = None
+        self.geoid_separation = None
+        self.fix_quality = None
+        self.satellite_count = None
+        self.hdop = None
+        self.status = None
+        self.mode = None
+        self.h_speed = None
+        self.course = None
+
+    def has_position(self):
+        """
+        :return: True if sentence contains a valid position (GGA with fix, GLL or RMC not marked invalid by status 'V')
+        """
+
+        if self.latitude is None or self.longitude is None:
+            return False
+
+        if self.sentence_type == 'GGA':
+            return self.fix_quality != 0
+
+        return self.status != 'V'
+
+
+def _coordinate(value, hemisphere, negative_hemisphere):
+    if not value:
+        return None
+
+    degrees = utils.conversion.nmea_coord_to_degrees(float(value))
+
+    return -degrees if hemisphere == negative_hemisphere else degrees
+
+
+def _float(value):
+    return float(value) if value else None
+
+
+def _int(value):
+    return int(value) if value else None
+
+
+def _parse_gga(fix, fields):
+    # GGA,time,lat,N/S,lon,E/W,quality,satellites,hdop,altitude,M,geoid separation,M,dgps age,dgps station
+    fix.time = fields[1] or None
+    fix.latitude = _coordinate(fields[2], fields[3], 'S')
+    fix.longitude = _coordinate(fields[4], fields[5], 'W')
+    fix.fix_quality = _int(fields[6])
+    fix.satellite_count = _int(fields[7])
+    fix.hdop = _float(fields[8])
+    fix.altitude = _float(fields[9]) if fields[10] == 'M' else None
+    fix.geoid_separation = _float(fields[11]) if fields[12] == 'M' else None
+
+
+def _parse_gll(fix, fields):
+    # GLL,lat,N/S,lon,E/W[,time,status[,mode]] (time and status were added in NMEA 2.0)
+    fix.latitude = _coordinate(fields[1], fields[2], 'S')
+    fix.longitude = _coordinate(fields[3], fields[4], 'W')
+    if len(fields) > 6:
+        fix.time = fields[5] or None
+        fix.status = fields[6] or None
+    if len(fields) > 7:
+        fix.mode = fields[7] or None
+
+
+def _parse_rmc(fix, fields):
+    # RMC,time,status,lat,N/S,lon,E/W,speed (kt),course (true),date,magnetic variation,E/W[,mode]
+    fix.time = fields[1] or None
+    fix.status = fields[2] or None
+    fix.latitude = _coordinate(fields[3], fields[4], 'S')
+    fix.longitude = _coordinate(fields[5], fields[6], 'W')
+    fix.h_speed = _float(fields[7])
+    fix.course = _float(fields[8])
+    fix.date = fields[9] or None
+    if len(fields) > 12:
+        fix.mode = fields[12] or None
+
+
+def _parse_vtg(fix, fields):
+    # VTG,course (true),T,course (magnetic),M,speed (kt),N,speed (km/h),K[,mode]
+    fix.course = _float(fields[1])
+    fix.h_speed = _float(fields[5])
+    if len(fields) > 9:
+        fix.mode = fields[9] or None
+
+
+# parser and minimum number of fields (including address) per sentence type
+_SENTENCE_PARSERS = {
+    'GGA': (_parse_gga, 13),
+    'GLL': (_parse_gll, 5),
+    'RMC': (_parse_rmc, 12),
+    'VTG': (_parse_vtg, 9),
+}
+
+
+def parse_nmea_sentence(sentence):
+    """
+    :param sentence: Sentence (str, checksum is not validated), like '$GNGGA,120000.00,5113.000,N,00648.000,E,1,08,1.0,
+                     100.0,M,47.0,M,,*68'
+    :return: NmeaFix, or None if sentence is no GGA, GLL, RMC, or VTG sentence or has too few fields
+    :raises ValueError: If a numeric field cannot be converted
+    """
+
+    # standard address: '$' + two talker characters + three sentence type characters
+    if sentence[6:7] != ',':
+        return None
+
+    parser = _SENTENCE_PARSERS.get(sentence[3:6])
+    if parser is None:
+        return None
+
+    parse_function, field_count = parser
+
+    fields = sentence.split('*', 1)[0].split(',')
+    if len(fields) < field_count:
+        return None
+
+    fix = NmeaFix(sentence[1:3], sentence[3:6])
+    parse_function(fix, fields)
+
+    return fix
@@ -0,0 +1,256 @@
+"""ogn_parser: Single-pass parsing of OGN APRS beacons (aircraft and receiver beacons) with precompiled patterns."""
+
+import re
+
+import utils.conversion
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# position part of beacon, like 'ICA3D1B5A>APRS,qAR:/133959h0107.07N/00146.75W'259/067/A=003083'
+POSITION_PATTERN = re.compile(r"^(.+?)>APRS,(.+?):/(\d{6})+h(\d{4}\.\d{2})(N|S)(.)(\d{5}\.\d{2})(E|W)(.)((\d{3})/(\d{3}))?/A=(\d{6})")
+
+# tokens of aircraft beacons
+ADDRESS_PATTERN = re.compile(r"id(\S{2})(\S{6})")
+CLIMB_RATE_PATTERN = re.compile(r"([\+\-]\d+)fpm")
+TURN_RATE_PATTERN = re.compile(r"([\+\-]\d+\.\d+)rot")
+SIGNAL_STRENGTH_PATTERN = re.compile(r"(\d+\.\d+)dB")
+ERROR_COUNT_PATTERN = re.compile(r"(\d+)e")
+COORDINATES_EXTENSION_PATTERN = re.compile(r"!W(\d)(\d)!")
+HEAR_ID_PATTERN = re.compile(r"hear(\w{4})")
+FREQUENCY_OFFSET_PATTERN = re.compile(r"([\+\-]\d+\.\d+)kHz")
+GPS_STATUS_PATTERN = re.compile(r"gps(\d+x\d+)")
+SOFTWARE_VERSION_PATTERN = re.compile(r"s(\d+\.\d+)")
+HARDWARE_VERSION_PATTERN = re.compile(r"h(\d+)")
+REAL_ID_PATTERN = re.compile(r"r(\w{6})")
+FLIGHT_LEVEL_PATTERN = re.compile(r"FL(\d{3}\.\d{2})")
+
+# tokens of receiver beacons
+OGN_DECODE_VERSION_PATTERN = re.compile(r"v(\d+\.\d+\.\d+(?:\.\w+)?)")
+CPU_LOAD_PATTERN = re.compile(r"CPU:([\d\.]+)")
+RAM_PATTERN = re.compile(r"RAM:([\d\.]+)/([\d\.]+)(\w+)")
+NTP_PATTERN = re.compile(r"NTP:([\d\.\+\-]+)ms/([\d\.\+\-]+)ppm")
+TEMPERATURE_PATTERN = re.compile(r"([\d\.\+\-]+)C")
+RF_PATTERN = re.compile(r"RF:(\S+)")
+
+
+class OgnBeacon(object):
+    """
+    Content of an OGN beacon. Positions are given as sent by ogn-decode (relative FLARM coordinates if the receiver
+    location is configured as 0), fields not contained in beacon are None.
+    """
+
+    __slots__ = (
+        # position part
+        'identifier', 'receiver_name', 'timestamp', 'latitude', 'latitude_hemisphere', 'longitude', 'longitude_hemisphere',
+        'symbol_table', 'symbol_code', 'track', 'h_speed', 'altitude',
+        # aircraft beacons
+        'address_type', 'aircraft_type', 'stealth', 'address', 'climb_rate', 'turn_rate', 'signal_strength',
+        'error_count', 'frequency_offset', 'gps_status', 'software_version', 'hardware_version', 'real_id',
+        'flight_level', 'heard_ids',
+        # receiver beacons
+        'ogn_decode_version', 'cpu_load', 'ram_used', 'ram_total', 'ram_unit', 'ntp_offset_ms', 'ntp_correction_ppm',
+        'temperature_celsius', 'rf_info',
+        # tokens that could not be parsed
+        'unknown_tokens',
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def is_receiver_beacon(self):
+        """
+        :return: True for beacons of receivers (which, unlike aircraft beacons, contain no device address)
+        """
+        return self.address is None
+
+
+def _parse_token(beacon, token):
+    # every token is only matched against the one pattern selected by its leading or trailing characters
+    first_character = token[0]
+
+    if first_character == 'i':
+        m = ADDRESS_PATTERN.match(token)
+        if m:
+            # FLARM ID type byte in APRS msg: PTTT TTII
+            # P => stealth mode
+            # TTTTT => aircraftType
+            # II => IdType: 0=Random, 1=ICAO, 2=FLARM, 3=OGN
+            # (see https://groups.google.com/forum/#!msg/openglidernetwork/lMzl5ZsaCVs/YirmlnkaJOYJ).
+            type_byte = int(m.group(1), 16)
+            beacon.address_type = type_byte & 0b00000011
+            beacon.aircraft_type = (type_byte & 0b01111100) >> 2
+            beacon.stealth = (type_byte & 0b10000000) >> 7 == 1
+            beacon.address = m.group(2)
+            return True
+
+    elif first_character == '!':
+        m = COORDINATES_EXTENSION_PATTERN.match(token)
+        if m:
+            # position precision enhancement is third decimal digit of minute (direction given by hemisphere, as sign
+            # of coordinate is lost for 0000.00S or 00000.00W)
+            lat_delta_degrees = int(m.group(1)) / 1000.0 / 60.0
+            lon_delta_degrees = int(m.group(2)) / 1000.0 / 60.0
+
+            beacon.latitude += -lat_delta_degrees if beacon.latitude_hemisphere == 'S' else lat_delta_degrees
+            beacon.longitude += -lon_delta_degrees if beacon.longitude_hemisphere == 'W' else lon_delta_degrees
+            return True
+
+    elif first_character == 'g':
+        m = GPS_STATUS_PATTERN.match(token)
+        if m:
+            beacon.gps_status = m.group(1)
+            return True
+
+    elif first_character == 'h':
+        if token.startswith('hear'):
+            m = HEAR_ID_PATTERN.match(token)
+            if m:
+                if beacon.heard_ids is None:
+                    beacon.heard_ids = []
+                beacon.heard_ids.append(m.group(1))
+                return True
+        else:
+            m = HARDWARE_VERSION_PATTERN.match(token)
+            if m:
+                beacon.hardware_version = int(m.group(1))
+                return True
+
+    elif first_character == 's':
+        m = SOFTWARE_VERSION_PATTERN.match(token)
+        if m:
+            beacon.software_version = float(m.group(1))
+            return True
+
+    elif first_character == 'r':
+        m = REAL_ID_PATTERN.match(token)
+        if m:
+            beacon.real_id = m.group(1)
+            return True
+
+    elif first_character == 'v':
+        m = OGN_DECODE_VERSION_PATTERN.match(token)
+        if m:
+            beacon.ogn_decode_version = m.group(1)
+            return True
+
+    elif first_character == 'F':
+        m = FLIGHT_LEVEL_PATTERN.match(token)
+        if m:
+            beacon.flight_level = float(m.group(1))
+            return True
+
+    elif first_character == 'C':
+        m = CPU_LOAD_PATTERN.match(token)
+        if m:
+            beacon.cpu_load = float(m.group(1))
+            return True
+
+    elif first_character == 'R':
+        if token.startswith('RAM:'):
+            m = RAM_PATTERN.match(token)
+            if m:
+                beacon.ram_used = float(m.group(1))
+                beacon.ram_total = float(m.group(2))
+                beacon.ram_unit = m.group(3)
+                return True
+        else:
+            m = RF_PATTERN.match(token)
+            if m:
+                beacon.rf_info = m.group(1)
+                return True
+
+    elif first_character == 'N':
+        m = NTP_PATTERN.match(token)
+        if m:
+            beacon.ntp_offset_ms = float(m.group(1))
+            beacon.ntp_correction_ppm = float(m.group(2))
+            return True
+
+    elif token.endswith('fpm'):
+        m = CLIMB_RATE_PATTERN.match(token)
+        if m:
+            beacon.climb_rate = int(m.group(1))
+            return True
+
+    elif token.endswith('rot'):
+        m = TURN_RATE_PATTERN.match(token)
+        if m:
+            beacon.turn_rate = float(m.group(1))
+            return True
+
+    elif token.endswith('dB'):
+        m = SIGNAL_STRENGTH_PATTERN.match(token)
+        if m:
+            beacon.signal_strength = float(m.group(1))
+            return True
+
+    elif token.endswith('kHz'):
+        m = FREQUENCY_OFFSET_PATTERN.match(token)
+        if m:
+            beacon.frequency_offset = float(m.group(1))
+            return True
+
+    elif token.endswith('e'):
+        m = ERROR_COUNT_PATTERN.match(token)
+        if m:
+            beacon.error_count = int(m.group(1))
+            return True
+
+    elif token.endswith('C'):
+        m = TEMPERATURE_PATTERN.match(token)
+        if m:
+            beacon.temperature_celsius = float(m.group(1))
+            return True
+
+    return False
+
+
+def parse_ogn_beacon(message):
+    """
+    :param message: OGN beacon, like "ICA3D1B5A>APRS,qAR:/133959h0107.07N/00146.75W'259/067/A=003083 !W57! id053D1B5A
+                    -039fpm +0.1rot 8.2dB 1e +4.8kHz gps3x3 s6.01 h32 rDD04AF"
+    :return: OgnBeacon, or None if beacon contains no position
+    """
+
+    tokens = message.split(' ')
+
+    m = POSITION_PATTERN.match(tokens[0])
+    if m is None:
+        return None
+
+    beacon = OgnBeacon()
+
+    beacon.identifier = m.group(1)
+    beacon.receiver_name = m.group(2)
+    beacon.timestamp = m.group(3)
+
+    beacon.latitude = utils.conversion.ogn_coord_to_degrees(float(m.group(4)))
+    beacon.latitude_hemisphere = m.group(5)
+    if m.group(5) == 'S':
+        beacon.latitude = -beacon.latitude
+
+    beacon.symbol_table = m.group(6)
+
+    beacon.longitude = utils.conversion.ogn_coord_to_degrees(float(m.group(7)))
+    beacon.longitude_hemisphere = m.group(8)
+    if m.group(8) == 'W':
+        beacon.longitude = -beacon.longitude
+
+    beacon.symbol_code = m.group(9)
+
+    if m.group(10) is not None:
+        beacon.track = int(m.group(11))
+        beacon.h_speed = int(m.group(12))
+
+    beacon.altitude = int(m.group(13))
+
+    for token in tokens[1:]:
+        if token and not _parse_token(beacon, token):
+            if beacon.unknown_tokens is None:
+                beacon.unknown_tokens = []
+            beacon.unknown_tokens.append(token)
+
+    return beacon
@@ -0,0 +1,153 @@
+"""range_filter: Cheap bounding box test that drops traffic far away from the own position before it enters the data
+hub."""
+
+import math
+from multiprocessing import Array
+import time
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# mean earth radius in meters (bounding box does not need to be more accurate)
+EARTH_RADIUS_M = 6371000.0
+
+
+class OwnshipPosition(object):
+    """
+    Latest GNSS position, shared between processes (written by GNSS input module, read by other input modules).
+    """
+
+    def __init__(self):
+        # latitude, longitude, and time of fix (0 if no fix is available)
+        self._values = Array('d', [0.0, 0.0, 0.0])
+
+    def set_position(self, latitude, longitude, fix_time=None):
+        if fix_time is None:
+            fix_time = time.time()
+
+        with self._values.get_lock():
+            self._values[0] = latitude
+            self._values[1] = longitude
+            self._values[2] = fix_time
+
+    def get_position(self):
+        """
+        :return: (latitude, longitude, time of fix) tuple (time of fix is 0 if no fix is available)
+        """
+
+        with self._values.get_lock():
+            return self._values[0], self._values[1], self._values[2]
+
+
+class RangeFilter(object):
+    """
+    Decides whether traffic is within a square of +/- radius around the own position (checking latitude and longitude
+    against a bounding box that is updated from the latest GNSS fix once per second). Aircraft whose last position was
+    out of range are remembered, so that their messages without position can be dropped as well. Without a recent fix,
+    all traffic passes (fail open).
+    """
+
+    def __init__(self, ownship_position, radius, max_fix_age=10.0, update_interval=1.0, forget_interval=60.0):
+        """
+        :param ownship_position: OwnshipPosition object
+        :param radius: Half side length of bounding box in meters
+        :param max_fix_age: Maximum age in seconds of GNSS fix, older fixes disable the filter
+        :param update_interval: Interval in seconds for updating bounding box
+        :param forget_interval: Interval in seconds after which aircraft out of range are forgotten
+        """
+
+        # store arguments in object variables
+        self._ownship_position = ownship_position
+        self._radius = radius
+        self._max_fix_age = max_fix_age
+        self._update_interval = update_interval
+        self._forget_interval = forget_interval
+
+        # bounding box (min latitude, max latitude, min longitude, max longitude) around own position, None if filter
+        # is disabled
+        self._bounding_box = None
+        self._reference_position = None
+        self._next_update_time = 0.0
+        self._next_forget_time = 0.0
+
+        # identifiers of aircraft whose last position was out of range
+        self._out_of_range_identifiers = set()
+
+        # number of filtered messages
+        self.filtered_count = 0
+
+    def _update(self, current_time):
+        self._next_update_time = current_time + self._update_interval
+
+        if current_time >= self._next_forget_time:
+            self._next_forget_time = current_time + self._forget_interval
+            self._out_of_range_identifiers.clear()
+
+        latitude, longitude, fix_time = self._ownship_position.get_position()
+
+        if fix_time == 0.0 or current_time - fix_time > self._max_fix_age:
+            self._bounding_box = None
+            self._reference_position = None
+            return
+
+        self._reference_position = (latitude, longitude)
+
+        delta_latitude = math.degrees(self._radius / EARTH_RADIUS_M)
+
+        # longitude is not restricted near poles and across antimeridian
+        min_longitude = -math.inf
+        max_longitude = math.inf
+        cos_latitude = math.cos(math.radians(min(abs(latitude) + delta_latitude, 90.0)))
+        if cos_latitude > 0.01:
+            delta_longitude = delta_latitude / cos_latitude
+            if -180.0 <= longitude - delta_longitude and longitude + delta_longitude <= 180.0:
+                min_longitude = longitude - delta_longitude
+                max_longitude = longitude + delta_longitude
+
+        self._bounding_box = (latitude - delta_latitude, latitude + delta_latitude, min_longitude, max_longitude)
+
+    def get_reference_position(self):
+        """
+        :return: (latitude, longitude) tuple of own position the bounding box is based on, or None if filter is disabled
+        """
+
+        current_time = time.time()
+        if current_time >= self._next_update_time:
+            self._update(current_time)
+
+        return self._reference_position
+
+    def check(self, identifier, latitude=None, longitude=None):
+        """
+        :param identifier: Identifier of aircraft (like ICAO address)
+        :param latitude: Latitude of aircraft (None for messages without position)
+        :param longitude: Longitude of aircraft (None for messages without position)
+        :return: True if message should be kept, False if it should be dropped
+        """
+
+        current_time = time.time()
+        if current_time >= self._next_update_time:
+            self._update(current_time)
+
+        if self._bounding_box is None:
+            return True
+
+        if latitude is None or longitude is None:
+            # messages without position are dropped if last position of aircraft was out of range
+            if identifier in self._out_of_range_identifiers:
+                self.filtered_count += 1
+                return False
+
+            return True
+
+        min_latitude, max_latitude, min_longitude, max_longitude = self._bounding_box
+
+        if min_latitude <= latitude <= max_latitude and min_longitude <= longitude <= max_longitude:
+            self._out_of_range_identifiers.discard(identifier)
+            return True
+
+        self._out_of_range_identifiers.add(identifier)
+        self.filtered_count += 1
+
+        return False
@@ -0,0 +1,62 @@
+"""sbs1: Parsing of SBS1 (BaseStation) messages into compact typed records."""
+
+from collections import namedtuple
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# SBS1 transmission message types
+SBS1_IDENTIFICATION = 1
+SBS1_SURFACE_POSITION = 2
+SBS1_AIRBORNE_POSITION = 3
+SBS1_AIRBORNE_VELOCITY = 4
+
+# content of an SBS1 message with typed values (fields not contained in message are None)
+#   icao_id: ICAO 24-bit address (int)
+#   msg_type: transmission message type (int)
+#   callsign: callsign (str)
+#   altitude: altitude in feet
+#   h_speed: ground speed in knots
+#   course: track in degrees
+#   latitude, longitude: position in degrees
+#   v_speed: vertical rate in feet per minute
+Sbs1Record = namedtuple('Sbs1Record', ['icao_id', 'msg_type', 'callsign', 'altitude', 'h_speed', 'course', 'latitude', 'longitude', 'v_speed'])
+
+
+def _to_float(field):
+    if field:
+        return float(field)
+
+    return None
+
+
+def parse_sbs1_message(message):
+    """
+    :param message: SBS1 message (bytes or str), like 'MSG,3,1,1,3C49CC,1,2015/05/10,18:32:02.542,...'
+    :return: Sbs1Record, or None if message is no transmission message or cannot be parsed
+    """
+
+    if type(message) is str:
+        message = message.encode()
+
+    fields = message.split(b',')
+
+    if len(fields) < 17 or fields[0] != b'MSG':
+        return None
+
+    try:
+        callsign = fields[10].strip().decode() or None
+
+        return Sbs1Record(int(fields[4], 16), int(fields[1]), callsign, _to_float(fields[11]), _to_float(fields[12]), _to_float(fields[13]), _to_float(fields[14]), _to_float(fields[15]), _to_float(fields[16]))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def format_icao_id(icao_id):
+    """
+    :param icao_id: ICAO 24-bit address (int)
+    :return: ICAO address as hexadecimal string as used in SBS1 messages, like '3C49CC'
+    """
+
+    return '{:06X}'.format(icao_id)
@@ -0,0 +1,137 @@
+"""statistics: Low-overhead counters of FlightBox modules that are periodically published for aggregation."""
+
+import os
+import time
+
+from utils.latency_tracing import LatencyHistogram
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class Statistics(object):
+    """
+    Collects counters (per content type), gauges, and timers of one module in plain dictionaries. Every
+    publish_interval seconds, a snapshot of all values is put into the statistics queue, from which the
+    StatisticsServer in the main process collects the snapshots of all modules.
+    """
+
+    def __init__(self, name, publish_interval=5.0):
+        # store arguments in object variables
+        self._name = name
+        self._publish_interval = publish_interval
+
+        # queue for publishing snapshots (publishing is disabled as long as no queue is set)
+        self._statistics_queue = None
+        self._last_publish_time = time.time()
+
+        # initialize values
+        self._counters = {}
+        self._gauges = {}
+        self._timers = {}
+        self._latencies = {}
+
+    def set_statistics_queue(self, statistics_queue):
+        self._statistics_queue = statistics_queue
+
+    def count(self, counter_name, content_type, value=1):
+        """
+        :param counter_name: Name of counter, like 'items_in'
+        :param content_type: Content type (or any other key) the counter is kept for
+        :param value: Value to add to counter
+        """
+
+        counter = self._counters.get(counter_name)
+        if counter is None:
+            counter = self._counters[counter_name] = {}
+
+        counter[content_type] = counter.get(content_type, 0) + value
+
+    def count_items(self, counter_name, data_hub_items):
+        """
+        :param counter_name: Name of counter, like 'items_in'
+        :param data_hub_items: List of data hub items, which are counted per content type
+        """
+
+        counter = self._counters.get(counter_name)
+        if counter is None:
+            counter = self._counters[counter_name] = {}
+
+        for data_hub_item in data_hub_items:
+            content_type = data_hub_item.get_content_type()
+            counter[content_type] = counter.get(content_type, 0) + 1
+
+    def set_gauge(self, gauge_name, value):
+        self._gauges[gauge_name] = value
+
+    def add_time(self, timer_name, duration):
+        """
+        :param timer_name: Name of timer, like 'processing'
+        :param duration: Duration in seconds
+        """
+
+        timer = self._timers.get(timer_name)
+        if timer is None:
+            timer = self._timers[timer_name] = [0, 0.0]
+
+        timer[0] += 1
+        timer[1] += duration
+
+    def add_latency(self, source_type, timestamp):
+        """
+        :param source_type: Content type of data at ingress, like 'sbs1'
+        :param timestamp: Ingress time stamp (as returned by time.time())
+        """
+
+        latency_histogram = self._latencies.get(source_type)
+        if latency_histogram is None:
+            latency_histogram = self._latencies[source_type] = LatencyHistogram()
+
+        latency_histogram.add(time.time() - timestamp)
+
+    def get_snapshot(self):
+        return {
+            'name': self._name,
+            'pid': os.getpid(),
+            'timestamp': time.time(),
+            'counters': {counter_name: dict(counter) for counter_name, counter in self._counters.items()},
+            'gauges': dict(self._gauges),
+            'timers': {timer_name: {'count': timer[0], 'total_seconds': timer[1]} for timer_name, timer in self._timers.items()},
+            'latencies': {source_type: latency_histogram.get_snapshot() for source_type, latency_histogram in self._latencies.items()},
+        }
+
+    def publish_if_due(self):
+        if self._statistics_queue is None:
+            return
+
+        current_time = time.time()
+        if current_time - self._last_publish_time < self._publish_interval:
+            return
+
+        self._last_publish_time = current_time
+
+        self._statistics_queue.put(self.get_snapshot())
+
+
+class StatisticsDataHub(object):
+    """
+    Wrapper around the data hub of an input module that counts all items handed over to the data hub.
+    """
+
+    def __init__(self, data_hub, statistics):
+        self._data_hub = data_hub
+        self._statistics = statistics
+
+    def put(self, data):
+        if type(data) is list:
+            self._statistics.count_items('items_out', data)
+        elif data is not None:
+            self._statistics.count_items('items_out', [data])
+
+        self._data_hub.put(data)
+
+        self._statistics.publish_if_due()
+
+    def close(self):
+        self._data_hub.close()
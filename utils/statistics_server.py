@@ -0,0 +1,99 @@
+"""statistics_server: Collects statistics snapshots of all modules and serves them as JSON via HTTP."""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import logging
+import queue
+from threading import Lock, Thread
+import time
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class StatisticsServer(object):
+    """
+    Runs in the main FlightBox process (like the logging queue listener). One thread collects the snapshots that the
+    modules put into the statistics queue, another thread answers HTTP GET requests on the statistics port with the
+    latest snapshot of every module, e.g.:
+
+        curl http://127.0.0.1:8088/
+    """
+
+    def __init__(self, statistics_queue, host='127.0.0.1', port=8088):
+        # configure logging
+        self._logger = logging.getLogger('StatisticsServer')
+        self._logger.info('Initializing')
+
+        # store arguments in object variables
+        self._statistics_queue = statistics_queue
+        self._host = host
+        self._port = port
+
+        # latest snapshot per module name
+        self._snapshots = {}
+        self._snapshots_lock = Lock()
+
+        self._start_time = time.time()
+        self._is_running = False
+        self._http_server = None
+        self._threads = []
+
+    def start(self):
+        self._is_running = True
+
+        # create HTTP server (request handler has access to server object)
+        statistics_server = self
+
+        class StatisticsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(statistics_server.get_statistics(), sort_keys=True).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                statistics_server._logger.debug(format % args)
+
+        self._http_server = HTTPServer((self._host, self._port), StatisticsRequestHandler)
+
+        self._threads = [
+            Thread(target=self._collect, name='StatisticsCollector', daemon=True),
+            Thread(target=self._http_server.serve_forever, name='StatisticsHttpServer', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        self._logger.info('Serving statistics on {}:{:d}'.format(self._host, self._port))
+
+    def _collect(self):
+        while self._is_running:
+            try:
+                snapshot = self._statistics_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._snapshots_lock:
+                self._snapshots[snapshot['name']] = snapshot
+
+    def get_statistics(self):
+        with self._snapshots_lock:
+            modules = dict(self._snapshots)
+
+        return {'timestamp': time.time(), 'uptime_seconds': time.time() - self._start_time, 'modules': modules}
+
+    def stop(self):
+        self._is_running = False
+
+        if self._http_server:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,202 @@
+"""ubx: Framing, decoding, and encoding of u-blox UBX binary messages (NAV-PVT position fixes and receiver
+configuration). The serial stream of u-blox receivers may interleave UBX frames with NMEA sentences."""
+
+import calendar
+from collections import namedtuple
+import struct
+
+import utils.conversion
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+# frame: sync characters, class, id, payload length (little endian), payload, checksum (2 bytes)
+UBX_SYNC = b'\xb5\x62'
+UBX_HEADER_LENGTH = 6
+UBX_MAX_PAYLOAD_LENGTH = 1024
+
+# message classes and ids
+UBX_CLASS_NAV = 0x01
+UBX_NAV_PVT = 0x07
+UBX_CLASS_ACK = 0x05
+UBX_ACK_NAK = 0x00
+UBX_ACK_ACK = 0x01
+UBX_CLASS_CFG = 0x06
+UBX_CFG_MSG = 0x01
+UBX_CFG_RATE = 0x08
+
+# NMEA sentences (message class 0xF0) that can be configured with CFG-MSG
+UBX_CLASS_NMEA = 0xF0
+UBX_NMEA_IDS = {'GGA': 0x00, 'GLL': 0x01, 'GSA': 0x02, 'GSV': 0x03, 'RMC': 0x04, 'VTG': 0x05}
+
+# NAV-PVT payload up to pDOP (84 bytes with u-blox 7, 92 bytes since u-blox 8)
+NAV_PVT_STRUCT = struct.Struct('<IHBBBBBBIiBBBBiiiiIIiiiiiIIH')
+NAV_PVT_VALID_DATE_TIME = 0x03
+NAV_PVT_FLAG_GNSS_FIX_OK = 0x01
+
+# position fix of own aircraft (content type 'ownship_fix')
+#   timestamp: UTC time of fix in seconds since epoch (None if receiver time is not valid yet)
+#   latitude, longitude: position in degrees
+#   altitude: altitude above mean sea level in feet
+#   h_speed: ground speed in knots
+#   course: track over ground in degrees
+#   fix_quality: fix type (0: no fix, 2: 2D, 3: 3D, 4: GNSS and dead reckoning)
+#   satellite_count: number of satellites used in solution
+OwnshipFix = namedtuple('OwnshipFix', ['timestamp', 'latitude', 'longitude', 'altitude', 'h_speed', 'course', 'fix_quality', 'satellite_count'])
+
+
+def ubx_checksum(data):
+    """
+    :param data: Message class, id, length, and payload (bytes)
+    :return: 8-bit Fletcher checksum (2 bytes)
+    """
+
+    checksum_a = 0
+    checksum_b = 0
+
+    for byte in data:
+        checksum_a = (checksum_a + byte) & 0xff
+        checksum_b = (checksum_b + checksum_a) & 0xff
+
+    return bytes((checksum_a, checksum_b))
+
+
+def encode_ubx_message(message_class, message_id, payload=b''):
+    """
+    :return: Complete UBX frame (bytes)
+    """
+
+    content = struct.pack('<BBH', message_class, message_id, len(payload)) + payload
+
+    return UBX_SYNC + content + ubx_checksum(content)
+
+
+def get_configuration_messages(navigation_rate, nmea_sentences=('GGA', 'GLL', 'RMC', 'VTG')):
+    """
+    :param navigation_rate: Navigation solutions (and NAV-PVT messages) per second
+    :param nmea_sentences: NMEA sentences that are still output once per second, all other sentences are disabled
+    :return: List of UBX frames that configure the receiver (on the port they are sent to)
+    """
+
+    # measurement period in milliseconds, one navigation solution per measurement, aligned to GPS time
+    messages = [encode_ubx_message(UBX_CLASS_CFG, UBX_CFG_RATE, struct.pack('<HHH', int(round(1000.0 / navigation_rate)), 1, 1))]
+
+    # NAV-PVT with every navigation solution
+    messages.append(encode_ubx_message(UBX_CLASS_CFG, UBX_CFG_MSG, struct.pack('<BBB', UBX_CLASS_NAV, UBX_NAV_PVT, 1)))
+
+    # rate of NMEA sentences is given in navigation solutions
+    nmea_rate = max(int(round(navigation_rate)), 1)
+    for sentence_type, message_id in sorted(UBX_NMEA_IDS.items()):
+        rate = nmea_rate if sentence_type in nmea_sentences else 0
+        messages.append(encode_ubx_message(UBX_CLASS_CFG, UBX_CFG_MSG, struct.pack('<BBB', UBX_CLASS_NMEA, message_id, rate)))
+
+    return messages
+
+
+def parse_nav_pvt(payload):
+    """
+    :param payload: Payload of NAV-PVT message
+    :return: OwnshipFix, or None if payload is too short
+    """
+
+    if len(payload) < NAV_PVT_STRUCT.size:
+        return None
+
+    (_, year, month, day, hour, minute, second, valid, _, nano, fix_type, flags, _, satellite_count,
+     longitude, latitude, _, height_msl, _, _, _, _, _, ground_speed, heading, _, _, _) = NAV_PVT_STRUCT.unpack_from(payload)
+
+    timestamp = None
+    if valid & NAV_PVT_VALID_DATE_TIME == NAV_PVT_VALID_DATE_TIME:
+        timestamp = calendar.timegm((year, month, day, hour, minute, second)) + nano * 1e-9
+
+    # fix type is only reliable if fix is within accuracy limits
+    if not flags & NAV_PVT_FLAG_GNSS_FIX_OK:
+        fix_type = 0
+
+    return OwnshipFix(timestamp, latitude * 1e-7, longitude * 1e-7, utils.conversion.meters_to_feet(height_msl / 1000.0), utils.conversion.mps_to_knots(ground_speed / 1000.0), heading * 1e-5, fix_type, satellite_count)
+
+
+class UbxFramer(object):
+    """
+    Splits the serial stream of a u-blox receiver into UBX frames and NMEA sentences. Incomplete frames are kept and
+    completed with the next chunk; after corrupted frames, the framer resynchronizes on the next sync character.
+    """
+
+    def __init__(self, max_line_length=256):
+        """
+        :param max_line_length: Partial NMEA sentences longer than this are discarded
+        """
+
+        self._max_line_length = max_line_length
+        self._buffer = b''
+
+        # number of UBX frames with wrong checksum
+        self.checksum_error_count = 0
+
+    def feed(self, data):
+        """
+        :param data: Next chunk of serial stream
+        :return: List of (message class, message id, payload) tuples; NMEA sentences (without line terminator) are
+                 returned with message class and id None
+        """
+
+        buffer = self._buffer + data if self._buffer else data
+        buffer_length = len(buffer)
+
+        frames = []
+        index = 0
+
+        while index < buffer_length:
+            first_byte = buffer[index]
+
+            if first_byte == 0xb5:
+                if buffer_length - index < UBX_HEADER_LENGTH:
+                    break
+
+                if buffer[index + 1] != 0x62:
+                    index += 1
+                    continue
+
+                payload_length = buffer[index + 4] | buffer[index + 5] << 8
+                if payload_length > UBX_MAX_PAYLOAD_LENGTH:
+                    index += 1
+                    continue
+
+                frame_end = index + UBX_HEADER_LENGTH + payload_length + 2
+                if frame_end > buffer_length:
+                    break
+
+                if ubx_checksum(buffer[index + 2:frame_end - 2]) != buffer[frame_end - 2:frame_end]:
+                    self.checksum_error_count += 1
+                    index += 1
+                    continue
+
+                frames.append((buffer[index + 2], buffer[index + 3], buffer[index + UBX_HEADER_LENGTH:frame_end - 2]))
+                index = frame_end
+
+            elif first_byte == 0x24:
+                # NMEA sentence starts with '$'
+                line_end = buffer.find(b'\n', index)
+                if line_end < 0:
+                    if buffer_length - index > self._max_line_length:
+                        index = buffer_length
+                    break
+
+                line = buffer[index:line_end].rstrip(b'\r')
+                if len(line) <= self._max_line_length:
+                    frames.append((None, None, line))
+                index = line_end + 1
+
+            else:
+                # skip to next possible start of frame or sentence
+                next_ubx = buffer.find(b'\xb5', index + 1)
+                next_nmea = buffer.find(b'$', index + 1)
+                if next_ubx < 0:
+                    index = next_nmea if next_nmea >= 0 else buffer_length
+                else:
+                    index = next_ubx if next_nmea < 0 else min(next_ubx, next_nmea)
+
+        self._buffer = buffer[index:]
+
+        return frames